@@ -0,0 +1,99 @@
+"""Microbenchmark: what does logging cost the compose path of ``MRSendmail.send()``?
+
+Composes the same message under four logging setups and reports microseconds
+per message plus the overhead over ``floor`` (no loguru handlers at all, so
+every logging call returns immediately):
+
+    disabled  a handler exists but ``reputils`` is disabled (the library default)
+    filtered  ``reputils`` enabled, handler with the skiplog filter, ``wantsdebuglogging=False``
+    verbose   ``reputils`` enabled, ``wantsdebuglogging=True``
+
+Reconfigures the global loguru logger, so run it as its own process:
+
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --max-overhead 0.05  # exit 1 if disabled/filtered cost more than 5%
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger as glogger
+
+from reputils import EmailAddress, MRSendmail, SMTPServerInfo, _loguru_skiplog_filter
+
+MODES: List[str] = ["floor", "disabled", "filtered", "verbose"]
+
+
+def _configure(mode: str) -> None:
+    glogger.remove()
+    if mode == "floor":
+        return
+    glogger.add(io.StringIO(), level="DEBUG", filter=_loguru_skiplog_filter)
+    if mode == "disabled":
+        glogger.disable("reputils")
+    else:
+        glogger.enable("reputils")
+
+
+def _compose(mailer: MRSendmail, wantsdebuglogging: bool, iterations: int) -> float:
+    """Seconds per message for the compose phase as ``send()`` runs it."""
+    logger = mailer.logger.bind(skiplog=not wantsdebuglogging)
+    started: float = time.perf_counter()
+    for _ in range(iterations):
+        mailer._build_message(
+            logger,
+            subject=mailer.subject,
+            tos=mailer.tos,
+            ccs=mailer.ccs,
+            txt="The quick brown fox jumps over the lazy dog.\n",
+            html=None,
+            files=None,
+            msgid=None,
+            additional_headers=None,
+            wantsdebuglogging=wantsdebuglogging,
+        )
+    return (time.perf_counter() - started) / iterations
+
+
+def run(iterations: int, repeats: int) -> Dict[str, float]:
+    """Microseconds per message per mode; the best of ``repeats`` interleaved rounds."""
+    mailer = MRSendmail(
+        serverinfo=SMTPServerInfo("smtp.example.com"),
+        returnpath=EmailAddress("bench@example.com"),
+        subject="bench",
+        tos=[EmailAddress("alice@example.com", "Alice")],
+    )
+    best: Dict[str, float] = {mode: float("inf") for mode in MODES}
+    for _ in range(repeats):
+        for mode in MODES:
+            _configure(mode)
+            best[mode] = min(best[mode], _compose(mailer, mode == "verbose", iterations) * 1e6)
+    glogger.remove()
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500, help="messages per round (default: 500)")
+    parser.add_argument("--repeats", type=int, default=5, help="interleaved rounds, best one counts (default: 5)")
+    parser.add_argument("--max-overhead", type=float, help="exit 1 if disabled/filtered exceed floor by this fraction")
+    args = parser.parse_args(argv)
+
+    us: Dict[str, float] = run(args.iterations, args.repeats)
+    overhead: Dict[str, float] = {mode: us[mode] / us["floor"] - 1.0 for mode in MODES if mode != "floor"}
+    print(json.dumps({"us_per_message": us, "overhead": overhead}, indent=2))
+
+    if args.max_overhead is not None:
+        slow: List[str] = [m for m in ("disabled", "filtered") if overhead[m] > args.max_overhead]
+        for m in slow:
+            print(f"REGRESSION {m}: {overhead[m]:.1%} logging overhead", file=sys.stderr)
+        return 1 if slow else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Throughput, latency and memory benchmarks for ``MRSendmail.send()``.
+
+Runs every scenario against the in-process SMTP sink from ``tests/smtpsink.py``
+and prints (or writes) one JSON document with messages/sec, p50/p99 send latency
+and peak traced memory per scenario. Run from the repository root:
+
+    python -m benchmarks.bench_send --output bench.json
+    python -m benchmarks.bench_send --quick --compare bench.json  # fails on regressions
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from reputils import AttachmentCompression, EmailAddress, MRSendmail, SMTPConnectionPool, SMTPServerInfo
+from tests.smtpsink import SMTPSink
+
+_KB: int = 1024
+_MB: int = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One benchmark configuration; every field but ``name`` deviates from the baseline on purpose."""
+
+    name: str
+    body_bytes: int = 1 * _KB
+    attachment_bytes: int = 0
+    attachment_csv: bool = False  # CSV-like text instead of a byte pattern
+    compress_attachments: bool = False  # gzip via AttachmentCompression
+    recipients: int = 1
+    starttls: bool = False
+    pooled: bool = True
+    pipelining: bool = False  # sink advertises PIPELINING
+    latency: float = 0.0  # added per command round trip by the sink
+    fail_4xx: float = 0.0  # fraction of recipients answered with 451
+    fail_5xx: float = 0.0  # fraction of recipients answered with 550
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("baseline"),
+    Scenario("unpooled", pooled=False),
+    Scenario("starttls", starttls=True),
+    Scenario("starttls-unpooled", starttls=True, pooled=False),
+    Scenario("body-100k", body_bytes=100 * _KB),
+    Scenario("body-1m", body_bytes=1 * _MB),
+    Scenario("attachment-1m", attachment_bytes=1 * _MB),
+    Scenario("attachment-10m", attachment_bytes=10 * _MB),
+    Scenario("attachment-csv-10m", attachment_bytes=10 * _MB, attachment_csv=True),
+    Scenario("attachment-csv-10m-gzip", attachment_bytes=10 * _MB, attachment_csv=True, compress_attachments=True),
+    Scenario("recipients-100", recipients=100),
+    Scenario("recipients-1000", recipients=1000),
+    Scenario("latency-5ms", latency=0.005),
+    Scenario("latency-5ms-recipients-100", latency=0.005, recipients=100),
+    Scenario("latency-5ms-recipients-100-pipelining", latency=0.005, recipients=100, pipelining=True),
+    Scenario("faults-4xx", recipients=20, fail_4xx=0.25),
+    Scenario("faults-5xx", recipients=20, fail_5xx=0.25),
+]
+
+QUICK: List[str] = ["baseline", "starttls", "attachment-1m", "recipients-100", "faults-5xx"]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index: int = max(0, min(len(sorted_values) - 1, int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _rcpt_handler(scenario: Scenario) -> Any:
+    n_4xx: int = int(scenario.recipients * scenario.fail_4xx)
+    n_5xx: int = int(scenario.recipients * scenario.fail_5xx)
+
+    def handler(rcpt: str) -> Tuple[int, str]:
+        i: int = int(rcpt[1 : rcpt.index("@")])
+        if i < n_4xx:
+            return 451, "4.3.0 try again later"
+        if i < n_4xx + n_5xx:
+            return 550, "5.1.1 unknown recipient"
+        return 250, "2.1.5 Ok"
+
+    return handler
+
+
+def run_scenario(scenario: Scenario, messages: int, workdir: Path, memory_samples: int = 3) -> Dict[str, Any]:
+    """Send ``messages`` messages for ``scenario`` and measure them.
+
+    The timing pass runs without ``tracemalloc``; peak memory is measured in a
+    separate, shorter pass because tracing slows allocation-heavy code down.
+    """
+    files: Optional[List[Path]] = None
+    if scenario.attachment_bytes:
+        if scenario.attachment_csv:
+            attachment: Path = workdir / f"{scenario.name}.csv"
+            row: bytes = b"2024-01-01T00:00:00,customer-0000,order-0000,42.00,EUR,shipped\n"
+            attachment.write_bytes(
+                b"".join(
+                    row.replace(b"0000", b"%04d" % (i % 10000)) for i in range(scenario.attachment_bytes // len(row))
+                )
+            )
+        else:
+            attachment = workdir / f"{scenario.name}.bin"
+            attachment.write_bytes(bytes(range(256)) * (scenario.attachment_bytes // 256))
+        files = [attachment]
+
+    line: str = "The quick brown fox jumps over the lazy dog. " * 2 + "\n"
+    body: str = line * max(1, scenario.body_bytes // len(line))
+
+    with SMTPSink(
+        starttls=scenario.starttls,
+        extensions=("PIPELINING",) if scenario.pipelining else (),
+        rcpt_handler=_rcpt_handler(scenario),
+        store_data=False,
+        latency=scenario.latency,
+    ) as sink:
+        pool: Optional[SMTPConnectionPool] = SMTPConnectionPool() if scenario.pooled else None
+        mailer = MRSendmail(
+            serverinfo=SMTPServerInfo(sink.host, sink.port, use_start_tls=scenario.starttls),
+            returnpath=EmailAddress("bench@example.com"),
+            subject=f"bench {scenario.name}",
+            tos=[EmailAddress(f"r{i}@example.com") for i in range(scenario.recipients)],
+            pool=pool,
+            attachment_compression=AttachmentCompression() if scenario.compress_attachments else None,
+        )
+
+        mailer.send(txt=body, files=files, raw=None)  # warm-up: imports, first connection
+
+        latencies: List[float] = []
+        failed: int = 0
+        started: float = time.perf_counter()
+        for _ in range(messages):
+            t: float = time.perf_counter()
+            _, sr = mailer.send(txt=body, files=files, raw=None)
+            latencies.append(time.perf_counter() - t)
+            failed += sr.num_failed
+        elapsed: float = time.perf_counter() - started
+
+        tracemalloc.start()
+        for _ in range(min(memory_samples, messages)):
+            mailer.send(txt=body, files=files, raw=None)
+        peak: int = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        if pool is not None:
+            pool.close()
+
+    latencies.sort()
+    return {
+        "scenario": asdict(scenario),
+        "messages": messages,
+        "seconds": elapsed,
+        "msgs_per_sec": messages / elapsed if elapsed > 0 else float("inf"),
+        "latency_p50_ms": _percentile(latencies, 50) * 1000.0,
+        "latency_p99_ms": _percentile(latencies, 99) * 1000.0,
+        "peak_memory_bytes": peak,
+        "failed_recipients": failed,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return one line per scenario whose throughput fell more than ``tolerance`` below ``baseline``."""
+    before: Dict[str, float] = {r["scenario"]["name"]: r["msgs_per_sec"] for r in baseline["results"]}
+    regressions: List[str] = []
+    for r in results:
+        name: str = r["scenario"]["name"]
+        if name in before and r["msgs_per_sec"] < before[name] * (1.0 - tolerance):
+            regressions.append(f"{name}: {r['msgs_per_sec']:.1f} msgs/s vs. {before[name]:.1f} before")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50, help="messages per scenario (default: 50)")
+    parser.add_argument("--quick", action="store_true", help=f"only run {', '.join(QUICK)} with 10 messages")
+    parser.add_argument("--scenario", action="append", default=[], help="run only this scenario (repeatable)")
+    parser.add_argument("-o", "--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="earlier JSON report; exit 1 on throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed throughput drop (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    names: List[str] = args.scenario or (QUICK if args.quick else [s.name for s in SCENARIOS])
+    unknown: List[str] = [n for n in names if n not in {s.name for s in SCENARIOS}]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    messages: int = 10 if args.quick and args.messages == parser.get_default("messages") else args.messages
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="reputils-bench-") as tmp:
+        for scenario in (s for s in SCENARIOS if s.name in names):
+            result: Dict[str, Any] = run_scenario(scenario, messages, Path(tmp))
+            print(
+                f"{scenario.name:>38}: {result['msgs_per_sec']:8.1f} msgs/s"
+                f"  p50 {result['latency_p50_ms']:7.2f} ms  p99 {result['latency_p99_ms']:7.2f} ms"
+                f"  peak {result['peak_memory_bytes'] / _MB:7.2f} MB",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    report: Dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare is not None:
+        regressions: List[str] = compare(results, json.loads(args.compare.read_text(encoding="utf-8")), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+import asyncio
+import base64
+import re
+import smtplib
+import ssl
+import time
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import loguru
+from loguru import logger as glogger
+
+_CRLF: bytes = b"\r\n"
+_re_bare_eol: re.Pattern[bytes] = re.compile(rb"(?:\r\n|\n|\r(?!\n))")
+_re_leading_dot: re.Pattern[bytes] = re.compile(rb"(?m)^\.")
+_re_needs_stuffing: re.Pattern[bytes] = re.compile(rb"(?m)^\.|\r(?!\n)|(?<!\r)\n")
+
+# a plain mailbox without display name, comments or quoting: local@domain
+_re_bare_address: re.Pattern[str] = re.compile(
+    r"[^@\s<>()\[\],;:\"\\]+@[^\W_](?:[\w-]*[^\W_])?(?:\.[^\W_](?:[\w-]*[^\W_])?)*"
+)
+
+# envelope commands written per round trip when the server supports PIPELINING (RFC 2920); replies are
+# only a few dozen bytes each, so a batch never fills the socket buffers of either side
+_PIPELINE_BATCH: int = 256
+
+
+def _dotstuff(chunk: bytes | memoryview) -> bytes | memoryview:
+    """Normalize line endings to CRLF and escape leading dots (RFC 5321 4.5.2).
+
+    ``chunk`` may be a piece of a larger message as long as it starts at a
+    line boundary and does not split a CRLF pair. Chunks that are already in
+    wire form (the common case for generator output) are returned as-is,
+    without copying.
+    """
+    if _re_needs_stuffing.search(chunk) is None:
+        return chunk
+    return _re_leading_dot.sub(b"..", _re_bare_eol.sub(_CRLF, chunk))
+
+
+def _quoteaddr(addr: str) -> str:
+    """``smtplib.quoteaddr`` without the ``parseaddr`` round trip for plain mailboxes."""
+    return f"<{addr}>" if _re_bare_address.fullmatch(addr) else smtplib.quoteaddr(addr)
+
+
+def _envelope_commands(from_addr: str, to_addrs: Sequence[str], mail_options: Sequence[str] = ()) -> List[str]:
+    """``MAIL FROM`` (with ``mail_options``) followed by one ``RCPT TO`` per recipient, as lines without CRLF."""
+    cmds: List[str] = [" ".join([f"mail FROM:{_quoteaddr(from_addr)}", *mail_options])]
+    cmds.extend(f"rcpt TO:{_quoteaddr(each)}" for each in to_addrs)
+    for cmd in cmds:
+        if "\r" in cmd or "\n" in cmd:
+            raise ValueError(f"command and arguments contain prohibited newline characters: {cmd!r}")
+    return cmds
+
+
+@dataclass
+class AsyncSMTPClient:
+    """Minimal SMTP client on top of asyncio streams.
+
+    Implements exactly the subset of RFC 5321 that :meth:`MRSendmail.asend`
+    needs: EHLO/HELO, STARTTLS (upgrading the running stream in place via
+    ``StreamWriter.start_tls``, i.e. ``loop.start_tls``), AUTH PLAIN/LOGIN,
+    one MAIL/RCPT/DATA transaction at a time (with the envelope pipelined
+    when the server advertises PIPELINING), RSET and QUIT.
+
+    Errors are raised as the corresponding :mod:`smtplib` exceptions, and
+    :meth:`sendmail` follows the contract of ``smtplib.SMTP.sendmail``, so
+    callers can treat both clients alike.
+
+    Attributes:
+        hostname: Server to connect to.
+        port: Server port.
+        local_hostname: Name sent with EHLO; defaults to ``localhost``.
+        timeout: Seconds to wait for each server reply.
+        ssl_context: If set, the connection is TLS-wrapped from the start
+            (implicit TLS, "SMTPS") instead of upgraded via :meth:`starttls`.
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    hostname: str
+    port: int = 25
+    local_hostname: str = "localhost"
+    timeout: Optional[float] = 60.0
+    ssl_context: Optional[ssl.SSLContext] = None
+
+    esmtp_features: Dict[str, str] = field(default_factory=dict, init=False, repr=False)
+    _reader: Optional[asyncio.StreamReader] = field(default=None, init=False, repr=False)
+    _writer: Optional[asyncio.StreamWriter] = field(default=None, init=False, repr=False)
+
+    async def connect(self) -> Tuple[int, bytes]:
+        """Open the TCP connection and read the server greeting."""
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.hostname, self.port, ssl=self.ssl_context), self.timeout
+        )
+        code, msg = await self.getreply()
+        if code != 220:
+            await self.close()
+            raise smtplib.SMTPConnectError(code, msg)
+        return code, msg
+
+    async def getreply(self) -> Tuple[int, bytes]:
+        """Read a (possibly multi-line) reply.
+
+        Returns:
+            ``(code, message)`` where ``message`` joins all reply lines with
+            ``\\n``, as ``smtplib`` does.
+        """
+        if self._reader is None:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+
+        lines: List[bytes] = []
+        while True:
+            line: bytes = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if not line:
+                await self.close()
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            try:
+                code: int = int(line[:3])
+            except ValueError:
+                code = -1
+            lines.append(line[4:].strip(b" \t\r\n"))
+            if code == -1 or line[3:4] != b"-":
+                return code, b"\n".join(lines)
+
+    async def docmd(self, cmd: str, args: str = "") -> Tuple[int, bytes]:
+        """Send a single command line and return its reply."""
+        await self.send(f"{cmd} {args}".strip().encode("ascii") + _CRLF)
+        return await self.getreply()
+
+    async def send(self, data: bytes | memoryview) -> None:
+        """Write raw bytes to the server and wait until they are flushed."""
+        if self._writer is None:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def ehlo(self) -> Tuple[int, bytes]:
+        """Send EHLO (falling back to HELO) and record the advertised extensions."""
+        self.esmtp_features = {}
+        code, msg = await self.docmd("ehlo", self.local_hostname)
+        if code != 250:
+            code, msg = await self.docmd("helo", self.local_hostname)
+            if code != 250:
+                raise smtplib.SMTPHeloError(code, msg)
+            return code, msg
+
+        for line in msg.decode("latin-1").split("\n")[1:]:
+            keyword, _, params = line.partition(" ")
+            self.esmtp_features[keyword.lower()] = params.strip()
+        return code, msg
+
+    def has_extn(self, opt: str) -> bool:
+        """Whether the server advertised the given extension."""
+        return opt.lower() in self.esmtp_features
+
+    async def starttls(self, context: ssl.SSLContext) -> Tuple[int, bytes]:
+        """Upgrade the connection to TLS. EHLO must be repeated afterwards."""
+        if not self.has_extn("starttls"):
+            raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+        code, msg = await self.docmd("STARTTLS")
+        if code != 220:
+            raise smtplib.SMTPResponseException(code, msg)
+
+        assert self._writer is not None
+        await self._writer.start_tls(
+            context, server_hostname=self.hostname if context.check_hostname else None
+        )  # -> loop.start_tls() on the existing transport
+        self.esmtp_features = {}
+        return code, msg
+
+    async def login(self, user: str, password: str) -> Tuple[int, bytes]:
+        """Authenticate with AUTH PLAIN or, if that is not offered, AUTH LOGIN."""
+        if not self.has_extn("auth"):
+            raise smtplib.SMTPNotSupportedError("SMTP AUTH extension not supported by server.")
+
+        mechanisms: List[str] = self.esmtp_features["auth"].upper().split()
+
+        def b64(s: str) -> str:
+            return base64.b64encode(s.encode("utf-8")).decode("ascii")
+
+        if "PLAIN" in mechanisms or "LOGIN" not in mechanisms:
+            code, msg = await self.docmd("AUTH", "PLAIN " + b64(f"\0{user}\0{password}"))
+        else:
+            code, msg = await self.docmd("AUTH", "LOGIN")
+            if code == 334:
+                code, msg = await self.docmd(b64(user))
+            if code == 334:
+                code, msg = await self.docmd(b64(password))
+
+        if code not in (235, 503):  # 503: already authenticated
+            raise smtplib.SMTPAuthenticationError(code, msg)
+        return code, msg
+
+    async def rset(self) -> Tuple[int, bytes]:
+        return await self.docmd("rset")
+
+    async def data(self, msg: bytes | Iterable[bytes | memoryview]) -> Tuple[int, bytes]:
+        """Send DATA followed by the message and return the final reply.
+
+        Args:
+            msg: The flattened message, or an iterable of pieces of it split
+                at line boundaries. Pieces are dot-stuffed and written one at a
+                time, so the complete message never has to be in memory.
+
+        Raises:
+            smtplib.SMTPDataError: The server did not accept the DATA command.
+        """
+        code, resp = await self.docmd("data")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, resp)
+
+        tail: bytes = b""
+        for chunk in [msg] if isinstance(msg, bytes) else msg:
+            if chunk:
+                chunk = _dotstuff(chunk)
+                await self.send(chunk)
+                tail = (tail + bytes(chunk[-2:]))[-2:]
+        await self.send(b"." + _CRLF if tail == _CRLF else _CRLF + b"." + _CRLF)
+        return await self.getreply()
+
+    async def envelope(
+        self, from_addr: str, to_addrs: Sequence[str], mail_options: Sequence[str] = ()
+    ) -> Dict[str, Tuple[int, bytes]]:
+        """Send ``MAIL FROM`` (with ``mail_options``) and all ``RCPT TO`` commands.
+
+        With PIPELINING the commands go out in batches of ``_PIPELINE_BATCH``
+        and the replies are collected afterwards, so a long recipient list
+        costs a handful of round trips instead of one per recipient.
+        Non-ASCII addresses need SMTPUTF8 (RFC 6531), which is then added to
+        ``mail_options``.
+
+        Returns:
+            A dict with one ``(code, message)`` entry per refused recipient.
+
+        Raises:
+            smtplib.SMTPSenderRefused: The server refused ``MAIL FROM``.
+            smtplib.SMTPRecipientsRefused: The server closed the connection
+                (421) while recipients were being submitted.
+            smtplib.SMTPNotSupportedError: An address is not ASCII and the
+                server does not support SMTPUTF8.
+        """
+        if not (from_addr.isascii() and all(addr.isascii() for addr in to_addrs)):
+            if not self.has_extn("smtputf8"):
+                raise smtplib.SMTPNotSupportedError("SMTPUTF8 not supported by server")
+            if "SMTPUTF8" not in mail_options:
+                mail_options = [*mail_options, "SMTPUTF8"]
+        encoding: str = "utf-8" if "SMTPUTF8" in mail_options else "ascii"
+        cmds: List[str] = _envelope_commands(from_addr, to_addrs, mail_options)
+        batch: int = _PIPELINE_BATCH if self.has_extn("pipelining") else 1
+
+        senderrs: Dict[str, Tuple[int, bytes]] = {}
+        for start in range(0, len(cmds), batch):
+            group: List[str] = cmds[start : start + batch]
+            await self.send("".join(f"{cmd}\r\n" for cmd in group).encode(encoding))
+
+            replies: List[Tuple[int, bytes]] = []
+            for _ in group:
+                replies.append(await self.getreply())
+                if replies[-1][0] == 421:  # server is closing the connection
+                    break
+
+            for index, (code, resp) in enumerate(replies, start):
+                if index == 0:
+                    if code != 250:
+                        if code == 421:
+                            await self.close()
+                        else:
+                            await self.rset()
+                        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+                    continue
+
+                if code not in (250, 251):
+                    senderrs[to_addrs[index - 1]] = (code, resp)
+                if code == 421:
+                    await self.close()
+                    raise smtplib.SMTPRecipientsRefused(senderrs)
+
+        return senderrs
+
+    async def sendmail(
+        self,
+        from_addr: str,
+        to_addrs: Sequence[str],
+        msg: bytes | Iterable[bytes | memoryview],
+        timings: Optional[Dict[str, float]] = None,
+        mail_options: Sequence[str] = (),
+    ) -> Dict[str, Tuple[int, bytes]]:
+        """Run one mail transaction, mirroring ``smtplib.SMTP.sendmail``.
+
+        Args:
+            from_addr: Envelope sender (may be in display-name form).
+            to_addrs: Envelope recipients (may be in display-name form).
+            msg: The complete, flattened message or an iterable of its
+                pieces (see :meth:`data`).
+            timings: If given, the seconds spent on the ``envelope`` and
+                ``data`` phases are added to it.
+            mail_options: ``MAIL FROM`` parameters, e.g. ``BODY=8BITMIME``.
+
+        Returns:
+            A dict with one ``(code, message)`` entry per refused recipient.
+
+        Raises:
+            smtplib.SMTPSenderRefused: The server refused ``MAIL FROM``.
+            smtplib.SMTPRecipientsRefused: All recipients were refused.
+            smtplib.SMTPDataError: The server refused the message data.
+        """
+        started: float = time.perf_counter()
+        senderrs: Dict[str, Tuple[int, bytes]] = await self.envelope(from_addr, to_addrs, mail_options)
+        if timings is not None:
+            timings["envelope"] = timings.get("envelope", 0.0) + time.perf_counter() - started
+
+        if len(senderrs) == len(to_addrs):
+            await self.rset()
+            raise smtplib.SMTPRecipientsRefused(senderrs)
+
+        started = time.perf_counter()
+        code, resp = await self.data(msg)
+        if timings is not None:
+            timings["data"] = timings.get("data", 0.0) + time.perf_counter() - started
+        if code != 250:
+            if code == 421:
+                await self.close()
+            else:
+                await self.rset()
+            raise smtplib.SMTPDataError(code, resp)
+
+        return senderrs
+
+    async def quit(self) -> None:
+        """Send QUIT (ignoring errors) and close the connection."""
+        try:
+            if self._writer is not None:
+                await self.docmd("quit")
+        except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Close the connection without saying goodbye."""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
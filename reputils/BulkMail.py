@@ -0,0 +1,482 @@
+"""``reputils`` command line: resumable bulk mailing.
+
+    reputils send recipients.csv --subject 'Hello $name' --text body.txt --from news@example.com \\
+        --server smtp.example.com --port 587 --starttls --user news --concurrency 8
+
+Recipients are streamed from a CSV file (with a header row; the ``email``
+column is required, all columns are available to the templates) or a JSON
+lines file (one object with an ``email`` key, or a plain address string, per
+line); the file is never loaded as a whole. Every recipient gets an own
+message; subject and bodies are ``string.Template`` templates filled with the
+recipient's fields (``$email``, ``$name``, ...).
+
+Progress is written to a checkpoint file (default ``<recipients>.checkpoint.json``).
+Running the same command again after an interruption skips every recipient
+that was already handled, so nobody gets the message twice. A second Ctrl-C
+stops without waiting for the messages in flight: those not started yet are
+sent by the next run, those being sent are reported as possibly sent and
+skipped.
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from string import Template
+from concurrent.futures import Future
+from typing import Any, ClassVar, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import loguru
+from loguru import logger as glogger
+
+from .AsyncSMTP import _re_bare_address
+from .MailReport import DeliveryEngine, EmailAddress, MailSpec, MRSendmail, SendResult, SMTPServerInfo
+
+EXIT_OK: int = 0
+EXIT_ERRORS: int = 1
+EXIT_INTERRUPTED: int = 130
+
+
+def iter_recipient_rows(path: Path, fmt: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Stream ``(row_number, fields)`` from a CSV or JSON lines file.
+
+    Row numbers count data rows from 0 and are stable across runs, which is
+    what the checkpoint relies on. A JSON line that is not an object or a
+    string yields an empty row (reported as invalid by the caller).
+    """
+    with path.open("r", encoding="utf-8", newline="") as file:
+        if fmt == "csv":
+            for index, row in enumerate(csv.DictReader(file)):
+                yield index, {k: v or "" for k, v in row.items() if k is not None}
+            return
+
+        for index, line in enumerate(file):
+            if not line.strip():
+                continue
+            try:
+                value: Any = json.loads(line)
+            except ValueError:
+                value = None
+            if isinstance(value, str):
+                yield index, {"email": value}
+            elif isinstance(value, dict):
+                yield index, {str(k): "" if v is None else str(v) for k, v in value.items()}
+            else:
+                yield index, {}
+
+
+def count_rows(path: Path, fmt: str) -> int:
+    """Number of data rows, from a fast scan that does not parse the file."""
+    lines: int = 0
+    last: bytes = b"\n"
+    with path.open("rb") as file:
+        while chunk := file.read(1 << 20):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1  # no newline after the last row
+    return max(0, lines - 1) if fmt == "csv" else lines
+
+
+@dataclass
+class Checkpoint:
+    """Which rows of a recipients file have been handled, persisted as JSON.
+
+    Rows below ``watermark`` are all done; ``done`` holds the finished rows
+    above it (messages complete out of order) as sorted, disjoint
+    ``[start, end)`` ranges. Rows whose delivery raised a connection error
+    are not marked, so a later run retries them; as the rows behind such a
+    gap finish in one run, they merge into a single range, so the checkpoint
+    grows with the number of gaps, not with the length of the list.
+    """
+
+    path: Path
+    recipients: str
+    watermark: int = 0
+    done: List[List[int]] = field(default_factory=list)
+    sent: int = 0
+    failed: int = 0
+    invalid: int = 0
+    uncertain: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @staticmethod
+    def load(path: Path, recipients: Path) -> Checkpoint:
+        """Read ``path`` if it exists, else start a new checkpoint for ``recipients``.
+
+        Raises:
+            ValueError: If the checkpoint belongs to another recipients file.
+        """
+        source: str = str(recipients.resolve())
+        if not path.exists():
+            return Checkpoint(path, source)
+        doc: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        if doc["recipients"] != source:
+            raise ValueError(f"{path} is the checkpoint of {doc['recipients']}, not of {source}")
+        checkpoint: Checkpoint = Checkpoint(
+            path,
+            source,
+            watermark=doc["watermark"],
+            sent=doc["sent"],
+            failed=doc["failed"],
+            invalid=doc["invalid"],
+            uncertain=doc.get("uncertain", 0),
+        )
+        for item in doc["done"]:
+            if isinstance(item, int):  # written by a version that stored single rows
+                checkpoint._add(item)
+            else:
+                checkpoint.done.append([item[0], item[1]])
+        return checkpoint
+
+    def is_done(self, index: int) -> bool:
+        with self._lock:
+            if index < self.watermark:
+                return True
+            i: int = bisect.bisect_right(self.done, index, key=lambda r: r[0])
+            return i > 0 and index < self.done[i - 1][1]
+
+    def mark(self, index: int, outcome: str) -> None:
+        """Record row ``index`` as finished with ``outcome`` (``sent``, ``failed``, ``invalid`` or ``uncertain``)."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self._add(index)
+
+    def skip_gap(self, index: int) -> None:
+        """Treat row ``index`` as done without counting it (blank lines have no row)."""
+        with self._lock:
+            self._add(index)
+
+    def _add(self, index: int) -> None:
+        """Add ``index`` to ``done``, merging neighbouring ranges and advancing ``watermark``."""
+        if index < self.watermark:
+            return
+        ranges: List[List[int]] = self.done
+        i: int = bisect.bisect_right(ranges, index, key=lambda r: r[0])  # ranges[i - 1] starts at or before index
+        if i > 0 and index < ranges[i - 1][1]:
+            return
+        if i > 0 and ranges[i - 1][1] == index:
+            ranges[i - 1][1] += 1
+            if i < len(ranges) and ranges[i][0] == ranges[i - 1][1]:
+                ranges[i - 1][1] = ranges.pop(i)[1]
+        elif i < len(ranges) and ranges[i][0] == index + 1:
+            ranges[i][0] = index
+        else:
+            ranges.insert(i, [index, index + 1])
+        if ranges[0][0] == self.watermark:
+            self.watermark = ranges.pop(0)[1]
+
+    def save(self) -> None:
+        """Write the checkpoint atomically (a crash leaves the previous version)."""
+        with self._lock:
+            doc: Dict[str, Any] = {
+                "recipients": self.recipients,
+                "watermark": self.watermark,
+                "done": [list(r) for r in self.done],
+                "sent": self.sent,
+                "failed": self.failed,
+                "invalid": self.invalid,
+                "uncertain": self.uncertain,
+            }
+        tmp: Path = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(doc), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def format_progress(handled: int, total: Optional[int], failed: int, rate: float) -> str:
+    """One status line: progress, failures, throughput and (with a total) ETA."""
+    line: str = f"{handled}"
+    if total:
+        line = f"{100.0 * handled / total:5.1f}% {handled}/{total}"
+    line += f" handled, {failed} failed | {rate:7.1f} msg/s"
+    if total and rate > 0:
+        eta: int = int(max(0, total - handled) / rate)
+        line += f" | ETA {eta // 3600}:{eta % 3600 // 60:02d}:{eta % 60:02d}"
+    return line
+
+
+@contextmanager
+def _sigint_deferred() -> Iterator[None]:
+    """Hold back a Ctrl-C until the block is left, then raise it.
+
+    Only possible in the main thread; elsewhere the block runs unprotected.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    received: List[Any] = []
+    previous: Any = signal.signal(signal.SIGINT, lambda signum, frame: received.append(frame))
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+    if received:
+        if callable(previous):
+            previous(signal.SIGINT, received[0])
+        elif previous != signal.SIG_IGN:
+            raise KeyboardInterrupt
+
+
+@dataclass
+class BulkJob:
+    """One ``reputils send`` run: streams the rows, submits them and tracks the outcome."""
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    mailer: MRSendmail
+    recipients: Path
+    fmt: str
+    checkpoint: Checkpoint
+    subject: Template
+    txt: Optional[Template]
+    html: Optional[Template]
+    concurrency: int = 4
+    rate: Optional[float] = None
+    max_errors: int = 100
+    failures: Optional[TextIO] = None
+    progress: Optional[TextIO] = None
+    total: Optional[int] = None
+    checkpoint_interval: float = 1.0
+
+    errors: int = field(default=0, init=False)
+    _handled_this_run: int = field(default=0, init=False, repr=False)
+    # submitted rows whose outcome is not known yet: row -> (address, future)
+    _in_flight: Dict[int, Tuple[str, Future[Tuple[str, SendResult]]]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def run(self) -> int:
+        """Send to every row not handled yet; returns the process exit code."""
+        started: float = time.monotonic()
+        last_tick: float = 0.0
+        interrupted: bool = False
+        engine: DeliveryEngine = DeliveryEngine(
+            self.mailer,
+            connections_per_server=self.concurrency,
+            messages_per_second=self.rate,
+            max_queued=self.concurrency * 4,  # few messages in flight, so an interrupt drains quickly
+        )
+        try:
+            expected: int = 0
+            for index, row in iter_recipient_rows(self.recipients, self.fmt):
+                for gap in range(expected, index):  # blank JSON lines
+                    self.checkpoint.skip_gap(gap)
+                expected = index + 1
+                if self.checkpoint.is_done(index):
+                    continue
+                if self.errors > self.max_errors:
+                    break
+                self._submit(engine, index, row)
+                if time.monotonic() - last_tick >= self.checkpoint_interval:
+                    last_tick = time.monotonic()
+                    self._tick(started)
+        except KeyboardInterrupt:
+            interrupted = True
+            self._note(f"interrupted, waiting for {len(self._in_flight)} messages in flight (Ctrl-C again to stop now)")
+
+        abandoned: bool = False
+        try:
+            while self._in_flight:
+                time.sleep(0.1)
+                if time.monotonic() - last_tick >= self.checkpoint_interval:
+                    last_tick = time.monotonic()
+                    self._tick(started)
+        except KeyboardInterrupt:
+            interrupted = abandoned = True
+            self._abandon()
+        engine.close(wait=not abandoned)
+        self._tick(started)
+        if self.progress is not None:
+            self.progress.write("\n")
+
+        cp: Checkpoint = self.checkpoint
+        self._note(f"sent {cp.sent}, refused {cp.failed}, invalid {cp.invalid}, errors {self.errors}")
+        if cp.uncertain:
+            self._note(f"{cp.uncertain} messages were possibly sent when the run was stopped; they are not sent again")
+        if interrupted:
+            return EXIT_INTERRUPTED
+        if self.errors:
+            self._note(f"{self.errors} messages hit connection errors; run the command again to retry them")
+            return EXIT_ERRORS
+        return EXIT_OK
+
+    def _submit(self, engine: DeliveryEngine, index: int, row: Dict[str, str]) -> None:
+        addr: EmailAddress = EmailAddress.from_str(row.get("email", ""))
+        if not _re_bare_address.fullmatch(addr.email):
+            self._failure(index, row.get("email", ""), None, "invalid address")
+            self.checkpoint.mark(index, "invalid")
+            return
+        if not addr.name and row.get("name"):
+            addr = EmailAddress(addr.email, row["name"])
+
+        fields: Dict[str, str] = dict(row, email=addr.email, name=addr.name or "")
+        spec: MailSpec = MailSpec(
+            subject=self.subject.safe_substitute(fields),
+            txt=None if self.txt is None else self.txt.safe_substitute(fields),
+            html=None if self.html is None else self.html.safe_substitute(fields),
+            tos=[addr],
+        )
+        # a Ctrl-C between submitting and tracking would lose the row's outcome (and resend it next run);
+        # the lock cannot be held instead, submit() blocks until a worker, which needs it in _done(), frees a slot
+        with _sigint_deferred():
+            future: Future[Tuple[str, SendResult]] = engine.submit(spec)
+            with self._lock:
+                self._in_flight[index] = (addr.email, future)
+            future.add_done_callback(lambda f: self._done(index, addr, f))
+
+    def _done(self, index: int, addr: EmailAddress, future: Future[Tuple[str, SendResult]]) -> None:
+        with self._lock:
+            if self._in_flight.pop(index, None) is None:  # given up on by _abandon()
+                return
+        ex: Optional[BaseException] = future.exception()
+        if ex is not None:
+            with self._lock:
+                self.errors += 1
+            self.logger.debug(f"row {index}: {ex!r}")
+            return
+        sr: SendResult = future.result()[1]
+        if sr.all_succeeded():
+            self.checkpoint.mark(index, "sent")
+        else:
+            code, message = sr.get_error_for_recipient(addr) or (0, "")
+            self._failure(index, addr.email, code, message)
+            self.checkpoint.mark(index, "failed")
+        with self._lock:
+            self._handled_this_run += 1
+
+    def _abandon(self) -> None:
+        """Stop waiting for the rows in flight, so the checkpoint can be saved right away.
+
+        Rows still queued are cancelled and left for the next run. Rows a
+        worker has already started on may be delivered after the checkpoint
+        is saved; they are marked ``uncertain`` (done, so never sent twice)
+        and reported as possibly sent.
+        """
+        with self._lock:
+            in_flight: List[Tuple[int, Tuple[str, Future[Tuple[str, SendResult]]]]] = list(self._in_flight.items())
+            self._in_flight.clear()
+        for index, (email, future) in in_flight:
+            if future.cancel():
+                continue
+            self.checkpoint.mark(index, "uncertain")
+            self._failure(index, email, None, "possibly sent: the run was stopped while it was being delivered")
+
+    def _failure(self, index: int, email: str, code: Optional[int], message: str) -> None:
+        if self.failures is not None:
+            with self._lock:
+                self.failures.write(json.dumps({"row": index, "email": email, "code": code, "message": message}) + "\n")
+                self.failures.flush()
+
+    def _tick(self, started: float) -> None:
+        self.checkpoint.save()
+        if self.progress is None:
+            return
+        cp: Checkpoint = self.checkpoint
+        handled: int = cp.sent + cp.failed + cp.invalid
+        rate: float = self._handled_this_run / max(time.monotonic() - started, 1e-9)
+        self.progress.write("\r" + format_progress(handled, self.total, cp.failed + cp.invalid, rate) + "\033[K")
+        self.progress.flush()
+
+    def _note(self, text: str) -> None:
+        if self.progress is not None:
+            self.progress.write("\n")
+        print(text, file=sys.stderr)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="reputils", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    send = commands.add_parser("send", help="send one message per recipient of a CSV/JSON lines file")
+    send.add_argument("recipients", type=Path, help="CSV (with header) or JSON lines file")
+    send.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+    send.add_argument("--subject", required=True, help="subject template")
+    send.add_argument("--text", type=Path, help="plain text body template file")
+    send.add_argument("--html", type=Path, help="HTML body template file")
+    send.add_argument("--from", dest="sender", required=True, help="sender address, e.g. 'News <news@example.com>'")
+    send.add_argument("--reply-to", help="Reply-To address")
+
+    server = send.add_argument_group("server")
+    server.add_argument("--server", required=True, help="SMTP host")
+    server.add_argument("--port", type=int, default=25)
+    server.add_argument("--user", help="SMTP user")
+    server.add_argument(
+        "--password-env", default="REPUTILS_SMTP_PASSWORD", help="environment variable holding the SMTP password"
+    )
+    tls = server.add_mutually_exclusive_group()
+    tls.add_argument("--starttls", action="store_true", help="upgrade the connection with STARTTLS")
+    tls.add_argument("--implicit-tls", action="store_true", help="TLS from the first byte (port 465)")
+    server.add_argument("--verify-tls", action="store_true", help="verify the server certificate")
+    server.add_argument("--max-recipients", type=int, help="server limit of RCPT per transaction")
+
+    job = send.add_argument_group("job")
+    job.add_argument("--concurrency", type=int, default=4, help="parallel SMTP connections (default: 4)")
+    job.add_argument("--rate", type=float, help="at most this many messages per second")
+    job.add_argument("--checkpoint", type=Path, help="default: <recipients>.checkpoint.json")
+    job.add_argument("--failures", type=Path, help="append refused and invalid recipients here (JSON lines)")
+    job.add_argument("--max-errors", type=int, default=100, help="stop after this many connection errors")
+    job.add_argument("--total", type=int, help="number of rows, for the ETA (default: counted up front)")
+    job.add_argument("--no-progress", action="store_true", help="no live progress line")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the ``reputils`` console script."""
+    parser: argparse.ArgumentParser = _parser()
+    args = parser.parse_args(argv)
+
+    if args.text is None and args.html is None:
+        parser.error("at least one of --text and --html is required")
+    fmt: str = args.format or ("jsonl" if args.recipients.suffix.lower() in (".jsonl", ".ndjson", ".json") else "csv")
+    checkpoint_path: Path = args.checkpoint or args.recipients.with_name(args.recipients.name + ".checkpoint.json")
+    try:
+        checkpoint: Checkpoint = Checkpoint.load(checkpoint_path, args.recipients)
+    except ValueError as ex:
+        parser.error(str(ex))
+
+    mailer = MRSendmail(
+        serverinfo=SMTPServerInfo(
+            args.server,
+            args.port,
+            smtp_user=args.user,
+            smtp_pass=os.getenv(args.password_env) if args.user else None,
+            use_start_tls=args.starttls,
+            use_implicit_tls=args.implicit_tls,
+            ignoresslerrors=not args.verify_tls,
+            max_recipients_per_transaction=args.max_recipients,
+        ),
+        returnpath=EmailAddress.from_str(args.sender),
+        replyto=EmailAddress.from_str(args.reply_to) if args.reply_to else None,
+    )
+
+    failures: Optional[TextIO] = args.failures.open("a", encoding="utf-8") if args.failures else None
+    try:
+        return BulkJob(
+            mailer,
+            args.recipients,
+            fmt,
+            checkpoint,
+            subject=Template(args.subject),
+            txt=Template(args.text.read_text(encoding="utf-8")) if args.text else None,
+            html=Template(args.html.read_text(encoding="utf-8")) if args.html else None,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            max_errors=args.max_errors,
+            failures=failures,
+            progress=None if args.no_progress else sys.stderr,
+            total=args.total if args.total is not None else count_rows(args.recipients, fmt),
+        ).run()
+    finally:
+        if failures is not None:
+            failures.close()
@@ -0,0 +1,129 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, ClassVar, Dict, List, NamedTuple, Optional, Tuple
+
+import loguru
+from loguru import logger as glogger
+
+# TTL used when the answer carries none (implicit MX without DNS library)
+_DEFAULT_TTL: float = 300.0
+
+
+class MXRecord(NamedTuple):
+    """One mail exchanger of a domain.
+
+    ``port`` is always 25 for answers from DNS; custom lookups (e.g. in tests)
+    may point elsewhere.
+    """
+
+    preference: int
+    host: str
+    port: int = 25
+
+
+# returns the MX records of a domain and the seconds the answer may be cached; raises LookupError if the
+# domain does not exist and OSError for temporary resolution failures
+MXLookup = Callable[[str], Tuple[List[MXRecord], float]]
+
+
+def dns_mx_lookup(domain: str) -> Tuple[List[MXRecord], float]:
+    """Look up the MX records of ``domain`` in DNS.
+
+    Uses ``dnspython`` if it is installed. A domain without MX records gets
+    its implicit MX, the domain itself (RFC 5321, section 5.1); without
+    ``dnspython`` that is all this function can offer.
+
+    Raises:
+        LookupError: If the domain does not exist.
+        OSError: If the lookup failed temporarily (timeout, SERVFAIL).
+    """
+    try:
+        import dns.exception
+        import dns.resolver
+    except ImportError:
+        MXResolver.logger.warning("dnspython is not installed, using the implicit MX for {}", domain)
+        return [MXRecord(0, domain)], _DEFAULT_TTL
+
+    try:
+        answer = dns.resolver.resolve(domain, "MX")
+    except dns.resolver.NXDOMAIN as ex:
+        raise LookupError(f"{domain}: no such domain") from ex
+    except dns.resolver.NoAnswer:
+        return [MXRecord(0, domain)], _DEFAULT_TTL
+    except dns.exception.DNSException as ex:
+        raise OSError(f"MX lookup for {domain} failed: {ex}") from ex
+
+    records: List[MXRecord] = [MXRecord(rr.preference, rr.exchange.to_text(omit_final_dot=True)) for rr in answer]
+    return records, float(answer.rrset.ttl if answer.rrset is not None else _DEFAULT_TTL)
+
+
+@dataclass
+class MXResolver:
+    """Caching MX resolver used by :class:`MRSendmail` for direct delivery.
+
+    Answers of ``lookup`` are cached for their TTL, clamped to
+    ``[min_ttl, max_ttl]``; non-existent domains are remembered for
+    ``negative_ttl``. Temporary failures are not cached. Safe to share
+    between threads and mailers.
+
+    Attributes:
+        lookup: Function resolving a domain, see :data:`MXLookup`; defaults to
+            :func:`dns_mx_lookup`. Inject a fake one to point domains at test
+            servers.
+        min_ttl: Lower bound for the cache lifetime of an answer, in seconds.
+        max_ttl: Upper bound for the cache lifetime of an answer, in seconds.
+        negative_ttl: Cache lifetime of "no such domain", in seconds.
+        clock: Monotonic time source.
+
+    Example:
+        >>> resolver = MXResolver(lambda domain: ([MXRecord(10, "127.0.0.1", 2525)], 60.0))
+        >>> resolver.resolve("example.com")
+        [MXRecord(preference=10, host='127.0.0.1', port=2525)]
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    lookup: MXLookup = dns_mx_lookup
+    min_ttl: float = 5.0
+    max_ttl: float = 3600.0
+    negative_ttl: float = 60.0
+    clock: Callable[[], float] = time.monotonic
+
+    _cache: Dict[str, Tuple[float, List[MXRecord] | str]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def resolve(self, domain: str) -> List[MXRecord]:
+        """Return the mail exchangers of ``domain``, most preferred first.
+
+        Raises:
+            LookupError: If the domain does not exist.
+            OSError: If the lookup failed temporarily.
+        """
+        domain = domain.lower()
+        now: float = self.clock()
+        with self._lock:
+            cached: Optional[Tuple[float, List[MXRecord] | str]] = self._cache.get(domain)
+        if cached is not None and cached[0] > now:
+            if isinstance(cached[1], str):
+                # a fresh exception per hit: re-raising one instance would pile up tracebacks across threads
+                raise LookupError(cached[1])
+            return cached[1]
+
+        try:
+            records, ttl = self.lookup(domain)
+        except LookupError as ex:
+            with self._lock:
+                self._cache[domain] = (now + self.negative_ttl, str(ex))
+            raise
+
+        records = sorted(records, key=lambda r: r.preference)
+        self.logger.debug("MX {}: {} (ttl={})", domain, records, ttl)
+        with self._lock:
+            self._cache[domain] = (now + min(self.max_ttl, max(self.min_ttl, ttl)), records)
+        return records
+
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        with self._lock:
+            self._cache.clear()
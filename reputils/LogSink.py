@@ -0,0 +1,298 @@
+import datetime
+import json
+import queue
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, TextIO, Tuple
+
+if TYPE_CHECKING:
+    from .MailReport import MRSendmail
+
+DropPolicy = Literal["block", "drop_new", "drop_oldest"]
+
+# extra keys the default configuration binds on every record; not repeated in the JSON lines
+_INTERNAL_EXTRA: frozenset[str] = frozenset({"classname", "skiplog", "_json"})
+
+
+def json_line_format(record: Dict[str, Any]) -> str:
+    """loguru ``format=`` callable rendering each record as one JSON object per line.
+
+    Keys: ``time`` (ISO 8601), ``level``, ``module``, ``classname``,
+    ``function``, ``line``, ``thread``, ``message``, the remaining bound
+    ``extra`` values and, if present, the formatted ``exception``.
+    """
+    extra: Dict[str, Any] = record["extra"]
+    doc: Dict[str, Any] = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "module": record["module"],
+        "classname": extra.get("classname"),
+        "function": record["function"],
+        "line": record["line"],
+        "thread": record["thread"].name,
+        "message": record["message"],
+    }
+    for key, value in extra.items():
+        if key not in _INTERNAL_EXTRA:
+            doc[key] = value
+    if record["exception"] is not None:
+        exc_type, exc_value, exc_tb = record["exception"]
+        doc["exception"] = "".join(traceback.format_exception(exc_type, exc_value, exc_tb))
+
+    # loguru formats the returned template with the record; park the JSON in extra so braces in it survive
+    extra["_json"] = json.dumps(doc, default=str, ensure_ascii=False)
+    return "{extra[_json]}\n"
+
+
+@dataclass
+class BackgroundSink:
+    """loguru sink that hands messages to a writer thread through a bounded queue.
+
+    Logging threads only enqueue the formatted message; the writer thread
+    writes whatever has accumulated in one go and flushes once per batch, so
+    workers no longer serialize on writes to a slow or contended stream.
+    When the queue is full, ``drop_policy`` decides: ``"block"`` waits for
+    room, ``"drop_new"`` discards the incoming message and ``"drop_oldest"``
+    discards the oldest queued one. Discarded messages are counted in
+    ``dropped`` and reported on the stream when the sink stops.
+
+    loguru calls :meth:`stop` when the handler is removed (also at
+    interpreter exit), which writes out everything still queued.
+
+    Attributes:
+        stream: Where the messages are written, e.g. ``sys.stderr``.
+        maxsize: Capacity of the queue, in messages.
+        drop_policy: What to do when the queue is full.
+        batch_size: Most messages written per flush.
+
+    Example:
+        >>> logger.add(BackgroundSink(sys.stderr, maxsize=50_000), format="{message}")
+    """
+
+    stream: TextIO
+    maxsize: int = 10_000
+    drop_policy: DropPolicy = "drop_new"
+    batch_size: int = 512
+
+    dropped: int = field(default=0, init=False)
+    _queue: "queue.Queue[Optional[str]]" = field(init=False, repr=False)
+    _thread: threading.Thread = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.drop_policy not in ("block", "drop_new", "drop_oldest"):
+            raise ValueError(f"unknown drop policy {self.drop_policy!r}")
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        self._thread = threading.Thread(target=self._run, name="reputils-logsink", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        """Queue ``message`` (called by loguru on the logging thread)."""
+        if self.drop_policy == "block":
+            self._queue.put(message)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                if self.drop_policy == "drop_new":
+                    self._count_drop()
+                    return
+            try:
+                self._queue.get_nowait()
+                self._count_drop()
+            except queue.Empty:
+                pass
+
+    def stop(self) -> None:
+        """Write out the queued messages and end the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+        if self.dropped:
+            self.stream.write(f"[reputils] {self.dropped} log messages dropped, the log queue was full\n")
+            self.stream.flush()
+
+    def _count_drop(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch: List[str] = []
+            item: Optional[str] = self._queue.get()
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.stream.write("".join(batch))
+                    self.stream.flush()
+                except (OSError, ValueError):  # stream closed or broken; nothing sensible left to do
+                    pass
+            if item is None:
+                return
+
+
+@dataclass
+class _DigestEntry:
+    level: str
+    location: str
+    message: str
+    exception: Optional[str]
+    first: datetime.datetime
+    last: datetime.datetime
+    count: int = 1
+
+
+@dataclass
+class MailDigestSink:
+    """loguru sink that mails batched digests of log records through an :class:`MRSendmail`.
+
+    Records are coalesced by fingerprint (level, location and message): a
+    repeated record only bumps the count and last-seen time of its entry.
+    The entries live in a bounded ring of ``max_records``; beyond that the
+    oldest entry is evicted and accounted in the next digest. A digest is
+    mailed ``flush_interval`` seconds after the first record of a batch, or
+    as soon as ``flush_size`` distinct entries have accumulated, so an
+    incident storm yields a handful of mails instead of one per record.
+
+    Mails are sent from a background thread; the logging call site only
+    takes a short lock. Records logged on that thread (e.g. by the mailer
+    itself) are ignored, and a digest that cannot be delivered is dropped
+    and counted in ``failed_digests``. loguru calls :meth:`stop` when the
+    handler is removed (also at interpreter exit), which mails what is
+    still buffered.
+
+    Attributes:
+        mailer: Sends the digests; its recipients, sender and server are
+            used, the subject is generated.
+        max_records: Most distinct entries held between two digests.
+        flush_size: Distinct entries that trigger a digest right away.
+        flush_interval: Seconds between the first buffered record and its
+            digest.
+        subject_prefix: Prepended to the generated subject.
+
+    Example:
+        >>> logger.add(MailDigestSink(alert_mailer, flush_interval=300), level="ERROR", format="{message}")
+    """
+
+    mailer: MRSendmail
+    max_records: int = 1000
+    flush_size: int = 100
+    flush_interval: float = 60.0
+    subject_prefix: str = "[reputils] "
+
+    evicted: int = field(default=0, init=False)
+    sent_digests: int = field(default=0, init=False)
+    failed_digests: int = field(default=0, init=False)
+    _entries: "OrderedDict[Tuple[str, str, str], _DigestEntry]" = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _deadline: Optional[float] = field(default=None, init=False, repr=False)
+    _stopping: bool = field(default=False, init=False, repr=False)
+    _cond: threading.Condition = field(default_factory=threading.Condition, init=False, repr=False)
+    _thread: threading.Thread = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.max_records < 1 or self.flush_size < 1 or self.flush_interval <= 0:
+            raise ValueError(f"invalid digest limits: {self.max_records=} {self.flush_size=} {self.flush_interval=}")
+        self._thread = threading.Thread(target=self._run, name="reputils-maildigest", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        """Buffer the record of ``message`` (called by loguru on the logging thread)."""
+        if threading.current_thread() is self._thread:
+            return
+        record: Dict[str, Any] = message.record  # type: ignore[attr-defined]
+        level: str = record["level"].name
+        location: str = f"{record['name']}:{record['function']}:{record['line']}"
+        text: str = record["message"]
+        key: Tuple[str, str, str] = (level, location, text)
+
+        with self._cond:
+            entry: Optional[_DigestEntry] = self._entries.get(key)
+            if entry is not None:
+                entry.count += 1
+                entry.last = record["time"]
+                return
+
+            exception: Optional[str] = None
+            if record["exception"] is not None:
+                exception = "".join(traceback.format_exception(*record["exception"]))
+            if len(self._entries) >= self.max_records:
+                self.evicted += self._entries.popitem(last=False)[1].count
+            self._entries[key] = _DigestEntry(level, location, text, exception, record["time"], record["time"])
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.flush_interval
+            if len(self._entries) == 1 or len(self._entries) >= self.flush_size:
+                self._cond.notify()  # start the timer, or flush right away
+
+    def stop(self) -> None:
+        """Mail what is still buffered and end the background thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping and (
+                    self._deadline is None
+                    or (len(self._entries) < self.flush_size and time.monotonic() < self._deadline)
+                ):
+                    self._cond.wait(None if self._deadline is None else self._deadline - time.monotonic())
+                entries: List[_DigestEntry] = list(self._entries.values())
+                evicted: int = self.evicted
+                self._entries.clear()
+                self.evicted = 0
+                self._deadline = None
+                stopping: bool = self._stopping
+
+            if entries or evicted:
+                self._send(entries, evicted)
+            if stopping:
+                return
+
+    def _send(self, entries: List[_DigestEntry], evicted: int) -> None:
+        from .MailReport import MailSpec
+
+        total: int = sum(e.count for e in entries) + evicted
+        lines: List[str] = [f"{total} log records, {len(entries)} distinct, on {socket.gethostname()}"]
+        if evicted:
+            lines.append(f"{evicted} further records were evicted from the buffer (max_records={self.max_records})")
+        for e in entries:
+            lines += [
+                "",
+                f"[{e.level}] x{e.count}  {e.location}",
+                f"    first {e.first.isoformat()}  last {e.last.isoformat()}",
+                *(f"    {line}" for line in e.message.splitlines()),
+                *(f"    {line}" for line in (e.exception or "").splitlines()),
+            ]
+
+        try:
+            self.mailer.send_many(
+                [
+                    MailSpec(
+                        subject=f"{self.subject_prefix}{total} log records ({len(entries)} distinct)",
+                        txt="\n".join(lines),
+                    )
+                ]
+            )
+            self.sent_digests += 1
+        except Exception as ex:  # never let a broken relay take the logging machinery down
+            self.failed_digests += 1
+            sys.stderr.write(f"[reputils] could not mail log digest of {total} records: {ex!r}\n")
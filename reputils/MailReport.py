@@ -1,9 +1,27 @@
+import asyncio
+import base64
+import copy
 import datetime
-
+import hashlib
+import mmap
+import os
+import queue
+import re
 import smtplib
+import socket
 import ssl
-from dataclasses import dataclass, field
-from email import charset, encoders, utils
+import threading
+import time
+import uuid
+import weakref
+import zipfile
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from email import charset, encoders, policy, utils
+from email.generator import BytesGenerator
 from email.message import EmailMessage
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
@@ -11,8 +29,26 @@ from email.mime.text import MIMEText
 from email.utils import format_datetime as formatdate_ext
 from email.utils import formataddr as formataddr_ext
 from email.utils import parseaddr
+from io import BytesIO
 from pathlib import Path
-from typing import List, Optional, Tuple, Dict, ClassVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    List,
+    Optional,
+    Tuple,
+    Dict,
+    ClassVar,
+    FrozenSet,
+    Deque,
+    Iterable,
+    Iterator,
+    Literal,
+    Callable,
+    NamedTuple,
+    Sequence,
+    overload,
+)
 
 # from dateutil.tz import gettz
 import pytz
@@ -20,6 +56,12 @@ import pytz
 import loguru
 from loguru import logger as glogger
 
+from .AsyncSMTP import AsyncSMTPClient, _CRLF, _PIPELINE_BATCH, _dotstuff, _envelope_commands, _re_bare_address
+
+if TYPE_CHECKING:
+    from .DirectMX import MXRecord, MXResolver
+    from .Outbox import Outbox
+
 # logger_fmt: str = "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{module}</cyan>::<cyan>{extra[classname]}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
 # # logger_fmt: str = "<g>{time:HH:mm:ssZZ}</> | <lvl>{level}</> | <c>{module}::{extra[classname]}:{function}:{line}</> - {message}"
 #
@@ -47,8 +89,68 @@ from loguru import logger as glogger
 _csqp = charset.Charset("utf-8")
 _csqp.header_encoding = charset.QP
 _csqp.body_encoding = charset.QP
+# utf-8 bodies sent as they are (7bit or 8bit transfer encoding), for servers with 8BITMIME
+_cs8bit = charset.Charset("utf-8")
+_cs8bit.body_encoding = None  # type: ignore[assignment]  # typeshed omits None
+# RFC 5322 line limit (without CRLF); longer lines must not be sent as 8bit
+_MAX_LINE_LENGTH: int = 998
 _tzberlin: datetime.tzinfo = pytz.timezone("Europe/Berlin")
 
+# 57 raw bytes make one 76 character base64 line; 1024 lines per chunk
+_ATTACHMENT_CHUNK_SIZE: int = 57 * 1024
+# placeholders for a streamed part's body and for the value of its Content-Transfer-Encoding header (kept short
+# enough that the header is not folded)
+_re_stream_token_b: re.Pattern[bytes] = re.compile(
+    rb"(reputils-streamed-attachment-[0-9a-f]{32}|reputils-cte-[0-9a-f]{32})"
+)
+# smallest BDAT chunk (RFC 3030) worth a round trip; smaller pieces are coalesced
+_BDAT_CHUNK_SIZE: int = 256 * 1024
+
+CompressionFormat = Literal["gzip", "zip"]
+_COMPRESSION_TYPES: Dict[str, Tuple[str, str]] = {
+    "gzip": ("application/gzip", ".gz"),
+    "zip": ("application/zip", ".zip"),
+}
+# text formats our reports are exported as; they typically shrink 5-20x
+_COMPRESSIBLE_SUFFIXES: FrozenSet[str] = frozenset(
+    {
+        ".csv",
+        ".tsv",
+        ".txt",
+        ".log",
+        ".json",
+        ".jsonl",
+        ".ndjson",
+        ".xml",
+        ".html",
+        ".htm",
+        ".sql",
+        ".yaml",
+        ".yml",
+        ".md",
+    }
+)
+
+# headers that differ per recipient when sending a compiled MessageSkeleton
+_SKELETON_VARIABLE_HEADERS: frozenset[bytes] = frozenset({b"message-id", b"to", b"date"})
+_wire_policy: policy.Compat32 = policy.compat32.clone(linesep="\r\n")
+
+
+class InvalidAddress(NamedTuple):
+    """An entry :meth:`EmailAddress.parse_many` could not parse: ``(line, raw, reason)``."""
+
+    line: int
+    raw: str
+    reason: str
+
+
+class RecipientError(NamedTuple):
+    """One refused recipient of a :class:`SendResult`: ``(email, code, message)``."""
+
+    email: str
+    code: int
+    message: str
+
 
 # using slots=True lets my ide choke
 # @dataclass(slots=True)
@@ -71,6 +173,15 @@ class SendResult:
             Collected exceptions raised by the SMTP layer while sending. May be
             ``None`` when no failures occurred or when the sending code opted
             not to keep exception details.
+        timings (dict[str, float]):
+            Seconds spent per phase of the send: ``compose``, ``connect``
+            (including name resolution and the greeting), ``tls``, ``auth``,
+            ``envelope`` and ``data``. Phases that did not happen (e.g. the
+            handshake on a reused pooled connection) are absent; phases that
+            happened more than once (recipient chunking) are summed.
+        bytes_sent (int):
+            Size of the message data handed to ``DATA``, summed over all
+            transactions.
 
     Notes:
         - Use ``get_all_errors()`` to flatten per-recipient SMTP errors into a
@@ -78,6 +189,10 @@ class SendResult:
         - Use ``get_error_for_recipient()`` to look up an individual
           recipient's SMTP error.
         - ``all_succeeded()`` is a convenience to check for zero failures.
+        - The per-recipient errors are decoded once into an index keyed by
+          bare address, which all lookups share; it is rebuilt only when
+          ``fail_exceptions`` is replaced or grows. ``failed_recipients()``,
+          ``codes_histogram()`` and ``iter_errors()`` give bulk access.
     """
 
     num_recipients: int
@@ -85,6 +200,31 @@ class SendResult:
     fail_exceptions: Optional[
         List[smtplib.SMTPRecipientsRefused | smtplib.SMTPSenderRefused | smtplib.SMTPResponseException]
     ] = field(default=None)
+    timings: Dict[str, float] = field(default_factory=dict, compare=False)
+    bytes_sent: int = field(default=0, compare=False)
+
+    _index: Dict[str, RecipientError] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # the list the index was built from and its length then; holding the list keeps its id from being reused
+    _indexed: Tuple[Optional[Sequence[object]], int] = field(default=(None, 0), init=False, repr=False, compare=False)
+
+    def _errors(self) -> Dict[str, RecipientError]:
+        """Return the per-recipient index, building it if ``fail_exceptions`` changed."""
+        exceptions = self.fail_exceptions
+        indexed, indexed_len = self._indexed
+        if exceptions is indexed and (exceptions is None or len(exceptions) == indexed_len):
+            return self._index
+
+        index: Dict[str, RecipientError] = {}
+        for ex in exceptions or ():
+            recdict: Optional[Dict[str, Tuple[int, bytes]]] = getattr(ex, "recipients", None)
+            for rcpt, (errorcode, errormsg) in (recdict or {}).items():
+                email: str = parseaddr(rcpt)[1] or rcpt  # envelope recipients may be in display-name form
+                if email not in index:  # first match wins
+                    index[email] = RecipientError(email, errorcode, errormsg.decode("utf-8", "replace"))
+
+        self._index = index
+        self._indexed = (exceptions, len(exceptions) if exceptions is not None else 0)
+        return index
 
     def get_all_errors(self) -> List[Tuple[str, int, str]]:
         """Collect all per-recipient SMTP errors from the send attempt.
@@ -97,8 +237,9 @@ class SendResult:
 
         Returns:
             list[tuple[str, int, str]]: A list of ``(email, code, message)``
-            tuples. Returns an empty list when there are no recorded failures
-            or when none of the exceptions include per-recipient details.
+            tuples (:class:`RecipientError`), one per recipient. Returns an
+            empty list when there are no recorded failures or when none of
+            the exceptions include per-recipient details.
 
         Notes:
             - Only exceptions that provide a ``recipients`` attribute are
@@ -106,19 +247,11 @@ class SendResult:
             - Error messages are decoded from bytes using UTF-8 (messages may
               also be ASCII-compatible).
         """
-        ret: List[Tuple[str, int, str]] = []
-
         if self.fail_exceptions is None:
             glogger.debug("self.fail_exceptions is None")
-            return ret
-
-        for ex in self.fail_exceptions:
-            if hasattr(ex, "recipients"):
-                recdict: Dict[str, Tuple[int, bytes]] = ex.recipients
-                for email, (errorcode, errormsg) in recdict.items():
-                    ret.append((email, errorcode, errormsg.decode("utf-8")))  # may also be ascii
+            return []
 
-        return ret
+        return list(self._errors().values())
 
     def get_error_for_recipient(self, recipient: EmailAddress) -> Tuple[int, str] | None:
         """Return the SMTP error for a specific recipient, if available.
@@ -143,14 +276,38 @@ class SendResult:
         if self.fail_exceptions is None:
             return None
 
-        for ex in self.fail_exceptions:
-            if hasattr(ex, "recipients"):
-                recdict: Dict[str, Tuple[int, bytes]] = ex.recipients
-                if recipient.email in recdict:
-                    p: Tuple[int, bytes] = recdict[recipient.email]
-                    return p[0], p[1].decode("utf-8")  # may also be ascii
+        err: Optional[RecipientError] = self._errors().get(recipient.email)
+        return None if err is None else (err.code, err.message)
 
-        return None
+    def failed_recipients(self) -> frozenset[str]:
+        """Addresses with a per-recipient error.
+
+        Returns:
+            frozenset[str]: The bare addresses (without display name).
+        """
+        return frozenset(self._errors())
+
+    def codes_histogram(self) -> Dict[int, int]:
+        """Count the per-recipient errors by SMTP reply code.
+
+        Returns:
+            dict[int, int]: ``{code: number_of_recipients}``.
+        """
+        return dict(Counter(err.code for err in self._errors().values()))
+
+    def iter_errors(self, status_class: Optional[int] = None) -> Iterator[RecipientError]:
+        """Iterate the per-recipient errors, optionally of one status class only.
+
+        Args:
+            status_class: ``4`` for transient (4xx) or ``5`` for permanent
+                (5xx) failures; ``None`` for all.
+
+        Yields:
+            RecipientError: ``(email, code, message)`` per refused recipient.
+        """
+        for err in self._errors().values():
+            if status_class is None or err.code // 100 == status_class:
+                yield err
 
     def all_succeeded(self) -> bool:
         """Whether delivery succeeded for all recipients.
@@ -169,6 +326,32 @@ class SendResult:
         """
         return self.num_failed == self.num_recipients
 
+    @staticmethod
+    def merged(parts: Iterable[SendResult]) -> SendResult:
+        """Combine the results of several transactions of one message.
+
+        Used when the recipients of a message are split across multiple SMTP
+        transactions: counts, timings and bytes are summed and the exceptions
+        of all parts are concatenated, so the per-recipient lookups cover
+        every part.
+
+        Args:
+            parts: Results of the individual transactions.
+
+        Returns:
+            SendResult: A new result spanning all parts.
+        """
+        ret: SendResult = SendResult(num_recipients=0, num_failed=0)
+        for part in parts:
+            ret.num_recipients += part.num_recipients
+            ret.num_failed += part.num_failed
+            ret.bytes_sent += part.bytes_sent
+            for phase, seconds in part.timings.items():
+                ret.timings[phase] = ret.timings.get(phase, 0.0) + seconds
+            if part.fail_exceptions:
+                ret.fail_exceptions = (ret.fail_exceptions or []) + part.fail_exceptions
+        return ret
+
 
 @dataclass
 class EmailAddress:
@@ -179,6 +362,10 @@ class EmailAddress:
     helpers to parse and format addresses using the same policy as the
     standard library email utilities with proper encoding.
 
+    The formatted form is memoized (and recomputed when ``email`` or
+    ``name`` change), since the same addresses are formatted for several
+    headers and the envelope of every send.
+
     Attributes:
         email: The mailbox part of the address (e.g., ``user@example.com``).
         name: Optional human-readable display name (e.g., ``"Jane Doe"``).
@@ -187,6 +374,9 @@ class EmailAddress:
     email: str
     name: Optional[str] = None
 
+    # (name, email, formatted) of the last formataddr_self() call
+    _formatted: Optional[Tuple[Optional[str], str, str]] = field(default=None, init=False, repr=False, compare=False)
+
     @staticmethod
     def from_str(ema: str) -> EmailAddress:
         """Create an ``EmailAddress`` from a string.
@@ -217,6 +407,10 @@ class EmailAddress:
         Returns:
             The formatted address string, e.g., ``"Jane Doe" <user@example.com>``.
         """
+        if not ema.email.isascii():
+            # internationalized address (RFC 6531): deliverable over SMTPUTF8 only, which takes it as it is
+            name: str = formataddr_ext((ema.name, ""), _csqp).removesuffix(" <>") if ema.name else ""
+            return f"{name} <{ema.email}>" if name else ema.email
         return formataddr_ext((ema.name, ema.email), _csqp)
 
     def formataddr_self(self) -> str:
@@ -225,7 +419,73 @@ class EmailAddress:
         Returns:
             The RFC 2822 formatted address string for ``self``.
         """
-        return EmailAddress.formataddr(self)
+        cached = self._formatted
+        if cached is not None and cached[0] == self.name and cached[1] == self.email:
+            return cached[2]
+        formatted: str = EmailAddress.formataddr(self)
+        self._formatted = (self.name, self.email, formatted)
+        return formatted
+
+    def envelope(self) -> str:
+        """The address as used in the SMTP envelope (``MAIL FROM``/``RCPT TO``).
+
+        Returns:
+            The bare mailbox, without display name.
+        """
+        return self.email
+
+    @staticmethod
+    def parse_many(
+        source: Iterable[str] | Path, invalid: Optional[List[InvalidAddress]] = None
+    ) -> Iterator[EmailAddress]:
+        """Parse and validate addresses one per line, lazily.
+
+        Accepts plain mailboxes and display-name forms. Plain mailboxes (the
+        bulk of typical recipient lists) are recognized with a single regular
+        expression; only the others go through ``email.utils.parseaddr``.
+        Blank lines and lines starting with ``#`` are skipped.
+
+        Args:
+            source: An iterable of address strings (e.g. an open text file)
+                or the path of a UTF-8 text file.
+            invalid: If given, entries that do not yield a valid address are
+                appended to it instead of being dropped silently. Nothing is
+                raised for invalid entries.
+
+        Yields:
+            EmailAddress: One per valid entry, in input order.
+
+        Example:
+            >>> bad: list[InvalidAddress] = []
+            >>> mailer.bccs = list(EmailAddress.parse_many(Path("subscribers.txt"), invalid=bad))
+            >>> for line, raw, reason in bad:
+            ...     print(f"line {line}: {raw!r}: {reason}")
+        """
+        if isinstance(source, Path):
+            with source.open("r", encoding="utf-8") as file:
+                yield from EmailAddress.parse_many(file, invalid)
+            return
+
+        for lineno, raw in enumerate(source, 1):
+            entry: str = raw.strip()
+            if not entry or entry.startswith("#"):
+                continue
+
+            if _re_bare_address.fullmatch(entry):
+                yield EmailAddress(entry)
+                continue
+
+            name, addr = parseaddr(entry)
+            if not addr:
+                reason: str = "unparsable"
+            elif not _re_bare_address.fullmatch(addr):
+                reason = f"invalid mailbox {addr!r}"
+            else:
+                yield EmailAddress(addr, name or None)
+                continue
+
+            if invalid is not None:
+                invalid.append(InvalidAddress(lineno, raw.rstrip("\r\n"), reason))
 
 
 def _formatdate(dt: datetime.datetime, tz: datetime.tzinfo = _tzberlin) -> str:  # type: ignore
@@ -250,6 +510,10 @@ def _formatdate(dt: datetime.datetime, tz: datetime.tzinfo = _tzberlin) -> str:
     # return formataddr_ext((addr, addr))
 
 
+# see SMTPServerInfo.connection_key()
+_ConnectionKey = Tuple[str, int, Optional[str], Optional[str], bool, bool, bool]
+
+
 @dataclass
 class SMTPServerInfo:
     """SMTP server configuration.
@@ -260,9 +524,25 @@ class SMTPServerInfo:
         smtp_user: Optional username for authentication.
         smtp_pass: Optional password for authentication.
         use_start_tls: Whether to upgrade the connection via STARTTLS.
+        use_implicit_tls: Whether to speak TLS from the first byte
+            ("SMTPS", usually port 465) instead of upgrading via STARTTLS.
+            Mutually exclusive with ``use_start_tls``.
         wantsdebug: If true, enables SMTP debug output on the connection.
-        ignoresslerrors: If true, disables certificate verification when
-            using STARTTLS (use with caution).
+        ignoresslerrors: If true, disables certificate verification for
+            STARTTLS and implicit TLS (use with caution).
+        max_recipients_per_transaction: Most ``RCPT TO`` commands the server
+            accepts in one transaction; longer recipient lists are split into
+            several transactions. ``None`` means no limit.
+        metrics_hook: Called as ``metrics_hook(serverinfo, result)`` after
+            every message sent to this server, e.g. a :class:`MetricsRegistry`
+            or a bridge to an external metrics system. Exceptions raised by
+            the hook are logged and otherwise ignored.
+
+    Notes:
+        - The SSL context is built once per TLS configuration and shared by
+          all connections; the TLS session of the last connection to a
+          server is offered on the next one, so repeated (unpooled) sends
+          get an abbreviated handshake when the server supports resumption.
     """
 
     smtp_server: str
@@ -272,6 +552,37 @@ class SMTPServerInfo:
     use_start_tls: bool = False
     wantsdebug: bool = False
     ignoresslerrors: bool = True
+    max_recipients_per_transaction: Optional[int] = None
+    metrics_hook: Optional[Callable[[SMTPServerInfo, SendResult], None]] = field(
+        default=None, repr=False, compare=False
+    )
+    use_implicit_tls: bool = False
+
+    def __post_init__(self) -> None:
+        if self.use_start_tls and self.use_implicit_tls:
+            raise ValueError("use_start_tls and use_implicit_tls are mutually exclusive")
+
+    def connection_key(self) -> _ConnectionKey:
+        """Return the identity of the SMTP session this configuration yields.
+
+        Two ``SMTPServerInfo`` instances with the same key produce
+        interchangeable, authenticated sessions, which is what
+        :class:`SMTPConnectionPool` uses to group idle connections.
+        ``wantsdebug``, ``max_recipients_per_transaction`` and ``metrics_hook``
+        are deliberately not part of the key.
+
+        Returns:
+            A hashable tuple of host, port, credentials and TLS settings.
+        """
+        return (
+            self.smtp_server,
+            self.smtp_port,
+            self.smtp_user,
+            self.smtp_pass,
+            self.use_start_tls,
+            self.ignoresslerrors,
+            self.use_implicit_tls,
+        )
 
     # @validator('mailfrom', pre=True, always=True)
     # def set_default_mailfrom(cls, v):
@@ -285,350 +596,2813 @@ class SMTPServerInfo:
     #         return v
 
 
-@dataclass
-class MRSendmail:
-    """Compose and send RFC 5322/RFC 2047 compliant email via SMTP.
+# SSL contexts per TLS configuration (currently just ``ignoresslerrors``): creating one loads the system CA
+# bundle, which costs milliseconds per call. Contexts are safe to share between threads and connections.
+_ssl_contexts: Dict[bool, ssl.SSLContext] = {}
+# last TLS session per (host, port, ignoresslerrors), offered for resumption on the next connection
+_tls_sessions: Dict[Tuple[str, int, bool], ssl.SSLSession] = {}
+_tls_lock: threading.Lock = threading.Lock()
 
-    MRSendmail helps you construct MIME messages (plain text and/or HTML), add
-    attachments, and populate common headers (``From``, ``Reply-To``,
-    ``Return-Path``, ``To``, ``Cc``). It then connects to a configured SMTP
-    server to deliver the message, optionally enabling STARTTLS and
-    authentication according to :class:`SMTPServerInfo`.
 
-    Key behavior
-    - ``returnpath`` is used as the SMTP envelope sender (``MAIL FROM``) and
-      is also written to the ``Return-Path`` header.
-    - If ``senderfrom`` is not provided, ``From`` defaults to ``returnpath``.
-    - Recipients used for SMTP delivery are the union of ``tos``, ``ccs`` and
-      ``bccs``. ``bccs`` are not written to headers.
-    - The class emits logs via ``loguru``; you can opt-in to per-call verbose
-      logging in :meth:`send`.
+def _ssl_context(serverinfo: SMTPServerInfo) -> ssl.SSLContext:
+    """Return the (shared) SSL context used for TLS with ``serverinfo``."""
+    context: Optional[ssl.SSLContext] = _ssl_contexts.get(serverinfo.ignoresslerrors)
+    if context is not None:
+        return context
 
-    Attributes:
-        serverinfo: SMTP connectivity and security parameters.
-        returnpath: Address used for SMTP envelope sender (``MAIL FROM``) and
-            ``Return-Path`` header.
-        subject: Message subject line.
-        senderfrom: Optional ``From`` header; falls back to ``returnpath`` if
-            omitted.
-        replyto: Optional ``Reply-To`` header address.
-        tos: Primary recipient addresses (``To``).
-        ccs: Carbon-copy recipient addresses (``Cc``).
-        bccs: Blind carbon-copy recipient addresses; used for SMTP only, not
-            added to headers.
+    with _tls_lock:
+        context = _ssl_contexts.get(serverinfo.ignoresslerrors)
+        if context is None:
+            # context = ssl._create_unverified_context()
+            context = ssl.create_default_context()
+            # context.verify_mode = ssl.CERT_NONE
+            if serverinfo.ignoresslerrors:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            _ssl_contexts[serverinfo.ignoresslerrors] = context
+        return context
 
-    Example:
-        >>> mailer = MRSendmail(
-        ...     serverinfo=SMTPServerInfo(hostname="smtp.example.com"),
-        ...     returnpath=EmailAddress.from_str("no-reply@example.com"),
-        ...     subject="Hello"
-        ... )
-        >>> mailer.add_to(EmailAddress.from_str("Alice <alice@example.com>"))
-        >>> raw, result = mailer.send(txt="Hi there")
-        >>> result.all_succeeded()
-        True
-    """
 
-    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+def _tls_session(serverinfo: SMTPServerInfo) -> Optional[ssl.SSLSession]:
+    """Return the TLS session to offer for resumption on a new connection to ``serverinfo``."""
+    return _tls_sessions.get((serverinfo.smtp_server, serverinfo.smtp_port, serverinfo.ignoresslerrors))
 
-    serverinfo: SMTPServerInfo
-    returnpath: EmailAddress  # das ist der im MAIL FROM: header im smtp
-    subject: str = ""
-    senderfrom: Optional[EmailAddress] = None  # das ist der From-Header im Header der E-Mail
-    replyto: Optional[EmailAddress] = None
 
-    tos: list[EmailAddress] = field(default_factory=list)
-    ccs: list[EmailAddress] = field(default_factory=list)
-    bccs: list[EmailAddress] = field(default_factory=list)
+def _remember_tls_session(serverinfo: SMTPServerInfo, sock: Optional[socket.socket]) -> None:
+    """Keep the TLS session of ``sock`` (if any) for the next connection to ``serverinfo``."""
+    session: Optional[ssl.SSLSession] = sock.session if isinstance(sock, ssl.SSLSocket) else None
+    if session is not None:
+        with _tls_lock:
+            _tls_sessions[(serverinfo.smtp_server, serverinfo.smtp_port, serverinfo.ignoresslerrors)] = session
 
-    def add_to(self, receiver: EmailAddress) -> None:
-        """Add a primary recipient.
 
-        Args:
-            receiver: Address to append to the ``To`` list.
-        """
-        self.tos.append(receiver)
+class _SMTPImplicitTLS(smtplib.SMTP_SSL):
+    """``SMTP_SSL`` that offers a TLS session for resumption in the handshake."""
 
-    def add_cc(self, cc: EmailAddress) -> None:
-        """Add a carbon-copy recipient.
+    def __init__(
+        self, host: str, port: int, context: ssl.SSLContext, tls_session: Optional[ssl.SSLSession] = None
+    ) -> None:
+        self.tls_session: Optional[ssl.SSLSession] = tls_session  # needed by _get_socket() during __init__
+        super().__init__(host, port, context=context)
 
-        Args:
-            cc: Address to append to the ``Cc`` list.
-        """
-        self.ccs.append(cc)
+    def _get_socket(self, host: str, port: int, timeout: float) -> socket.socket:
+        sock: socket.socket = socket.create_connection((host, port), timeout, self.source_address)
+        try:
+            return self.context.wrap_socket(sock, server_hostname=self._host, session=self.tls_session)  # type: ignore[attr-defined]
+        except BaseException:
+            sock.close()
+            raise
 
-    def add_bcc(self, bcc: EmailAddress) -> None:
-        """Add a blind carbon-copy recipient.
 
-        Args:
-            bcc: Address to append to the ``Bcc`` list (not exposed in headers).
-        """
-        self.bccs.append(bcc)
+def _smtp_starttls(server: smtplib.SMTP, context: ssl.SSLContext, session: Optional[ssl.SSLSession]) -> None:
+    """``SMTP.starttls`` that offers ``session`` for resumption in the handshake.
 
-    def send(
-        self,
-        txt: Optional[str] = None,
-        html: Optional[str] = None,
-        files: Optional[List[Path]] = None,
-        msgid: Optional[str] = None,
-        wantsdebuglogging: bool = False,
-        wants_smtp_level_debug: bool = False,
-        additional_headers: Optional[Dict[str, str]] = None,
-    ) -> Tuple[str, SendResult]:
-        """Build, deliver, and return the serialized email message.
+    Mirrors the exceptions of ``smtplib.SMTP.starttls``; EHLO must be repeated
+    afterwards.
+    """
+    server.ehlo_or_helo_if_needed()
+    if not server.has_extn("starttls"):
+        raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+    code, resp = server.docmd("STARTTLS")
+    if code != 220:
+        raise smtplib.SMTPResponseException(code, resp)
 
-        Compose a MIME message from the provided parts, send it using the
-        configured SMTP server, and return the raw RFC 5322 message as a
-        string together with a :class:`SendResult` detailing per-recipient
-        success or failure.
+    if server.sock is None:
+        raise smtplib.SMTPServerDisconnected("please run connect() first")
+    server.sock = context.wrap_socket(server.sock, server_hostname=server._host, session=session)  # type: ignore[attr-defined]
+    server.file = None
+    # RFC 3207: forget everything learned before the TLS negotiation
+    server.helo_resp = None
+    server.ehlo_resp = None
+    server.esmtp_features = {}
+    server.does_esmtp = False
 
-        Behavior
-        - Body: At least one of ``txt`` or ``html`` must be provided. If both
-          are provided, a ``multipart/alternative`` part is created. When
-          attachments are present, the top-level message becomes multipart and
-          attachments are added as base64-encoded ``application/octet-stream``.
-        - Headers: ``From``, ``To``, ``Date``, and ``Subject`` are set from the
-          instance fields. ``Reply-To`` and ``Return-Path`` are added when
-          available. Additional headers may be supplied via
-          ``additional_headers``.
-        - Message-ID: Uses provided ``msgid`` or generates one using the
-          sender domain.
-        - SMTP envelope: Sender is ``returnpath``; recipients are the union of
-          ``tos``, ``ccs``, and ``bccs``.
-        - Debugging: ``wants_smtp_level_debug`` enables low-level ``smtplib``
-          debug output for this call; ``wantsdebuglogging`` enables extra
-          application-level logging.
 
-        Args:
-            txt: Plaintext body content.
-            html: HTML body content.
-            files: File paths to attach to the message.
-            msgid: Explicit ``Message-ID`` to set; a suitable value is
-                generated if omitted.
-            wantsdebuglogging: Emit additional application-level debug logs for
-                this call.
-            wants_smtp_level_debug: Enable ``smtplib`` debug output
-                (``SMTP.set_debuglevel(1)``) for this connection.
-            additional_headers: Extra headers to add to the message.
+class _UTF8Compat32(policy.Compat32):
+    """``compat32`` writing non-ASCII header values as raw UTF-8 (RFC 6532) instead of RFC 2047 encoded words."""
 
-        Returns:
-            A tuple ``(raw_message, result)`` where ``raw_message`` is the full
-            RFC 5322 message string and ``result`` is a :class:`SendResult`
-            describing per-recipient delivery outcomes.
+    def fold_binary(self, name: str, value: Any) -> bytes:
+        if isinstance(value, str) and not value.isascii():
+            # compat32 writes values with surrogates through unchanged
+            value = value.encode("utf-8").decode("ascii", "surrogateescape")
+        return super().fold_binary(name, value)
 
-        Raises:
-            Exception: If both ``txt`` and ``html`` are ``None``.
-            OSError: If an attachment file cannot be read.
-            smtplib.SMTPException: For SMTP errors during connection/login/send.
 
-        Example:
-            >>> raw, res = mailer.send(
-            ...     txt="Hello",
-            ...     files=[Path("/tmp/report.txt")],
-            ...     wants_smtp_level_debug=False,
-            ... )
-            >>> res.all_succeeded()
-            True
-        """
+def _flatten(message: EmailMessage | MIMEMultipart, utf8: bool = False) -> memoryview:
+    """Serialize ``message`` for the wire exactly like ``SMTP.send_message`` does.
 
-        logger = self.logger.bind(skiplog=not wantsdebuglogging)  # self.logger is MRSendMail.logger
+    ``Bcc`` headers (never set by :class:`MRSendmail`) are not stripped here.
+    With ``utf8`` non-ASCII header values are written as raw UTF-8, for
+    servers that accept SMTPUTF8.
 
-        if txt is None and html is None:
-            raise Exception("either on of txt and html must not be null")
-        kk: int = 0
-        hastxtandhtml: bool = False
-        if txt is not None and html is not None:
-            hastxtandhtml = True
-        if txt is not None:
-            kk += 1
-        if html is not None:
-            kk += 1
-        if files is not None and len(files) > 0:
-            kk += 1
+    Returns:
+        A view on the flattened message. The generator writes into a
+        ``BytesIO`` (nested parts go through intermediate buffers first);
+        CPython's ``getvalue()`` then usually shares that buffer, but may
+        copy it once.
+    """
+    flatten_policy: Optional[policy.Policy] = None
+    if utf8:
+        flatten_policy = (
+            message.policy.clone(utf8=True) if isinstance(message, EmailMessage) else _UTF8Compat32()  # type: ignore[call-arg]
+        )
+    with BytesIO() as bytesmsg:
+        BytesGenerator(bytesmsg, policy=flatten_policy).flatten(message, linesep="\r\n")
+        return memoryview(bytesmsg.getvalue())
 
-        message: EmailMessage | MIMEMultipart = EmailMessage() if kk == 1 else MIMEMultipart()
 
-        ################ Set Headers ###################
-        fromme: EmailAddress = self.returnpath if not self.senderfrom else self.senderfrom
-        logger.debug(f"{fromme=}")
+def _header_value(value: str, utf8: bool = False) -> str:
+    """``value`` as given if it can go into a header unencoded, else RFC 2047 encoded.
 
-        fromdomain: str | None = None
+    Plain ASCII needs no encoding; with ``utf8`` neither does other text (it
+    is encoded when the message is flattened for a server without
+    SMTPUTF8). Control characters and text that looks like an encoded word
+    are always encoded.
+    """
+    if value.isprintable() and "=?" not in value and (utf8 or value.isascii()):
+        return value
+    return _csqp.header_encode(value)
+
+
+def _fits_8bit(text: str) -> bool:
+    """Whether ``text`` may be sent with 8bit transfer encoding (no line over ``_MAX_LINE_LENGTH`` bytes)."""
+    return max(map(len, text.encode("utf-8").splitlines()), default=0) <= _MAX_LINE_LENGTH
+
+
+def _text_part(text: str, subtype: str, eight_bit: bool) -> MIMEText:
+    """A ``text/<subtype>`` part; with ``eight_bit`` unencoded unless a line is too long for 8bit transport."""
+    if eight_bit and _fits_8bit(text):
+        return MIMEText(text, subtype, _cs8bit)  # type: ignore[arg-type]  # takes a Charset, too
+    return MIMEText(text, subtype)
+
+
+def _downgrade_8bit(message: EmailMessage | MIMEMultipart) -> EmailMessage | MIMEMultipart:
+    """Copy of ``message`` with every 8bit text part re-encoded as quoted-printable, for servers without 8BITMIME."""
+    message = copy.deepcopy(message)
+    for part in message.walk():
+        if part.is_multipart() or str(part.get("Content-Transfer-Encoding", "")).lower() != "8bit":
+            continue
+        payload: Any = part.get_payload(decode=True)
+        text: str = payload.decode(part.get_content_charset() or "utf-8", "replace")
+        del part["Content-Transfer-Encoding"]
+        part.set_payload(text, _csqp)
+    return message
+
+
+def _base64_size(n: int) -> int:
+    """Bytes ``n`` raw bytes take on the wire as base64 in 76 character CRLF terminated lines."""
+    encoded: int = (n + 2) // 3 * 4
+    return encoded + (encoded + 75) // 76 * 2
+
+
+class _ChunkSink:
+    """Write-only file object collecting what :class:`zipfile.ZipFile` writes, for streaming."""
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        yield from chunks
+
+
+def _iter_compressed(
+    path: Path, fmt: CompressionFormat, level: int, chunk_size: int = _ATTACHMENT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield ``path`` compressed as gzip or as a zip archive holding it, reading ``chunk_size`` bytes at a time."""
+    with open(path, "rb") as file:
+        if fmt == "gzip":
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            while block := file.read(chunk_size):
+                if out := compressor.compress(block):
+                    yield out
+            yield compressor.flush()
+            return
+
+        # an unseekable target makes zipfile write data descriptors, so the archive can be produced as a stream
+        sink: _ChunkSink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+            size: int = os.fstat(file.fileno()).st_size
+            with archive.open(path.name, "w", force_zip64=size >= zipfile.ZIP64_LIMIT) as entry:
+                while block := file.read(chunk_size):
+                    entry.write(block)
+                    yield from sink.drain()
+        yield from sink.drain()
+
+
+def _iter_base64(chunks: Iterable[bytes], chunk_size: int = _ATTACHMENT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Base64-encode a byte stream into CRLF terminated lines, ``chunk_size`` raw bytes (a multiple of 57) at a time."""
+    buffer: bytearray = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= chunk_size:
+            cut: int = len(buffer) - len(buffer) % chunk_size
+            yield base64.encodebytes(buffer[:cut]).replace(b"\n", _CRLF)
+            del buffer[:cut]
+    if buffer:
+        yield base64.encodebytes(buffer).replace(b"\n", _CRLF)
+
+
+class _StreamedAttachmentPart(MIMEBase):
+    """Attachment whose body is produced while sending.
+
+    The part only carries placeholders for its payload and for the value of
+    its ``Content-Transfer-Encoding`` header; :func:`_render` cuts the
+    flattened message at them. During DATA :meth:`iter_encoded` fills in the
+    base64 encoded file contents chunk by chunk; when the server accepts
+    BINARYMIME (RFC 3030) :meth:`iter_binary` sends the file as it is. With
+    ``compression`` (format and level) the file is compressed in the same
+    pass and the part is typed ``application/gzip`` resp. ``application/zip``.
+    """
 
-        if fromme:
-            message.add_header("From", fromme.formataddr_self())
-            fromdomain = fromme.formataddr_self().split("@")[1]
-        if self.replyto:
-            message.add_header("Reply-To", self.replyto.formataddr_self())
-            fromdomain = self.replyto.formataddr_self().split("@")[1]
-        if self.returnpath:
-            message.add_header("Return-Path", self.returnpath.formataddr_self())
-            fromdomain = self.returnpath.formataddr_self().split("@")[1]
+    def __init__(self, path: Path, compression: Optional[Tuple[CompressionFormat, int]] = None) -> None:
+        maintype, subtype = (
+            _COMPRESSION_TYPES[compression[0]][0] if compression else "application/octet-stream"
+        ).split("/")
+        super().__init__(maintype, subtype)
+        with open(path, "rb") as file:  # fail before connecting, like the eager read does
+            self.size: int = os.fstat(file.fileno()).st_size
+        self.path: Path = path
+        self.compression: Optional[Tuple[CompressionFormat, int]] = compression
+        uid: str = uuid.uuid4().hex
+        self.token: str = f"reputils-streamed-attachment-{uid}"
+        self.cte_token: str = f"reputils-cte-{uid}"
+        self.set_payload(self.token)
+        self.add_header("Content-Transfer-Encoding", self.cte_token)
+
+    def wire_size(self, binary: bool) -> Optional[int]:
+        """Bytes the body takes on the wire; ``None`` if compressed (unknown before compressing)."""
+        if self.compression is not None:
+            return None
+        return self.size if binary else _base64_size(self.size)
 
-        logger.debug(f"{fromdomain=}")
-        if msgid is not None:
-            # msg['message-id'] = utils.make_msgid(domain='mydomain.com')
-            message.add_header("Message-ID", msgid)
-        else:
-            msgid = utils.make_msgid(domain=fromdomain)
-            message.add_header("Message-ID", msgid)
+    def iter_binary(self, chunk_size: int = _ATTACHMENT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the (possibly compressed) file unencoded, ``chunk_size`` bytes at a time."""
+        if self.compression is not None:
+            yield from _iter_compressed(self.path, *self.compression, chunk_size=chunk_size)
+            return
+        with open(self.path, "rb") as file:
+            while block := file.read(chunk_size):
+                yield block
 
-        logger.debug(f"set Message-ID to {msgid=}")
+    def iter_encoded(self, chunk_size: int = _ATTACHMENT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the base64 encoded file in CRLF terminated chunks of ``chunk_size`` raw bytes."""
+        if self.compression is not None:
+            yield from _iter_base64(_iter_compressed(self.path, *self.compression), chunk_size)
+            return
+        with open(self.path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                for offset in range(0, len(view), chunk_size):
+                    yield base64.encodebytes(view[offset : offset + chunk_size]).replace(b"\n", _CRLF)
 
-        message.add_header("To", ", ".join(k.formataddr_self() for k in self.tos))
-        nowdate: datetime.datetime = datetime.datetime.now(tz=_tzberlin)
-        logger.debug(f"{nowdate.tzinfo=}")
-        logger.debug(f"{nowdate=}")
-        nowdate_str: str = _formatdate(nowdate)
-        logger.debug(f"{nowdate_str=}")
-        message.add_header("Date", nowdate_str)
-        message.add_header("Subject", _csqp.header_encode(self.subject))
 
-        if additional_headers:
-            for k, v in additional_headers.items():
-                # message.add_header(k, _csqp.header_encode_lines(v, 100))
-                message.add_header(k, _csqp.header_encode(v))
+class _TransferEncodingSlot(NamedTuple):
+    """Where the ``Content-Transfer-Encoding`` value of a streamed part goes: ``base64`` or ``binary``."""
 
-        if len(self.ccs) > 0:
-            message.add_header("Cc", ", ".join(k.formataddr_self() for k in self.ccs))
+    part: _StreamedAttachmentPart
 
-        # message.set_charset(_csqp)
-        # message.set_payload(txt, _csqp)
 
-        if kk == 1:
-            if html is not None:
-                message.set_content(html, "html")  # type: ignore
-                # message.set_default_type("text/html")
-            else:
-                message.set_content(txt, "plain")  # type: ignore
-                # message.set_default_type("text/plain")
-        else:
-            txtpart: Optional[MIMEText] = None
-            htmlpart: Optional[MIMEText] = None
+_Segment = bytes | memoryview | _StreamedAttachmentPart | _TransferEncodingSlot
 
-            if txt is not None:
-                txtpart = MIMEText(txt, "plain")
-                # txtpart.set_charset(_csqp)
-                # txtpart.add_header("Content-Transfer-Encoding", "quoted-printable")  #Content-Type: text/plain; charset="utf-8"
 
-            if html is not None:
-                htmlpart = MIMEText(html, "html")
-                # htmlpart.set_charset(_csqp)
+@dataclass
+class _RenderedMessage:
+    """Flattened message, split where streamed attachment bodies (and their encoding) go.
 
-            if hastxtandhtml:
-                submsg: MIMEMultipart = MIMEMultipart("alternative")
-                submsg.attach(txtpart)  # type: ignore
-                submsg.attach(htmlpart)  # type: ignore
-                message.attach(submsg)  # type: ignore
-            else:
-                if txtpart is not None:
-                    message.attach(txtpart)  # type: ignore
-                if htmlpart is not None:
-                    message.attach(htmlpart)  # type: ignore
+    Keeps the composed ``source`` message to derive the forms
+    :meth:`negotiate` picks for servers with or without 8BITMIME/SMTPUTF8.
+    """
 
-        ############# Add Attachments #############################
-        if files:
-            for path in files:
-                # mime_type, encoding = mimetypes.guess_type(str(path.absolute()))
-                # print(f"{path=} {mime_type=} {encoding=}")
-                # with open(path, "rb") as fp:
-                #     data = fp.read()
-                #     message.add_attachment(data, maintype=mime_type.split("/")[0],
-                #         subtype=mime_type.split("/")[1],
-                #         filename=path.name)
+    segments: List[_Segment]
+    source: Optional[EmailMessage | MIMEMultipart] = field(default=None, repr=False)
+    eight_bit: bool = False  # has 8bit text parts
+    utf8_headers: bool = False  # has non-ASCII header values that SMTPUTF8 may carry unencoded
+    _variants: Dict[str, _RenderedMessage] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
-                part = MIMEBase("application", "octet-stream")
-                with open(path, "rb") as file:
-                    part.set_payload(file.read())
-                encoders.encode_base64(part)
-                part.add_header("Content-Disposition", "attachment; filename={}".format(path.name))
-                message.attach(part)  # type: ignore
+    def negotiate(self, server: smtplib.SMTP | AsyncSMTPClient) -> Tuple[_RenderedMessage, List[str]]:
+        """Pick the form of the message ``server`` can take, and the ``MAIL FROM`` parameters it needs.
+
+        With SMTPUTF8 and 8BITMIME (RFC 6531/6152) non-ASCII headers go out
+        as raw UTF-8; with 8BITMIME alone 8bit bodies are declared as such;
+        without 8BITMIME 8bit bodies fall back to quoted-printable.
+        """
+        options: List[str] = ["BODY=8BITMIME"] if self.eight_bit and server.has_extn("8bitmime") else []
+        if self.utf8_headers and server.has_extn("smtputf8") and server.has_extn("8bitmime"):
+            return self._variant("utf8"), options + ["SMTPUTF8"]
+        if self.eight_bit and not server.has_extn("8bitmime"):
+            return self._variant("7bit"), options
+        return self, options
+
+    def seven_bit(self) -> _RenderedMessage:
+        """The form for any server: 8bit text parts re-encoded as quoted-printable."""
+        return self._variant("7bit") if self.eight_bit else self
+
+    def _variant(self, kind: str) -> _RenderedMessage:
+        if self.source is None:  # e.g. from a skeleton; sent as rendered
+            return self
+        with self._lock:
+            variant: Optional[_RenderedMessage] = self._variants.get(kind)
+            if variant is None:
+                if kind == "utf8":
+                    variant = _render(self.source, utf8_headers=True, utf8=True)
+                else:
+                    variant = _render(_downgrade_8bit(self.source))
+                variant.source = None  # final form
+                self._variants[kind] = variant
+            return variant
+
+    @property
+    def can_be_binary(self) -> bool:
+        """Whether there are streamed attachments that BINARYMIME would send unencoded."""
+        return any(isinstance(s, _TransferEncodingSlot) for s in self.segments)
+
+    def raw(self) -> memoryview:
+        """The rendered message without streamed attachment bodies.
+
+        Without streamed attachments this is the very buffer that is sent;
+        otherwise the other segments are copied into a new one.
+        """
+        if len(self.segments) == 1 and isinstance(self.segments[0], memoryview):
+            return self.segments[0]
+        return memoryview(
+            b"".join(
+                b"base64" if isinstance(s, _TransferEncodingSlot) else s
+                for s in self.segments
+                if not isinstance(s, _StreamedAttachmentPart)
+            )
+        )
+
+    def size(self, binary: bool = False) -> Optional[int]:
+        """Bytes the message takes on the wire (before dot-stuffing); ``None`` if unknown up front."""
+        total: int = 0
+        for segment in self.segments:
+            if isinstance(segment, _StreamedAttachmentPart):
+                part_size: Optional[int] = segment.wire_size(binary)
+                if part_size is None:
+                    return None
+                total += part_size
+            elif isinstance(segment, _TransferEncodingSlot):
+                total += len(b"binary" if binary else b"base64")
+            else:
+                total += len(segment)
+        return total
+
+    def iter_chunks(self, binary: bool = False) -> Iterator[bytes | memoryview]:
+        """Yield the wire form of the message piece by piece.
+
+        Args:
+            binary: Send streamed attachments unencoded (BINARYMIME); the
+                pieces are then no longer line-aligned. Otherwise each piece
+                starts at a line boundary.
+        """
+        for segment in self.segments:
+            if isinstance(segment, _StreamedAttachmentPart):
+                yield from segment.iter_binary() if binary else segment.iter_encoded()
+            elif isinstance(segment, _TransferEncodingSlot):
+                yield b"binary" if binary else b"base64"
+            else:
+                yield segment
+
+
+def _render(message: EmailMessage | MIMEMultipart, utf8_headers: bool = False, utf8: bool = False) -> _RenderedMessage:
+    """Flatten ``message`` for sending, leaving streamed attachment bodies to be filled in.
+
+    Args:
+        message: The composed message.
+        utf8_headers: The message was composed with unencoded non-ASCII
+            headers (``MRSendmail.negotiate_8bit``), which
+            :meth:`_RenderedMessage.negotiate` may then send as raw UTF-8.
+        utf8: Flatten non-ASCII headers as raw UTF-8 right away.
+    """
+    flat: memoryview = _flatten(message, utf8)
+    streamed: Dict[bytes, _Segment] = {}
+    eight_bit: bool = False
+    for part in message.walk():
+        if isinstance(part, _StreamedAttachmentPart):
+            streamed[part.token.encode("ascii")] = part
+            streamed[part.cte_token.encode("ascii")] = _TransferEncodingSlot(part)
+        elif str(part.get("Content-Transfer-Encoding", "")).lower() == "8bit":
+            eight_bit = True
+    utf8_headers = utf8_headers and any(not str(v).isascii() for part in message.walk() for v in part.values())
+
+    segments: List[_Segment] = [flat]
+    if streamed:
+        # odd indices of the split are the placeholders themselves
+        segments = [
+            streamed[bytes(piece)] if i % 2 else piece for i, piece in enumerate(_re_stream_token_b.split(flat))
+        ]
+    return _RenderedMessage(segments, message, eight_bit, utf8_headers)
+
+
+@dataclass(frozen=True)
+class MessageSkeleton:
+    """A message rendered once for sending to many recipients.
+
+    Produced by :meth:`MRSendmail.compile`. Body, HTML and attachments are
+    already MIME-encoded and flattened; all headers except ``Message-ID``,
+    ``To`` and ``Date`` are fixed. :meth:`render` only prepends those three
+    headers, so sending a skeleton costs no MIME work at all.
+
+    Attributes:
+        headers: The constant header lines in wire form (CRLF terminated).
+        body: The blank line separating the headers plus the MIME body, as
+            line-aligned pieces (and streamed attachments, if the compiling
+            mailer had ``stream_attachments`` set).
+        ccs: ``Cc`` recipients fixed at compile time.
+        msgid_domain: Domain used for generated ``Message-ID`` values.
+    """
+
+    headers: bytes
+    body: Tuple[_Segment, ...]
+    ccs: Tuple[EmailAddress, ...] = ()
+    msgid_domain: Optional[str] = None
+
+    def render(
+        self, tos: Sequence[EmailAddress], msgid: str, date: Optional[datetime.datetime] = None
+    ) -> _RenderedMessage:
+        """Splice the per-recipient headers into the skeleton.
+
+        Args:
+            tos: Addresses for the ``To`` header.
+            msgid: Value of the ``Message-ID`` header.
+            date: Value of the ``Date`` header; defaults to now.
+
+        Returns:
+            The message, ready to be sent.
+        """
+        if date is None:
+            date = datetime.datetime.now(tz=_tzberlin)
+        varheaders: str = (
+            _wire_policy.fold("Message-ID", msgid)
+            + _wire_policy.fold("To", ", ".join(k.formataddr_self() for k in tos))
+            + _wire_policy.fold("Date", _formatdate(date))
+        )
+        return _RenderedMessage([varheaders.encode("utf-8") + self.headers, *self.body])
+
+    @staticmethod
+    def from_rendered(
+        rendered: _RenderedMessage, ccs: Sequence[EmailAddress] = (), msgid_domain: Optional[str] = None
+    ) -> MessageSkeleton:
+        """Cut a rendered message into constant headers and body, dropping the variable headers."""
+        first: bytes = bytes(rendered.segments[0])  # type: ignore[arg-type]  # never a streamed part
+        end: int = first.find(b"\r\n\r\n") + 2
+
+        headers: List[bytes] = []
+        for line in first[:end].splitlines(keepends=True):
+            if line[:1] in (b" ", b"\t") and headers:
+                headers[-1] += line  # folded continuation line
+            else:
+                headers.append(line)
+
+        return MessageSkeleton(
+            headers=b"".join(
+                h for h in headers if h.split(b":", 1)[0].strip().lower() not in _SKELETON_VARIABLE_HEADERS
+            ),
+            body=(first[end:], *rendered.segments[1:]),
+            ccs=tuple(ccs),
+            msgid_domain=msgid_domain,
+        )
+
+
+def _raw_message(rendered: _RenderedMessage, raw: Literal["str", "bytes"] | None) -> str | memoryview | None:
+    """Shape the rendered message as requested by the ``raw`` argument of the send methods."""
+    if raw is None:
+        return None
+    if raw == "bytes":
+        return rendered.raw()
+    return str(rendered.raw(), "utf-8", "surrogateescape")
+
+
+def _count_bytes(chunks: Iterable[bytes | memoryview], sr: SendResult) -> Iterator[bytes | memoryview]:
+    """Pass ``chunks`` through, adding their size to ``sr.bytes_sent``."""
+    for chunk in chunks:
+        sr.bytes_sent += len(chunk)
+        yield chunk
+
+
+def _connection_lost(ex: BaseException) -> smtplib.SMTPResponseException:
+    """A transient ``421`` standing in for a dropped or unreachable connection, for :class:`SendResult`."""
+    return smtplib.SMTPResponseException(421, f"4.4.2 connection lost: {ex}".encode("utf-8", "replace"))
+
+
+def _smtp_rset_quietly(server: smtplib.SMTP) -> None:
+    try:
+        server.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+def _smtp_data(server: smtplib.SMTP, chunks: Iterable[bytes | memoryview]) -> Tuple[int, bytes]:
+    """``SMTP.data`` for a message given as an iterable of line-aligned pieces.
+
+    Each piece is dot-stuffed and written to the socket on its own, so the
+    message is never assembled in memory.
+    """
+    code, repl = server.docmd("data")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, repl)
+
+    tail: bytes = b""
+    for chunk in chunks:
+        if chunk:
+            chunk = _dotstuff(chunk)
+            server.send(chunk)  # type: ignore[arg-type]  # sendall() takes any buffer
+            tail = (tail + bytes(chunk[-2:]))[-2:]
+    server.send(b"." + _CRLF if tail == _CRLF else _CRLF + b"." + _CRLF)
+    return server.getreply()
+
+
+def _smtp_bdat(server: smtplib.SMTP, chunks: Iterable[bytes | memoryview]) -> Tuple[int, bytes]:
+    """Transmit a message with ``BDAT`` commands (RFC 3030) instead of ``DATA``.
+
+    Pieces are coalesced into chunks of at least ``_BDAT_CHUNK_SIZE`` bytes;
+    nothing is dot-stuffed. Stops at the first chunk the server refuses.
+
+    Returns:
+        The reply to the last ``BDAT`` sent.
+    """
+    pending: List[bytes | memoryview] = []
+    pending_size: int = 0
+    for chunk in chunks:
+        if pending_size >= _BDAT_CHUNK_SIZE:
+            server.send(f"BDAT {pending_size}\r\n".encode("ascii"))
+            for piece in pending:
+                server.send(piece)  # type: ignore[arg-type]  # sendall() takes any buffer
+            code, resp = server.getreply()
+            if code != 250:
+                return code, resp
+            pending, pending_size = [], 0
+        if chunk:
+            pending.append(chunk)
+            pending_size += len(chunk)
+
+    server.send(f"BDAT {pending_size} LAST\r\n".encode("ascii"))
+    for piece in pending:
+        server.send(piece)  # type: ignore[arg-type]
+    return server.getreply()
+
+
+def _smtp_size_limit(server: smtplib.SMTP | AsyncSMTPClient) -> Optional[int]:
+    """The message size limit from the EHLO ``SIZE`` keyword (RFC 1870); ``None`` if not advertised or unlimited."""
+    if not server.has_extn("size"):
+        return None
+    value: str = server.esmtp_features.get("size", "").strip()
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+def _smtp_size_options(server: smtplib.SMTP | AsyncSMTPClient, size: Optional[int]) -> List[str]:
+    """The ``SIZE=`` parameter for ``MAIL FROM``, if the server takes one and ``size`` is known.
+
+    Raises:
+        smtplib.SMTPResponseException: ``552`` if the message exceeds the
+            server's limit, before anything is sent.
+    """
+    if size is None or not server.has_extn("size"):
+        return []
+    limit: Optional[int] = _smtp_size_limit(server)
+    if limit is not None and size > limit:
+        raise smtplib.SMTPResponseException(
+            552, f"5.3.4 message of {size} bytes exceeds the server limit of {limit} bytes".encode("ascii")
+        )
+    return [f"SIZE={size}"]
+
+
+def _smtp_envelope(
+    server: smtplib.SMTP, from_addr: str, to_addrs: Sequence[str], mail_options: Sequence[str] = ()
+) -> Dict[str, Tuple[int, bytes]]:
+    """Send ``MAIL FROM`` (with ``mail_options``) and all ``RCPT TO`` commands, pipelined if possible.
+
+    When the server advertises PIPELINING (RFC 2920) the commands are written
+    in batches of ``_PIPELINE_BATCH`` and the replies read afterwards;
+    otherwise each command waits for its reply, as in ``smtplib``.
+
+    Returns:
+        A dict with one ``(code, message)`` entry per refused recipient.
+
+    Raises:
+        smtplib.SMTPSenderRefused: The server refused ``MAIL FROM``.
+        smtplib.SMTPRecipientsRefused: The server closed the connection (421)
+            while recipients were being submitted.
+    """
+    cmds: List[str] = _envelope_commands(from_addr, to_addrs, mail_options)
+    batch: int = _PIPELINE_BATCH if server.has_extn("pipelining") else 1
+    server.command_encoding = "utf-8" if "SMTPUTF8" in mail_options else "ascii"
+
+    senderrs: Dict[str, Tuple[int, bytes]] = {}
+    for start in range(0, len(cmds), batch):
+        group: List[str] = cmds[start : start + batch]
+        server.send("".join(f"{cmd}\r\n" for cmd in group))
+
+        replies: List[Tuple[int, bytes]] = []
+        for _ in group:
+            replies.append(server.getreply())
+            if replies[-1][0] == 421:  # server is closing the connection
+                break
+
+        for index, (code, resp) in enumerate(replies, start):
+            if index == 0:
+                if code != 250:
+                    if code == 421:
+                        server.close()
+                    else:
+                        _smtp_rset_quietly(server)
+                    raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+                continue
+
+            if code not in (250, 251):
+                senderrs[to_addrs[index - 1]] = (code, resp)
+            if code == 421:
+                server.close()
+                raise smtplib.SMTPRecipientsRefused(senderrs)
+
+    return senderrs
+
+
+def _smtp_sendmail(
+    server: smtplib.SMTP,
+    from_addr: str,
+    to_addrs: Sequence[str],
+    message: _RenderedMessage,
+    timings: Optional[Dict[str, float]] = None,
+    sr: Optional[SendResult] = None,
+    sent: Optional[List[_RenderedMessage]] = None,
+) -> Dict[str, Tuple[int, bytes]]:
+    """``SMTP.sendmail`` for a rendered message, written by :func:`_smtp_data` or :func:`_smtp_bdat`.
+
+    The form of the message is picked by :meth:`_RenderedMessage.negotiate`.
+    Non-ASCII envelope addresses require SMTPUTF8 (RFC 6531), as in
+    ``smtplib``. If the server advertises ``SIZE`` (RFC 1870), the size of the message is
+    declared in ``MAIL FROM``, and a message over the limit fails with 552
+    before any command is sent. If the server advertises ``CHUNKING`` and
+    ``BINARYMIME`` (RFC 3030), streamed attachments are sent unencoded with
+    ``BDAT``.
+
+    Mirrors the return value and exceptions of ``smtplib.SMTP.sendmail``. If
+    ``timings`` is given, the seconds spent on the ``envelope`` and ``data``
+    phases are added to it; with ``sr`` the bytes sent are counted there;
+    ``sent`` receives the form of the message the server accepted.
+    """
+    server.ehlo_or_helo_if_needed()
+
+    mail_options: List[str]
+    message, mail_options = message.negotiate(server)
+    if not (from_addr.isascii() and all(addr.isascii() for addr in to_addrs)):
+        if not server.has_extn("smtputf8"):
+            raise smtplib.SMTPNotSupportedError("SMTPUTF8 not supported by server")
+        if "SMTPUTF8" not in mail_options:
+            mail_options.append("SMTPUTF8")
+
+    binary: bool = message.can_be_binary and server.has_extn("chunking") and server.has_extn("binarymime")
+    mail_options += _smtp_size_options(server, message.size(binary))
+    if binary:
+        mail_options = [o for o in mail_options if not o.startswith("BODY=")] + ["BODY=BINARYMIME"]
+
+    started: float = time.perf_counter()
+    senderrs: Dict[str, Tuple[int, bytes]] = _smtp_envelope(server, from_addr, to_addrs, mail_options)
+    if timings is not None:
+        timings["envelope"] = timings.get("envelope", 0.0) + time.perf_counter() - started
+
+    if len(senderrs) == len(to_addrs):
+        # the server refused all our recipients
+        _smtp_rset_quietly(server)
+        raise smtplib.SMTPRecipientsRefused(senderrs)
+
+    started = time.perf_counter()
+    chunks: Iterable[bytes | memoryview] = message.iter_chunks(binary)
+    if sr is not None:
+        chunks = _count_bytes(chunks, sr)
+    code, resp = _smtp_bdat(server, chunks) if binary else _smtp_data(server, chunks)
+    if timings is not None:
+        timings["data"] = timings.get("data", 0.0) + time.perf_counter() - started
+    if code != 250:
+        if code == 421:
+            server.close()
+        else:
+            _smtp_rset_quietly(server)
+        raise smtplib.SMTPDataError(code, resp)
+
+    if sent is not None:
+        sent.append(message)
+    return senderrs
+
+
+def _smtp_connect(
+    serverinfo: SMTPServerInfo, wants_smtp_level_debug: bool = False, timings: Optional[Dict[str, float]] = None
+) -> smtplib.SMTP:
+    """Open an SMTP connection and run EHLO, STARTTLS and AUTH on it.
+
+    With ``use_implicit_tls`` the connection is TLS-wrapped from the start
+    instead. TLS uses the shared context from :func:`_ssl_context` and
+    offers the session of the previous connection to the same server.
+
+    Args:
+        serverinfo: Connection parameters.
+        wants_smtp_level_debug: Enable ``smtplib`` debug output for this
+            connection regardless of ``serverinfo.wantsdebug``.
+        timings: If given, receives the seconds spent on ``connect``
+            (resolution, TCP connect, greeting and EHLO), ``tls`` and ``auth``.
+
+    Returns:
+        A connected and (if credentials are configured) authenticated
+        ``smtplib.SMTP`` instance.
+
+    Raises:
+        OSError: If the server cannot be reached.
+        smtplib.SMTPException: If EHLO, STARTTLS or login fail.
+    """
+    phases: Dict[str, float] = {} if timings is None else timings
+    started: float = time.perf_counter()
+    server: smtplib.SMTP
+    if serverinfo.use_implicit_tls:
+        server = _SMTPImplicitTLS(
+            serverinfo.smtp_server,
+            serverinfo.smtp_port,
+            context=_ssl_context(serverinfo),
+            tls_session=_tls_session(serverinfo),
+        )
+    else:
+        server = smtplib.SMTP(serverinfo.smtp_server, serverinfo.smtp_port)
+    try:
+        # the message and its terminating ".\r\n" are separate small writes; without this, Nagle holds the
+        # terminator back until the server's delayed ACK (~40ms on Linux) for every single message
+        if server.sock is not None:
+            server.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if serverinfo.wantsdebug or wants_smtp_level_debug:
+            server.set_debuglevel(1)
+
+        server.ehlo()  # Can be omitted
+        phases["connect"] = time.perf_counter() - started
+
+        if serverinfo.use_start_tls:
+            started = time.perf_counter()
+            _smtp_starttls(server, _ssl_context(serverinfo), _tls_session(serverinfo))  # Secure the connection
+            server.ehlo()  # Can be omitted
+            phases["tls"] = time.perf_counter() - started
+
+        # with TLS 1.3 the session ticket arrives after the handshake, i.e. it is there once EHLO was answered
+        _remember_tls_session(serverinfo, server.sock)
+
+        if serverinfo.smtp_pass and serverinfo.smtp_user:
+            started = time.perf_counter()
+            server.login(serverinfo.smtp_user, serverinfo.smtp_pass)
+            phases["auth"] = time.perf_counter() - started
+    except BaseException:
+        server.close()
+        raise
+
+    return server
+
+
+@dataclass
+class PooledSMTPSession:
+    """An authenticated SMTP session handed out by :class:`SMTPConnectionPool`.
+
+    Attributes:
+        smtp: The underlying, already authenticated ``smtplib.SMTP`` object.
+        key: :meth:`SMTPServerInfo.connection_key` of the server it belongs to.
+        created: ``time.monotonic()`` timestamp of connection establishment.
+        last_used: ``time.monotonic()`` timestamp of the last release.
+        num_messages: Number of messages delivered over this session so far.
+        dirty: Set when a transaction on this session ended with an error, so
+            the pool issues ``RSET`` (instead of ``NOOP``) before reusing it.
+        timings: Handshake phase timings of a freshly opened session; handed
+            to the :class:`SendResult` of its first transaction, then emptied.
+    """
+
+    smtp: smtplib.SMTP
+    key: _ConnectionKey
+    created: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    num_messages: int = 0
+    dirty: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class SMTPConnectionPool:
+    """Pool of authenticated SMTP sessions keyed by :class:`SMTPServerInfo`.
+
+    Opening a session costs a TCP connect, EHLO, STARTTLS, a second EHLO and
+    AUTH. The pool keeps released sessions alive so that subsequent sends to
+    the same server skip that handshake. Idle sessions are probed with
+    ``NOOP`` (or ``RSET`` after a failed transaction) before being handed out
+    again; sessions that are too old, have delivered too many messages or fail
+    the probe are closed and replaced transparently.
+
+    The pool is thread-safe; a session is only ever handed to one borrower at
+    a time.
+
+    Attributes:
+        max_idle_seconds: Idle sessions older than this are closed instead of
+            being reused (servers typically drop idle clients after 60-300s).
+        max_messages_per_connection: Close a session after it delivered this
+            many messages.
+        max_idle_per_server: Upper bound of idle sessions kept per server.
+
+    Example:
+        >>> pool = SMTPConnectionPool()
+        >>> mailer = MRSendmail(serverinfo=server, returnpath=sender, pool=pool)
+        >>> for report in reports:
+        ...     mailer.send(txt=report)
+        >>> pool.close()
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    max_idle_seconds: float = 60.0
+    max_messages_per_connection: int = 100
+    max_idle_per_server: int = 4
+
+    _idle: Dict[_ConnectionKey, Deque[PooledSMTPSession]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def acquire(self, serverinfo: SMTPServerInfo, wants_smtp_level_debug: bool = False) -> PooledSMTPSession:
+        """Borrow a session for ``serverinfo``, opening a new one if needed.
+
+        Args:
+            serverinfo: Server to connect to.
+            wants_smtp_level_debug: Enable ``smtplib`` debug output while the
+                session is borrowed.
+
+        Returns:
+            A :class:`PooledSMTPSession` which must be handed back via
+            :meth:`release`.
+        """
+        key = serverinfo.connection_key()
+
+        while True:
+            with self._lock:
+                idle: Optional[Deque[PooledSMTPSession]] = self._idle.get(key)
+                session: Optional[PooledSMTPSession] = idle.pop() if idle else None
+
+            if session is None:
+                break
+
+            if time.monotonic() - session.last_used > self.max_idle_seconds:
+                self.logger.debug(f"closing session idle for more than {self.max_idle_seconds}s")
+                self._discard(session)
+                continue
+
+            try:
+                code, _ = session.smtp.rset() if session.dirty else session.smtp.noop()
+            except (smtplib.SMTPException, OSError) as ex:
+                self.logger.debug(f"pooled session failed liveness probe: {ex!r}")
+                self._discard(session)
+                continue
+
+            if code != 250:
+                self._discard(session)
+                continue
+
+            session.dirty = False
+            if wants_smtp_level_debug:
+                session.smtp.set_debuglevel(1)
+            return session
+
+        timings: Dict[str, float] = {}
+        smtp: smtplib.SMTP = _smtp_connect(serverinfo, wants_smtp_level_debug, timings)
+        return PooledSMTPSession(smtp=smtp, key=key, timings=timings)
+
+    def release(self, session: PooledSMTPSession, reusable: bool = True) -> None:
+        """Hand a borrowed session back to the pool.
+
+        Args:
+            session: The session obtained from :meth:`acquire`.
+            reusable: ``False`` if the connection is known to be broken (e.g.
+                after a socket error); it is then closed instead of pooled.
+        """
+        session.last_used = time.monotonic()
+
+        if not reusable or session.num_messages >= self.max_messages_per_connection:
+            self._discard(session)
+            return
+
+        session.smtp.set_debuglevel(0)
+
+        with self._lock:
+            idle: Deque[PooledSMTPSession] = self._idle.setdefault(session.key, deque())
+            if len(idle) < self.max_idle_per_server:
+                idle.append(session)
+                return
+
+        self.logger.debug(f"pool for {session.key[0]}:{session.key[1]} is full; closing session")
+        self._discard(session)
+
+    @contextmanager
+    def session(self, serverinfo: SMTPServerInfo, wants_smtp_level_debug: bool = False) -> Iterator[PooledSMTPSession]:
+        """Context manager around :meth:`acquire` / :meth:`release`.
+
+        SMTP protocol errors leave the session reusable (it is ``RSET`` before
+        its next use); any other exception closes it.
+        """
+        session: PooledSMTPSession = self.acquire(serverinfo, wants_smtp_level_debug)
+        try:
+            yield session
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            session.dirty = True
+            self.release(session)
+            raise
+        except BaseException:
+            self.release(session, reusable=False)
+            raise
+        else:
+            self.release(session)
+
+    def close(self) -> None:
+        """Close all idle sessions. Borrowed sessions are closed on release."""
+        with self._lock:
+            sessions: List[PooledSMTPSession] = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+
+        for session in sessions:
+            self._discard(session)
+
+    def __enter__(self) -> SMTPConnectionPool:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @staticmethod
+    def _discard(session: PooledSMTPSession) -> None:
+        try:
+            session.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            session.smtp.close()
+
+
+@dataclass
+class MailSpec:
+    """One message of a :meth:`MRSendmail.send_many` batch.
+
+    Fields left as ``None`` fall back to the corresponding attribute of the
+    sending :class:`MRSendmail` instance (``subject``, ``tos``, ``ccs`` and
+    ``bccs``); the remaining fields mirror the arguments of
+    :meth:`MRSendmail.send`.
+
+    Attributes:
+        txt: Plaintext body content.
+        html: HTML body content.
+        subject: Subject line for this message.
+        tos: Primary recipients for this message.
+        ccs: Carbon-copy recipients for this message.
+        bccs: Blind carbon-copy recipients for this message.
+        files: File paths to attach.
+        msgid: Explicit ``Message-ID``; generated if omitted.
+        additional_headers: Extra headers to add to this message.
+    """
+
+    txt: Optional[str] = None
+    html: Optional[str] = None
+    subject: Optional[str] = None
+    tos: Optional[List[EmailAddress]] = None
+    ccs: Optional[List[EmailAddress]] = None
+    bccs: Optional[List[EmailAddress]] = None
+    files: Optional[List[Path]] = None
+    msgid: Optional[str] = None
+    additional_headers: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class AttachmentCache:
+    """LRU cache of base64-encoded attachment payloads.
+
+    Reports often attach the same files (logos, terms, daily exports) to many
+    mails. With an ``AttachmentCache`` set on :class:`MRSendmail`, each file
+    is read and encoded once; later sends reuse the encoded payload.
+
+    Entries are keyed by resolved path, modification time and size (a changed
+    file is a new entry) or, with ``key_by_content``, by the SHA-256 of the
+    file contents (the file is then still read on every send, but identical
+    files at different paths share one entry and nothing is re-encoded).
+
+    When the in-memory budget is exceeded the least recently used entries are
+    evicted; with ``spill_dir`` set they are moved to disk instead of being
+    dropped and are promoted back to memory on their next use.
+
+    The cache is thread-safe and may be shared between mailers.
+
+    Attributes:
+        max_bytes: Memory budget for encoded payloads.
+        spill_dir: Directory for evicted entries; ``None`` disables spilling.
+        max_spill_bytes: Budget for spilled entries on disk.
+        key_by_content: Key entries by content hash instead of path metadata.
+        hits: Lookups served from memory.
+        spill_hits: Lookups served from ``spill_dir``.
+        misses: Lookups that had to encode the file.
+        evictions: Entries removed from memory (whether spilled or dropped).
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    max_bytes: int = 64 * 1024 * 1024
+    spill_dir: Optional[Path] = None
+    max_spill_bytes: int = 1024 * 1024 * 1024
+    key_by_content: bool = False
+
+    hits: int = field(default=0, init=False)
+    spill_hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+
+    _entries: OrderedDict[str, str] = field(default_factory=OrderedDict, init=False, repr=False)
+    _spilled: OrderedDict[str, int] = field(default_factory=OrderedDict, init=False, repr=False)
+    _size: int = field(default=0, init=False, repr=False)
+    _spill_size: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def size(self) -> int:
+        """Bytes of encoded payload currently held in memory."""
+        return self._size
+
+    def part(self, path: Path) -> MIMEBase:
+        """Return a ready-to-attach ``application/octet-stream`` part for ``path``.
+
+        Args:
+            path: The file to attach.
+
+        Returns:
+            A fresh MIME part carrying the (possibly cached) base64 payload.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        part: MIMEBase = MIMEBase("application", "octet-stream")
+        part.set_payload(self.encoded(path))
+        part.add_header("Content-Transfer-Encoding", "base64")
+        return part
+
+    def encoded(self, path: Path) -> str:
+        """Return the base64 payload for ``path``, encoding it on a miss."""
+        data: Optional[bytes] = None
+        if self.key_by_content:
+            data = path.read_bytes()
+            key: str = hashlib.sha256(data).hexdigest()
+        else:
+            st: os.stat_result = path.stat()
+            key = hashlib.sha256(f"{path.resolve()}\0{st.st_mtime_ns}\0{st.st_size}".encode()).hexdigest()
+
+        with self._lock:
+            payload: Optional[str] = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+
+            if key in self._spilled:
+                payload = self._unspill(key)
+                if payload is not None:
+                    self.spill_hits += 1
+                    self._store(key, payload)
+                    return payload
+
+            self.misses += 1
+
+        if data is None:
+            data = path.read_bytes()
+        tmp: MIMEBase = MIMEBase("application", "octet-stream")
+        tmp.set_payload(data)
+        encoders.encode_base64(tmp)
+        payload = str(tmp.get_payload())
+
+        with self._lock:
+            if key not in self._entries:
+                self._store(key, payload)
+        return payload
+
+    def clear(self) -> None:
+        """Drop all entries, including spilled ones. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            for key in list(self._spilled):
+                self._unspill(key)
+
+    def _store(self, key: str, payload: str) -> None:
+        # caller holds the lock
+        self._entries[key] = payload
+        self._size += len(payload)
+        while self._size > self.max_bytes and self._entries:
+            old_key, old_payload = self._entries.popitem(last=False)
+            self._size -= len(old_payload)
+            self.evictions += 1
+            self._spill(old_key, old_payload)
+
+    def _spill(self, key: str, payload: str) -> None:
+        # caller holds the lock
+        if self.spill_dir is None or len(payload) > self.max_spill_bytes:
+            return
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            (self.spill_dir / f"{key}.b64").write_text(payload, encoding="ascii")
+        except OSError as ex:
+            self.logger.warning(f"could not spill attachment cache entry: {ex!r}")
+            return
+        self._spilled[key] = len(payload)
+        self._spill_size += len(payload)
+        while self._spill_size > self.max_spill_bytes:
+            self._unspill(next(iter(self._spilled)))
+
+    def _unspill(self, key: str) -> Optional[str]:
+        # caller holds the lock; removes the entry from disk and returns its payload if still readable
+        assert self.spill_dir is not None
+        self._spill_size -= self._spilled.pop(key)
+        spillfile: Path = self.spill_dir / f"{key}.b64"
+        try:
+            return spillfile.read_text(encoding="ascii")
+        except OSError:
+            return None
+        finally:
+            spillfile.unlink(missing_ok=True)
+
+
+@dataclass(frozen=True)
+class AttachmentCompression:
+    """Policy for compressing attachments on the fly.
+
+    Files of at least ``min_size`` bytes whose suffix is in ``suffixes`` are
+    attached compressed, as ``<name>.gz`` (``application/gzip``) or as
+    ``<name>.zip`` (``application/zip``, one entry named like the file); all
+    other files are attached unchanged. With ``stream_attachments`` set on
+    the mailer the compression runs chunk by chunk while the message is
+    written to the server, otherwise when the message is composed.
+
+    ``max_total_size`` caps the encoded (base64) size of all attachments of a
+    message, e.g. at the relay's ``SIZE`` limit minus room for the body. The
+    files are then compressed up front at ``level``; if that does not fit
+    they are compressed again at the next higher of levels 6 and 9, and if
+    even level 9 does not fit, composing the message fails before any
+    connection is made. Setting a low ``level`` with a cap trades CPU for
+    bytes only when the limit demands it.
+
+    Attributes:
+        format: ``"gzip"`` or ``"zip"``.
+        min_size: Smallest file, in bytes, that is compressed.
+        level: zlib compression level, 1 (fastest) to 9 (smallest).
+        max_total_size: Upper bound for the encoded size of all attachments
+            of one message; ``None`` for no bound.
+        suffixes: File suffixes (lower case, with dot) considered
+            compressible; defaults to common text formats.
+
+    Example:
+        >>> mailer = MRSendmail(..., attachment_compression=AttachmentCompression(max_total_size=20_000_000))
+    """
+
+    format: CompressionFormat = "gzip"
+    min_size: int = 64 * 1024
+    level: int = 6
+    max_total_size: Optional[int] = None
+    suffixes: FrozenSet[str] = _COMPRESSIBLE_SUFFIXES
+
+    def __post_init__(self) -> None:
+        if self.format not in _COMPRESSION_TYPES:
+            raise ValueError(f"unknown compression format {self.format!r}")
+        if not 1 <= self.level <= 9:
+            raise ValueError(f"{self.level=} must be between 1 and 9")
+
+    @property
+    def extension(self) -> str:
+        """Suffix appended to the file name of compressed attachments."""
+        return _COMPRESSION_TYPES[self.format][1]
+
+    def applies_to(self, path: Path, size: int) -> bool:
+        """Whether a file of ``size`` bytes at ``path`` is compressed."""
+        return size >= self.min_size and path.suffix.lower() in self.suffixes
+
+    def parts(self, files: Sequence[Path], stream: bool = False) -> Dict[int, MIMEBase]:
+        """Build the parts of the files this policy compresses.
+
+        Args:
+            files: All attachments of the message.
+            stream: Compress while sending (see :class:`MRSendmail`
+                ``stream_attachments``); ignored with ``max_total_size``, which
+                needs the compressed sizes up front.
+
+        Returns:
+            The compressed parts keyed by their index in ``files``; files
+            left out are attached as they are.
+
+        Raises:
+            OSError: If a file cannot be read.
+            ValueError: If the attachments exceed ``max_total_size`` even at
+                level 9.
+        """
+        sizes: List[int] = [path.stat().st_size for path in files]
+        chosen: List[int] = [i for i, path in enumerate(files) if self.applies_to(path, sizes[i])]
+        if self.max_total_size is None:
+            if stream:
+                return {i: _StreamedAttachmentPart(files[i], (self.format, self.level)) for i in chosen}
+            return {i: self._part(b"".join(_iter_compressed(files[i], self.format, self.level))) for i in chosen}
+
+        fixed: int = sum(_base64_size(size) for i, size in enumerate(sizes) if i not in chosen)
+        total: int = fixed
+        for level in [self.level] + [lvl for lvl in (6, 9) if lvl > self.level]:
+            compressed: Dict[int, bytes] = {i: b"".join(_iter_compressed(files[i], self.format, level)) for i in chosen}
+            total = fixed + sum(_base64_size(len(data)) for data in compressed.values())
+            if total <= self.max_total_size:
+                return {i: self._part(data) for i, data in compressed.items()}
+        raise ValueError(f"attachments take {total} bytes encoded even compressed, over {self.max_total_size=}")
+
+    def _part(self, data: bytes) -> MIMEBase:
+        part: MIMEBase = MIMEBase(*_COMPRESSION_TYPES[self.format][0].split("/"))
+        part.set_payload(data)
+        encoders.encode_base64(part)
+        return part
+
+
+@dataclass
+class MRSendmail:
+    """Compose and send RFC 5322/RFC 2047 compliant email via SMTP.
+
+    MRSendmail helps you construct MIME messages (plain text and/or HTML), add
+    attachments, and populate common headers (``From``, ``Reply-To``,
+    ``Return-Path``, ``To``, ``Cc``). It then connects to a configured SMTP
+    server to deliver the message, optionally enabling STARTTLS and
+    authentication according to :class:`SMTPServerInfo`.
+
+    Key behavior
+    - ``returnpath`` is used as the SMTP envelope sender (``MAIL FROM``) and
+      is also written to the ``Return-Path`` header.
+    - If ``senderfrom`` is not provided, ``From`` defaults to ``returnpath``.
+    - Recipients used for SMTP delivery are the union of ``tos``, ``ccs`` and
+      ``bccs``. ``bccs`` are not written to headers.
+    - The class emits logs via ``loguru``; you can opt-in to per-call verbose
+      logging in :meth:`send`.
+
+    Attributes:
+        serverinfo: SMTP connectivity and security parameters.
+        returnpath: Address used for SMTP envelope sender (``MAIL FROM``) and
+            ``Return-Path`` header.
+        subject: Message subject line.
+        senderfrom: Optional ``From`` header; falls back to ``returnpath`` if
+            omitted.
+        replyto: Optional ``Reply-To`` header address.
+        tos: Primary recipient addresses (``To``).
+        ccs: Carbon-copy recipient addresses (``Cc``).
+        bccs: Blind carbon-copy recipient addresses; used for SMTP only, not
+            added to headers.
+        pool: Optional :class:`SMTPConnectionPool` to borrow authenticated
+            sessions from. Without a pool every :meth:`send` opens and closes
+            its own connection.
+        stream_attachments: Encode attachments lazily while sending instead
+            of reading and base64-encoding them up front. Files are mapped
+            with ``mmap`` and written to the socket in chunks of
+            ``_ATTACHMENT_CHUNK_SIZE`` raw bytes, so memory use no longer
+            grows with attachment size. The raw message returned by
+            :meth:`send` then contains the attachment headers only. Servers
+            advertising ``CHUNKING`` and ``BINARYMIME`` receive streamed
+            attachments unencoded via ``BDAT``.
+        attachment_cache: Optional :class:`AttachmentCache` to take encoded
+            attachment payloads from (ignored when ``stream_attachments`` is
+            set).
+        attachment_compression: Optional :class:`AttachmentCompression`
+            policy; files it selects are attached gzip/zip-compressed (and
+            bypass ``attachment_cache``).
+        negotiate_8bit: Compose text bodies unencoded (8bit) and header
+            values unencoded where possible. Servers advertising 8BITMIME
+            receive the bodies as they are, servers also advertising
+            SMTPUTF8 the headers as raw UTF-8; for other servers both fall
+            back to quoted-printable resp. RFC 2047. Compiled skeletons and
+            outbox entries are stored and always use the 7bit-safe encoding.
+        recipient_chunk_workers: When the recipients of a message are split
+            into several transactions (see
+            ``SMTPServerInfo.max_recipients_per_transaction``), deliver the
+            transactions over up to this many connections in parallel.
+        mx_resolver: Enables direct delivery: instead of relaying through
+            ``serverinfo``, the recipients are grouped by domain and each
+            group is delivered to the domain's mail exchangers, falling back
+            to the next MX preference when one cannot be reached. The groups
+            are delivered in parallel over their own connections.
+            ``serverinfo`` then only serves as a template for the TLS and
+            other settings of those connections (its host, port and
+            credentials are not used). Applies to :meth:`send` and
+            :meth:`send_compiled`.
+        mx_max_workers: Most domain groups delivered at the same time.
+
+    Example:
+        >>> mailer = MRSendmail(
+        ...     serverinfo=SMTPServerInfo(hostname="smtp.example.com"),
+        ...     returnpath=EmailAddress.from_str("no-reply@example.com"),
+        ...     subject="Hello"
+        ... )
+        >>> mailer.add_to(EmailAddress.from_str("Alice <alice@example.com>"))
+        >>> raw, result = mailer.send(txt="Hi there")
+        >>> result.all_succeeded()
+        True
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    asend_max_concurrency: ClassVar[int] = 100
+    _asend_semaphores: ClassVar[weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]] = (
+        weakref.WeakKeyDictionary()
+    )
+
+    serverinfo: SMTPServerInfo
+    returnpath: EmailAddress  # das ist der im MAIL FROM: header im smtp
+    subject: str = ""
+    senderfrom: Optional[EmailAddress] = None  # das ist der From-Header im Header der E-Mail
+    replyto: Optional[EmailAddress] = None
+
+    tos: list[EmailAddress] = field(default_factory=list)
+    ccs: list[EmailAddress] = field(default_factory=list)
+    bccs: list[EmailAddress] = field(default_factory=list)
+
+    pool: Optional[SMTPConnectionPool] = field(default=None, repr=False, compare=False)
+    stream_attachments: bool = False
+    attachment_cache: Optional[AttachmentCache] = field(default=None, repr=False, compare=False)
+    attachment_compression: Optional[AttachmentCompression] = None
+    negotiate_8bit: bool = False
+    recipient_chunk_workers: int = 1
+    mx_resolver: Optional[MXResolver] = field(default=None, repr=False, compare=False)
+    mx_max_workers: int = 16
+
+    def add_to(self, receiver: EmailAddress) -> None:
+        """Add a primary recipient.
+
+        Args:
+            receiver: Address to append to the ``To`` list.
+        """
+        self.tos.append(receiver)
+
+    def add_cc(self, cc: EmailAddress) -> None:
+        """Add a carbon-copy recipient.
+
+        Args:
+            cc: Address to append to the ``Cc`` list.
+        """
+        self.ccs.append(cc)
+
+    def add_bcc(self, bcc: EmailAddress) -> None:
+        """Add a blind carbon-copy recipient.
+
+        Args:
+            bcc: Address to append to the ``Bcc`` list (not exposed in headers).
+        """
+        self.bccs.append(bcc)
+
+    @overload
+    def send(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        *,
+        raw: Literal["str"] = "str",
+    ) -> Tuple[str, SendResult]: ...
+
+    @overload
+    def send(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        *,
+        raw: Literal["bytes"],
+    ) -> Tuple[memoryview, SendResult]: ...
+
+    @overload
+    def send(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        *,
+        raw: None,
+    ) -> Tuple[None, SendResult]: ...
+
+    def send(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        *,
+        raw: Literal["str", "bytes"] | None = "str",
+    ) -> Tuple[str | memoryview | None, SendResult]:
+        """Build, deliver, and return the serialized email message.
+
+        Compose a MIME message from the provided parts, send it using the
+        configured SMTP server, and return the raw RFC 5322 message (as a
+        string by default) together with a :class:`SendResult` detailing
+        per-recipient success or failure.
+
+        The message is flattened exactly once, into a bytes buffer that is
+        handed to the SMTP ``DATA`` phase and, depending on ``raw``, returned
+        to the caller.
+
+        Behavior
+        - Body: At least one of ``txt`` or ``html`` must be provided. If both
+          are provided, a ``multipart/alternative`` part is created. When
+          attachments are present, the top-level message becomes multipart and
+          attachments are added as base64-encoded ``application/octet-stream``.
+        - Headers: ``From``, ``To``, ``Date``, and ``Subject`` are set from the
+          instance fields. ``Reply-To`` and ``Return-Path`` are added when
+          available. Additional headers may be supplied via
+          ``additional_headers``.
+        - Message-ID: Uses provided ``msgid`` or generates one using the
+          sender domain.
+        - SMTP envelope: Sender is ``returnpath``; recipients are the union of
+          ``tos``, ``ccs``, and ``bccs``. If there are more of them than
+          ``SMTPServerInfo.max_recipients_per_transaction``, the message is
+          sent in several transactions (over up to
+          ``recipient_chunk_workers`` connections) and their outcomes are
+          merged into one result.
+        - Connection: borrowed from ``pool`` when set, otherwise opened for
+          this call only.
+        - Debugging: ``wants_smtp_level_debug`` enables low-level ``smtplib``
+          debug output for this call; ``wantsdebuglogging`` enables extra
+          application-level logging.
+
+        Args:
+            txt: Plaintext body content.
+            html: HTML body content.
+            files: File paths to attach to the message.
+            msgid: Explicit ``Message-ID`` to set; a suitable value is
+                generated if omitted.
+            wantsdebuglogging: Emit additional application-level debug logs for
+                this call.
+            wants_smtp_level_debug: Enable ``smtplib`` debug output
+                (``SMTP.set_debuglevel(1)``) for this connection.
+            additional_headers: Extra headers to add to the message.
+            raw: Shape of the returned raw message: ``"str"`` (default) for
+                the decoded text, ``"bytes"`` for a ``memoryview`` that skips
+                decoding it, or ``None`` to not return it. Without streamed
+                attachments the view is on the rendered buffer itself (no
+                copy beyond flattening); with them the remaining pieces are
+                joined into a new buffer, without the attachment bodies.
+
+        Returns:
+            A tuple ``(raw_message, result)`` where ``raw_message`` is the full
+            RFC 5322 message as sent (CRLF line endings; see ``raw``), in the
+            form the server accepted (e.g. re-encoded as quoted-printable for
+            a server without 8BITMIME), and
+            ``result`` is a :class:`SendResult` describing per-recipient
+            delivery outcomes.
+
+        Raises:
+            Exception: If both ``txt`` and ``html`` are ``None``.
+            OSError: If an attachment file cannot be read.
+            smtplib.SMTPException: For SMTP errors during connection/login/send.
+
+        Example:
+            >>> raw, res = mailer.send(
+            ...     txt="Hello",
+            ...     files=[Path("/tmp/report.txt")],
+            ...     wants_smtp_level_debug=False,
+            ... )
+            >>> res.all_succeeded()
+            True
+        """
+
+        logger = self.logger.bind(skiplog=not wantsdebuglogging)  # self.logger is MRSendMail.logger
+
+        started: float = time.perf_counter()
+        message, msgid = self._build_message(
+            logger,
+            subject=self.subject,
+            tos=self.tos,
+            ccs=self.ccs,
+            txt=txt,
+            html=html,
+            files=files,
+            msgid=msgid,
+            additional_headers=additional_headers,
+            wantsdebuglogging=wantsdebuglogging,
+        )
+
+        rendered: _RenderedMessage = _render(message, utf8_headers=self.negotiate_8bit)
+        composed: float = time.perf_counter() - started
+
+        rcpts: list[str] = [k.envelope() for k in self.tos + self.ccs + self.bccs]
+        sr, sent = self._deliver(logger, rendered, rcpts, wantsdebuglogging, wants_smtp_level_debug)
+        sr.timings["compose"] = composed
+        self._emit_metrics(logger, sr)
+
+        return _raw_message(sent, raw), sr
+
+    def send_many(
+        self,
+        specs: Iterable[MailSpec],
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+    ) -> Dict[str, SendResult]:
+        """Deliver a batch of messages over a single SMTP session.
+
+        Each :class:`MailSpec` is composed like a :meth:`send` call, with
+        unset spec fields falling back to this instance's ``subject``,
+        ``tos``, ``ccs`` and ``bccs``. All messages share one connection
+        (borrowed from ``pool`` when set); consecutive messages are
+        separated by ``RSET``. Recipient lists over the server's
+        per-transaction limit are split as in :meth:`send`, but always
+        sequentially on the shared connection. The instance itself is not modified, so there
+        is no need to mutate ``tos``/``ccs`` between messages.
+
+        A message refused by the server does not abort the batch; its failure
+        is recorded in its :class:`SendResult` and the next message follows.
+        If the server drops the connection (e.g. after a ``421`` reply), the
+        batch continues on a new session; if none can be opened, the
+        remaining messages are recorded as failed with a ``421``. The
+        results of the messages sent so far are always returned.
+
+        Args:
+            specs: The messages to send; may be a lazy iterable.
+            wantsdebuglogging: Emit additional application-level debug logs.
+            wants_smtp_level_debug: Enable ``smtplib`` debug output for the
+                connection.
+
+        Returns:
+            dict[str, SendResult]: One result per message, keyed by its
+            ``Message-ID`` (in sending order).
+
+        Raises:
+            Exception: If a spec has neither ``txt`` nor ``html``.
+            OSError: If an attachment file cannot be read or the connection
+                breaks.
+            smtplib.SMTPException: If the connection cannot be established or
+                authenticated.
+
+        Example:
+            >>> results = mailer.send_many(
+            ...     MailSpec(txt=body, tos=[EmailAddress.from_str(to)]) for to, body in reports
+            ... )
+            >>> all(r.all_succeeded() for r in results.values())
+            True
+        """
+        logger = self.logger.bind(skiplog=not wantsdebuglogging)
+
+        pool: SMTPConnectionPool = self._connection_pool()
+
+        ret: Dict[str, SendResult] = {}
+
+        session: Optional[PooledSMTPSession] = pool.acquire(self.serverinfo, wants_smtp_level_debug)
+        lost: Optional[smtplib.SMTPResponseException] = None
+        try:
+            for spec in specs:
+                if session is not None and len(ret) > 0:
+                    try:
+                        session.smtp.rset()
+                    except (smtplib.SMTPException, OSError) as ex:
+                        logger.warning(f"session lost after {len(ret)} messages ({ex!r}); reconnecting")
+                        pool.release(session, reusable=False)
+                        session = None
+                        try:
+                            session = pool.acquire(self.serverinfo, wants_smtp_level_debug)
+                        except (smtplib.SMTPException, OSError) as ex:
+                            lost = _connection_lost(ex)
+
+                msgid, sr = self._send_spec(logger, session, spec, wantsdebuglogging, lost)
+                ret[msgid] = sr
+        except BaseException:
+            if session is not None:
+                pool.release(session, reusable=False)
+            raise
+
+        if session is not None:
+            pool.release(session)
+        return ret
+
+    def enqueue(
+        self,
+        outbox: Outbox,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        additional_headers: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Compose a message like :meth:`send` and store it for later delivery.
+
+        Returns as soon as the rendered message is committed to ``outbox``;
+        an :class:`~reputils.Outbox.OutboxWorker` delivers it, retrying
+        transient failures. Attachments are always stored in full, also with
+        ``stream_attachments``.
+
+        Args:
+            outbox: The :class:`~reputils.Outbox.Outbox` to store the message in.
+            txt: Plaintext body content.
+            html: HTML body content.
+            files: File paths to attach to the message.
+            msgid: Explicit ``Message-ID``; generated if omitted.
+            additional_headers: Extra headers to add to the message.
+
+        Returns:
+            The ``Message-ID`` of the message, for :meth:`Outbox.status`.
+
+        Raises:
+            Exception: If both ``txt`` and ``html`` are ``None``.
+            OSError: If an attachment file cannot be read.
+        """
+        logger = self.logger.bind(skiplog=True)
+
+        message, msgid = self._build_message(
+            logger,
+            subject=self.subject,
+            tos=self.tos,
+            ccs=self.ccs,
+            txt=txt,
+            html=html,
+            files=files,
+            msgid=msgid,
+            additional_headers=additional_headers,
+            negotiate_8bit=False,
+        )
+        rendered: _RenderedMessage = _render(message).seven_bit()
+
+        rcpts: list[str] = [k.envelope() for k in self.tos + self.ccs + self.bccs]
+        outbox.enqueue(self._envelope_sender(), rcpts, b"".join(rendered.iter_chunks()), msgid)
+
+        return msgid
+
+    def compile(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        additional_headers: Optional[Dict[str, str]] = None,
+    ) -> MessageSkeleton:
+        """Pre-render a message for sending to many recipients one by one.
+
+        Builds and flattens the message once, exactly as :meth:`send` would,
+        using this instance's sender fields, ``subject`` and ``ccs``. Send the
+        result with :meth:`send_compiled`, which only adds ``Message-ID``,
+        ``To`` and ``Date`` per call.
+
+        Args:
+            txt: Plaintext body content.
+            html: HTML body content.
+            files: File paths to attach to the message.
+            additional_headers: Extra headers to add to the message.
+
+        Returns:
+            An immutable :class:`MessageSkeleton`.
+
+        Raises:
+            Exception: If both ``txt`` and ``html`` are ``None``.
+            OSError: If an attachment file cannot be read.
+
+        Example:
+            >>> skeleton = mailer.compile(html=newsletter, files=[Path("/tmp/terms.pdf")])
+            >>> for rcpt in subscribers:
+            ...     mailer.send_compiled(skeleton, tos=[rcpt], raw=None)
+        """
+        logger = self.logger.bind(skiplog=True)
+
+        message, _ = self._build_message(
+            logger,
+            subject=self.subject,
+            tos=[],
+            ccs=self.ccs,
+            txt=txt,
+            html=html,
+            files=files,
+            msgid="<skeleton@invalid>",
+            additional_headers=additional_headers,
+            negotiate_8bit=False,
+        )
+
+        return MessageSkeleton.from_rendered(
+            _render(message).seven_bit(), ccs=self.ccs, msgid_domain=self._msgid_domain()
+        )
+
+    @overload
+    def send_compiled(
+        self,
+        skeleton: MessageSkeleton,
+        tos: Optional[List[EmailAddress]] = None,
+        bccs: Optional[List[EmailAddress]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        *,
+        raw: Literal["str"] = "str",
+    ) -> Tuple[str, SendResult]: ...
+
+    @overload
+    def send_compiled(
+        self,
+        skeleton: MessageSkeleton,
+        tos: Optional[List[EmailAddress]] = None,
+        bccs: Optional[List[EmailAddress]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        *,
+        raw: Literal["bytes"],
+    ) -> Tuple[memoryview, SendResult]: ...
+
+    @overload
+    def send_compiled(
+        self,
+        skeleton: MessageSkeleton,
+        tos: Optional[List[EmailAddress]] = None,
+        bccs: Optional[List[EmailAddress]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        *,
+        raw: None,
+    ) -> Tuple[None, SendResult]: ...
+
+    def send_compiled(
+        self,
+        skeleton: MessageSkeleton,
+        tos: Optional[List[EmailAddress]] = None,
+        bccs: Optional[List[EmailAddress]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        wants_smtp_level_debug: bool = False,
+        *,
+        raw: Literal["str", "bytes"] | None = "str",
+    ) -> Tuple[str | memoryview | None, SendResult]:
+        """Send a :class:`MessageSkeleton` produced by :meth:`compile`.
 
-        # sendme ist der technische sender im "MAIL FROM: {}"-header
-        sendme: str = EmailAddress.formataddr(
-            self.senderfrom if not self.returnpath else self.returnpath  # type: ignore
-        )
-        rcpts: list[str] = [k.formataddr_self() for k in self.tos + self.ccs + self.bccs]
+        Only the ``Message-ID``, ``To`` and ``Date`` headers are generated;
+        everything else is reused from the skeleton. The envelope recipients
+        are ``tos`` plus the skeleton's ``ccs`` plus ``bccs``. The connection
+        is handled as in :meth:`send`.
 
-        logger.debug(f"{sendme=}")
+        Args:
+            skeleton: The pre-rendered message.
+            tos: Primary recipients; defaults to this instance's ``tos``.
+            bccs: Blind carbon-copy recipients; defaults to this instance's
+                ``bccs``.
+            msgid: Explicit ``Message-ID``; generated if omitted.
+            wantsdebuglogging: Emit additional application-level debug logs.
+            wants_smtp_level_debug: Enable ``smtplib`` debug output.
+            raw: Shape of the returned raw message, see :meth:`send`.
 
-        sr: SendResult = SendResult(num_recipients=len(self.tos) + len(self.ccs) + len(self.bccs), num_failed=0)
+        Returns:
+            A tuple ``(raw_message, result)`` as returned by :meth:`send`.
+        """
+        logger = self.logger.bind(skiplog=not wantsdebuglogging)
 
-        with smtplib.SMTP(self.serverinfo.smtp_server, self.serverinfo.smtp_port) as server:
-            if self.serverinfo.wantsdebug or wants_smtp_level_debug:
-                server.set_debuglevel(1)
-            if self.serverinfo.use_start_tls:
-                # context = ssl._create_unverified_context()
-                context = ssl.create_default_context()
-                # context.verify_mode = ssl.CERT_NONE
-                if self.serverinfo.ignoresslerrors:
-                    context.check_hostname = False
-                    context.verify_mode = ssl.CERT_NONE
+        if tos is None:
+            tos = self.tos
+        if bccs is None:
+            bccs = self.bccs
+        if msgid is None:
+            msgid = utils.make_msgid(domain=skeleton.msgid_domain)
 
-            # Try to log in to server and send email
+        started: float = time.perf_counter()
+        rendered: _RenderedMessage = skeleton.render(tos, msgid)
+        composed: float = time.perf_counter() - started
+
+        rcpts: list[str] = [k.envelope() for k in [*tos, *skeleton.ccs, *bccs]]
+        sr, sent = self._deliver(logger, rendered, rcpts, wantsdebuglogging, wants_smtp_level_debug)
+        sr.timings["compose"] = composed
+        self._emit_metrics(logger, sr)
+
+        return _raw_message(sent, raw), sr
+
+    @overload
+    async def asend(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        *,
+        raw: Literal["str"] = "str",
+    ) -> Tuple[str, SendResult]: ...
+
+    @overload
+    async def asend(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        *,
+        raw: Literal["bytes"],
+    ) -> Tuple[memoryview, SendResult]: ...
+
+    @overload
+    async def asend(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        *,
+        raw: None,
+    ) -> Tuple[None, SendResult]: ...
+
+    async def asend(
+        self,
+        txt: Optional[str] = None,
+        html: Optional[str] = None,
+        files: Optional[List[Path]] = None,
+        msgid: Optional[str] = None,
+        wantsdebuglogging: bool = False,
+        additional_headers: Optional[Dict[str, str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        *,
+        raw: Literal["str", "bytes"] | None = "str",
+    ) -> Tuple[str | memoryview | None, SendResult]:
+        """Asynchronous counterpart of :meth:`send`.
+
+        Composes the message exactly like :meth:`send` and delivers it over
+        an :class:`~reputils.AsyncSMTP.AsyncSMTPClient` (asyncio streams,
+        STARTTLS via ``loop.start_tls``, AUTH PLAIN/LOGIN), so the event loop
+        is never blocked on the SMTP dialogue. Each call uses its own
+        connection; ``pool`` is not consulted.
+
+        The number of concurrently open SMTP connections is bounded by
+        ``semaphore``; by default all ``asend`` calls on the running event
+        loop share one semaphore of :attr:`asend_max_concurrency` slots.
+
+        Args:
+            txt: Plaintext body content.
+            html: HTML body content.
+            files: File paths to attach to the message.
+            msgid: Explicit ``Message-ID`` to set.
+            wantsdebuglogging: Emit additional application-level debug logs.
+            additional_headers: Extra headers to add to the message.
+            semaphore: Concurrency limit to use instead of the per-loop
+                default.
+            raw: Shape of the returned raw message, see :meth:`send`.
+
+        Returns:
+            A tuple ``(raw_message, result)`` as returned by :meth:`send`.
+
+        Raises:
+            Exception: If both ``txt`` and ``html`` are ``None``.
+            OSError: If an attachment file cannot be read or the server
+                cannot be reached.
+            smtplib.SMTPException: For SMTP errors not related to the
+                delivery outcome (e.g. a broken connection).
+
+        Example:
+            >>> results = await asyncio.gather(*(m.asend(txt=body) for m, body in jobs))
+        """
+        logger = self.logger.bind(skiplog=not wantsdebuglogging)
+
+        started: float = time.perf_counter()
+        message, msgid = self._build_message(
+            logger,
+            subject=self.subject,
+            tos=self.tos,
+            ccs=self.ccs,
+            txt=txt,
+            html=html,
+            files=files,
+            msgid=msgid,
+            additional_headers=additional_headers,
+            wantsdebuglogging=wantsdebuglogging,
+        )
+        rendered: _RenderedMessage = _render(message, utf8_headers=self.negotiate_8bit)
+        timings: Dict[str, float] = {"compose": time.perf_counter() - started}
+
+        sendme: str = self._envelope_sender()
+        rcpts: list[str] = [k.envelope() for k in self.tos + self.ccs + self.bccs]
+        parts: List[SendResult] = []
+
+        if semaphore is None:
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            semaphore = MRSendmail._asend_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = MRSendmail._asend_semaphores[loop] = asyncio.Semaphore(MRSendmail.asend_max_concurrency)
+
+        async with semaphore:
+            client: AsyncSMTPClient = AsyncSMTPClient(
+                self.serverinfo.smtp_server,
+                self.serverinfo.smtp_port,
+                ssl_context=_ssl_context(self.serverinfo) if self.serverinfo.use_implicit_tls else None,
+            )
             try:
-                server.ehlo()  # Can be omitted
+                started = time.perf_counter()
+                await client.connect()
+                await client.ehlo()
+                timings["connect"] = time.perf_counter() - started
                 if self.serverinfo.use_start_tls:
-                    server.starttls(context=context)  # Secure the connection
-                    server.ehlo()  # Can be omitted
-
+                    started = time.perf_counter()
+                    await client.starttls(_ssl_context(self.serverinfo))
+                    await client.ehlo()
+                    timings["tls"] = time.perf_counter() - started
                 if self.serverinfo.smtp_pass and self.serverinfo.smtp_user:
-                    server.login(self.serverinfo.smtp_user, self.serverinfo.smtp_pass)
-
-                # # server.sendmail(sendme, rcpts, message.as_string())
-                # print(f"SENDING MAIL FROM ||{sendme}||:")
-                # print(message.as_string())
-                #
-                # ########################## Content  Type #################
-                # print("\nContent Type           : {}".format(message.get_content_type()))
-                # print("Is Multipart?          : {}".format(message.is_multipart()))
-                # print("Content Disposition    : {}".format(message.get_content_disposition()))
-                #
-                # ################# Message Parts #####################
-                # print("\n================ Message Parts ===================")
-                # for part in message.walk():  # message.iter_parts() || message.iter_attachments():
-                #     print("\nAttachment Type        : {}".format(type(part)))
-                #     print("Content Type           : {}".format(part.get_content_type()))
-                #     print("Is Multipart?          : {}".format(part.is_multipart()))
-                #     # print("Is Attachment?         : {}".format(part.is_attachment()))
-                #     print("Content Disposition    : {}".format(part.get_content_disposition()))
+                    started = time.perf_counter()
+                    await client.login(self.serverinfo.smtp_user, self.serverinfo.smtp_pass)
+                    timings["auth"] = time.perf_counter() - started
 
                 if wantsdebuglogging:
-                    logger.debug(message.as_string())
-
-                # it returns a dictionary, with one entry for each recipient that was refused. Each entry contains a tuple of the SMTP error code and the accompanying error message sent by the server.
-                # if only one recipient is supplied and that one recipient fails, SMTPRecipientsRefused is thrown (even if it rather should have been "SMTPSenderRefused")
-                failed_recipients: Dict[str, tuple[int, bytes]] = server.send_message(message, sendme, rcpts)
-                sr.num_failed = len(failed_recipients)
-
-                if sr.num_failed > 0:
-                    logger.debug("EXCEPTIONS FOUND")
-
-                    sr.fail_exceptions = [smtplib.SMTPRecipientsRefused(failed_recipients)]
-
-                    if wantsdebuglogging:
-                        for failed_recipient, (smtp_error_code, smtp_error_msg_bytes) in failed_recipients.items():
-                            logger.debug(
-                                f"Failed to send to: {failed_recipient} SMTP-ERROR-CODE: {smtp_error_code} SMTP-ERROR-MESSAGE: {smtp_error_msg_bytes.decode("utf-8")}"
-                            )  # probably rather ascii
-                elif wantsdebuglogging:
-                    logger.debug("Sending (in terms of delivery into smtp-server) to all recipients was successfull.")
-
-            except smtplib.SMTPRecipientsRefused as srr:
-                logger.opt(exception=srr).error(srr)
-                # all failed
-                sr.num_failed = sr.num_recipients
-                sr.fail_exceptions = [srr]
-            except smtplib.SMTPSenderRefused as ssr:
-                logger.opt(exception=ssr).error(ssr)
-                # all failed
-                sr.num_failed = sr.num_recipients
-                sr.fail_exceptions = [ssr]
-            except smtplib.SMTPResponseException as sother:
-                logger.opt(exception=sother).error(sother)
-                sr.num_failed = sr.num_recipients
-                sr.fail_exceptions = [sother]
-
+                    logger.opt(lazy=True).debug("{}", lambda: str(rendered.raw(), "utf-8", "replace"))
+
+                mail_options: List[str]
+                rendered, mail_options = rendered.negotiate(client)
+                mail_options += _smtp_size_options(client, rendered.size())
+                for chunk in self._recipient_chunks(rcpts):
+                    sr: SendResult = SendResult(num_recipients=len(chunk), num_failed=0)
+                    parts.append(sr)
+                    try:
+                        failed_recipients: Dict[str, tuple[int, bytes]] = await client.sendmail(
+                            sendme, chunk, _count_bytes(rendered.iter_chunks(), sr), sr.timings, mail_options
+                        )
+                        self._record_result(logger, sr, failed_recipients, wantsdebuglogging)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as ex:
+                        self._record_failure(logger, sr, ex)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as ex:
+                # e.g. the login was refused
+                sr = SendResult(num_recipients=len(rcpts) - sum(p.num_recipients for p in parts), num_failed=0)
+                self._record_failure(logger, sr, ex)
+                parts.append(sr)
             finally:
-                server.quit()
+                await client.quit()
+
+        result: SendResult = SendResult.merged(parts)
+        result.timings.update(timings)
+        self._emit_metrics(logger, result)
+
+        return _raw_message(rendered, raw), result
+
+    def _send_spec(
+        self,
+        logger: "loguru.Logger",
+        session: Optional[PooledSMTPSession],
+        spec: MailSpec,
+        wantsdebuglogging: bool,
+        lost: Optional[smtplib.SMTPResponseException] = None,
+    ) -> Tuple[str, SendResult]:
+        """Compose ``spec`` (falling back to this instance's fields) and deliver it on ``session``.
+
+        Without a ``session`` every recipient is recorded as refused with ``lost``.
+        """
+        tos: List[EmailAddress] = self.tos if spec.tos is None else spec.tos
+        ccs: List[EmailAddress] = self.ccs if spec.ccs is None else spec.ccs
+        bccs: List[EmailAddress] = self.bccs if spec.bccs is None else spec.bccs
+
+        started: float = time.perf_counter()
+        message, msgid = self._build_message(
+            logger,
+            subject=self.subject if spec.subject is None else spec.subject,
+            tos=tos,
+            ccs=ccs,
+            txt=spec.txt,
+            html=spec.html,
+            files=spec.files,
+            msgid=spec.msgid,
+            additional_headers=spec.additional_headers,
+            wantsdebuglogging=wantsdebuglogging,
+        )
+
+        rendered: _RenderedMessage = _render(message, utf8_headers=self.negotiate_8bit)
+        composed: float = time.perf_counter() - started
+
+        rcpts: list[str] = [k.envelope() for k in tos + ccs + bccs]
+
+        sr: SendResult
+        if session is None:
+            sr = SendResult(num_recipients=len(rcpts), num_failed=0)
+            self._record_failure(logger, sr, lost or _connection_lost(smtplib.SMTPServerDisconnected()))
+        else:
+            sr = SendResult.merged(
+                self._transact_chunks(logger, session, rendered, self._recipient_chunks(rcpts), wantsdebuglogging)
+            )
+        sr.timings["compose"] = composed
+        self._emit_metrics(logger, sr)
+        return msgid, sr
+
+    def _recipient_chunks(self, rcpts: List[str]) -> List[List[str]]:
+        """Split ``rcpts`` into envelopes no larger than the server's per-transaction limit."""
+        limit: Optional[int] = self.serverinfo.max_recipients_per_transaction
+        if not limit or len(rcpts) <= limit:
+            return [rcpts]
+        return [rcpts[i : i + limit] for i in range(0, len(rcpts), limit)]
+
+    def _deliver(
+        self,
+        logger: "loguru.Logger",
+        rendered: _RenderedMessage,
+        rcpts: List[str],
+        wantsdebuglogging: bool,
+        wants_smtp_level_debug: bool,
+    ) -> Tuple[SendResult, _RenderedMessage]:
+        """Deliver ``rendered`` to ``rcpts`` in as many transactions as needed.
+
+        The transactions are spread over up to ``recipient_chunk_workers``
+        sessions from the connection pool; their outcomes are merged. With an
+        ``mx_resolver`` this hands over to :meth:`_deliver_mx`.
+
+        Returns:
+            The merged result and the form of the message the first accepting
+            server took (see :meth:`_RenderedMessage.negotiate`), or
+            ``rendered`` if none accepted it.
+        """
+        sent: List[_RenderedMessage] = []
+        if self.mx_resolver is not None:
+            sr: SendResult = self._deliver_mx(
+                logger, self.mx_resolver, rendered, rcpts, wantsdebuglogging, wants_smtp_level_debug, sent
+            )
+            return sr, sent[0] if sent else rendered
+
+        chunks: List[List[str]] = self._recipient_chunks(rcpts)
+        workers: int = max(1, min(self.recipient_chunk_workers, len(chunks)))
+        pool: SMTPConnectionPool = self._connection_pool()
+
+        def run(group: List[List[str]]) -> List[SendResult]:
+            parts: List[SendResult] = []
+            # Try to log in to server and send email
+            try:
+                with pool.session(self.serverinfo, wants_smtp_level_debug) as session:
+                    parts.extend(self._transact_chunks(logger, session, rendered, group, wantsdebuglogging, sent))
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as ex:
+                # e.g. the login was refused
+                sr: SendResult = SendResult(num_recipients=sum(len(c) for c in group[len(parts) :]), num_failed=0)
+                self._record_failure(logger, sr, ex)
+                parts.append(sr)
+            return parts
+
+        if workers == 1:
+            return SendResult.merged(run(chunks)), sent[0] if sent else rendered
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reputils-rcpt") as executor:
+            merged: SendResult = SendResult.merged(
+                sr for parts in executor.map(run, [chunks[i::workers] for i in range(workers)]) for sr in parts
+            )
+        return merged, sent[0] if sent else rendered
+
+    def _deliver_mx(
+        self,
+        logger: "loguru.Logger",
+        resolver: MXResolver,
+        rendered: _RenderedMessage,
+        rcpts: List[str],
+        wantsdebuglogging: bool,
+        wants_smtp_level_debug: bool,
+        sent: List[_RenderedMessage],
+    ) -> SendResult:
+        """Deliver ``rendered`` directly to the mail exchangers of the recipients' domains.
+
+        One group per domain, delivered in parallel; within a group the MX
+        hosts are tried by preference until one accepts the transaction(s).
+        A host that fails during the handshake is skipped. If the connection
+        breaks during a transaction, the transactions that already got their
+        final reply are kept and only the remaining ones are retried on the
+        next host. Recipients whose domain cannot be resolved or reached are
+        recorded as refused (``5xx`` for domains that do not exist or accept no
+        mail and for hosts lacking an extension the message needs, ``4xx``
+        otherwise). The forms of the message the hosts accepted are appended
+        to ``sent``.
+        """
+        groups: Dict[str, List[str]] = {}
+        for rcpt in rcpts:
+            groups.setdefault(rcpt.rpartition("@")[2].lower(), []).append(rcpt)
+        pool: SMTPConnectionPool = self._connection_pool()
+
+        def refused(group: List[str], code: int, message: str) -> SendResult:
+            sr: SendResult = SendResult(num_recipients=len(group), num_failed=0)
+            reply: bytes = message.encode("utf-8")
+            self._record_failure(logger, sr, smtplib.SMTPRecipientsRefused({r: (code, reply) for r in group}))
+            return sr
+
+        def run(domain: str, group: List[str]) -> List[SendResult]:
+            try:
+                records: List[MXRecord] = resolver.resolve(domain)
+            except LookupError as ex:
+                return [refused(group, 550, f"5.1.2 {ex}")]
+            except OSError as ex:
+                return [refused(group, 451, f"4.4.3 {ex}")]
+
+            if not records or (len(records) == 1 and records[0].host in ("", ".")):
+                return [refused(group, 556, f"5.1.10 {domain} does not accept mail")]  # null MX, RFC 7505
+
+            chunks: List[List[str]] = self._recipient_chunks(group)
+            parts: List[SendResult] = []
+            error: OSError = OSError(f"no mail exchanger of {domain} could be reached")
+            for record in records:
+                serverinfo: SMTPServerInfo = replace(
+                    self.serverinfo, smtp_server=record.host, smtp_port=record.port, smtp_user=None, smtp_pass=None
+                )
+                try:
+                    session: PooledSMTPSession = pool.acquire(serverinfo, wants_smtp_level_debug)
+                except OSError as ex:  # includes smtplib.SMTPException: greeting, EHLO or STARTTLS refused
+                    logger.warning("MX {}:{} of {} failed: {}", record.host, record.port, domain, ex)
+                    error = ex
+                    continue
+
+                try:
+                    # a transaction only counts once its final reply is in; an interrupted one is retried
+                    for chunk in chunks[len(parts) :]:
+                        sr: SendResult = SendResult(num_recipients=len(chunk), num_failed=0)
+                        self._transact(logger, session, rendered, chunk, sr, wantsdebuglogging, sent)
+                        parts.append(sr)
+                except smtplib.SMTPNotSupportedError as ex:  # raised before MAIL FROM, the session is clean
+                    pool.release(session)
+                    logger.warning("MX {}:{} of {} failed: {}", record.host, record.port, domain, ex)
+                    error = ex
+                    continue
+                except OSError as ex:
+                    pool.release(session, reusable=False)
+                    logger.warning(
+                        "MX {}:{} of {} failed after {} of {} transactions: {}",
+                        record.host,
+                        record.port,
+                        domain,
+                        len(parts),
+                        len(chunks),
+                        ex,
+                    )
+                    error = ex
+                    continue
+                except BaseException:
+                    pool.release(session, reusable=False)
+                    raise
+                pool.release(session)
+                return parts
+
+            rest: List[str] = [rcpt for chunk in chunks[len(parts) :] for rcpt in chunk]
+            if isinstance(error, smtplib.SMTPNotSupportedError):
+                return parts + [refused(rest, 554, f"5.3.3 {error}")]
+            if isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500:
+                reply: bytes | str = error.smtp_error
+                text: str = reply if isinstance(reply, str) else reply.decode("utf-8", "replace")
+                return parts + [refused(rest, error.smtp_code, text)]
+            return parts + [refused(rest, 451, f"4.4.1 {error}")]
+
+        workers: int = max(1, min(self.mx_max_workers, len(groups)))
+        if workers == 1:
+            return SendResult.merged(sr for domain, group in groups.items() for sr in run(domain, group))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reputils-mx") as executor:
+            return SendResult.merged(sr for parts in executor.map(run, groups, groups.values()) for sr in parts)
+
+    def _transact_chunks(
+        self,
+        logger: "loguru.Logger",
+        session: PooledSMTPSession,
+        rendered: _RenderedMessage,
+        chunks: List[List[str]],
+        wantsdebuglogging: bool,
+        sent: Optional[List[_RenderedMessage]] = None,
+    ) -> List[SendResult]:
+        """Run one transaction per recipient chunk on ``session``, one result each."""
+        ret: List[SendResult] = []
+        for chunk in chunks:
+            sr: SendResult = SendResult(num_recipients=len(chunk), num_failed=0)
+            self._transact(logger, session, rendered, chunk, sr, wantsdebuglogging, sent)
+            ret.append(sr)
+        return ret
+
+    def _connection_pool(self) -> SMTPConnectionPool:
+        """Return ``pool`` or, without one, a pool that never keeps sessions.
+
+        The latter turns every borrowed session into a single-use connection:
+        with ``max_messages_per_connection=0`` each release closes the session,
+        also after a failed transaction, so the throwaway pool never holds a
+        socket and needs no :meth:`SMTPConnectionPool.close`.
+        """
+        return self.pool if self.pool is not None else SMTPConnectionPool(max_messages_per_connection=0)
+
+    def _build_message(
+        self,
+        logger: "loguru.Logger",
+        subject: str,
+        tos: List[EmailAddress],
+        ccs: List[EmailAddress],
+        txt: Optional[str],
+        html: Optional[str],
+        files: Optional[List[Path]],
+        msgid: Optional[str],
+        additional_headers: Optional[Dict[str, str]],
+        wantsdebuglogging: bool = False,
+        negotiate_8bit: Optional[bool] = None,
+    ) -> Tuple[EmailMessage | MIMEMultipart, str]:
+        """Compose the MIME message for one transaction.
+
+        The header values are only logged with ``wantsdebuglogging``.
+        ``negotiate_8bit`` overrides the attribute of the same name (forms
+        that are stored rather than negotiated, like skeletons, need the
+        7bit-safe encoding).
+
+        Returns:
+            The message and its ``Message-ID``.
+        """
+        if txt is None and html is None:
+            raise Exception("either on of txt and html must not be null")
+        kk: int = 0
+        hastxtandhtml: bool = False
+        if txt is not None and html is not None:
+            hastxtandhtml = True
+        if txt is not None:
+            kk += 1
+        if html is not None:
+            kk += 1
+        if files is not None and len(files) > 0:
+            kk += 1
+
+        message: EmailMessage | MIMEMultipart = EmailMessage() if kk == 1 else MIMEMultipart()
+
+        ################ Set Headers ###################
+        fromme: EmailAddress = self.returnpath if not self.senderfrom else self.senderfrom
+        if wantsdebuglogging:
+            logger.debug("fromme={!r}", fromme)
+
+        if fromme:
+            message.add_header("From", fromme.formataddr_self())
+        if self.replyto:
+            message.add_header("Reply-To", self.replyto.formataddr_self())
+        if self.returnpath:
+            message.add_header("Return-Path", self.returnpath.formataddr_self())
+
+        if msgid is not None:
+            # msg['message-id'] = utils.make_msgid(domain='mydomain.com')
+            message.add_header("Message-ID", msgid)
+        else:
+            fromdomain: str | None = self._msgid_domain()
+            if wantsdebuglogging:
+                logger.debug("fromdomain={!r}", fromdomain)
+            msgid = utils.make_msgid(domain=fromdomain)
+            message.add_header("Message-ID", msgid)
+
+        if wantsdebuglogging:
+            logger.debug("set Message-ID to msgid={!r}", msgid)
+
+        message.add_header("To", ", ".join(k.formataddr_self() for k in tos))
+        nowdate: datetime.datetime = datetime.datetime.now(tz=_tzberlin)
+        nowdate_str: str = _formatdate(nowdate)
+        if wantsdebuglogging:
+            logger.debug("nowdate.tzinfo={!r} nowdate={!r} nowdate_str={!r}", nowdate.tzinfo, nowdate, nowdate_str)
+        message.add_header("Date", nowdate_str)
+        if negotiate_8bit is None:
+            negotiate_8bit = self.negotiate_8bit
+        message.add_header("Subject", _header_value(subject, negotiate_8bit))
 
-        return message.as_string(), sr
+        if additional_headers:
+            for k, v in additional_headers.items():
+                # message.add_header(k, _csqp.header_encode_lines(v, 100))
+                message.add_header(k, _header_value(v, negotiate_8bit))
+
+        if len(ccs) > 0:
+            message.add_header("Cc", ", ".join(k.formataddr_self() for k in ccs))
+
+        # message.set_charset(_csqp)
+        # message.set_payload(txt, _csqp)
+
+        if kk == 1:
+            body: str = html if html is not None else txt  # type: ignore[assignment]
+            # the default picks 8bit only for lines up to 78 characters, quoted-printable or base64 beyond
+            cte: Optional[str] = "8bit" if negotiate_8bit and not body.isascii() and _fits_8bit(body) else None
+            if html is not None:
+                message.set_content(html, "html", cte=cte)  # type: ignore
+                # message.set_default_type("text/html")
+            else:
+                message.set_content(txt, "plain", cte=cte)  # type: ignore
+                # message.set_default_type("text/plain")
+        else:
+            txtpart: Optional[MIMEText] = None
+            htmlpart: Optional[MIMEText] = None
+
+            if txt is not None:
+                txtpart = _text_part(txt, "plain", negotiate_8bit)
+                # txtpart.set_charset(_csqp)
+                # txtpart.add_header("Content-Transfer-Encoding", "quoted-printable")  #Content-Type: text/plain; charset="utf-8"
+
+            if html is not None:
+                htmlpart = _text_part(html, "html", negotiate_8bit)
+                # htmlpart.set_charset(_csqp)
+
+            if hastxtandhtml:
+                submsg: MIMEMultipart = MIMEMultipart("alternative")
+                submsg.attach(txtpart)  # type: ignore
+                submsg.attach(htmlpart)  # type: ignore
+                message.attach(submsg)  # type: ignore
+            else:
+                if txtpart is not None:
+                    message.attach(txtpart)  # type: ignore
+                if htmlpart is not None:
+                    message.attach(htmlpart)  # type: ignore
+
+        ############# Add Attachments #############################
+        if files:
+            compression: Optional[AttachmentCompression] = self.attachment_compression
+            compressed: Dict[int, MIMEBase] = (
+                {} if compression is None else compression.parts(files, self.stream_attachments)
+            )
+            for index, path in enumerate(files):
+                # mime_type, encoding = mimetypes.guess_type(str(path.absolute()))
+                # print(f"{path=} {mime_type=} {encoding=}")
+                # with open(path, "rb") as fp:
+                #     data = fp.read()
+                #     message.add_attachment(data, maintype=mime_type.split("/")[0],
+                #         subtype=mime_type.split("/")[1],
+                #         filename=path.name)
+
+                part: MIMEBase
+                filename: str = path.name
+                if compression is not None and index in compressed:
+                    part = compressed[index]
+                    filename += compression.extension
+                elif self.stream_attachments:
+                    part = _StreamedAttachmentPart(path)
+                elif self.attachment_cache is not None:
+                    part = self.attachment_cache.part(path)
+                else:
+                    part = MIMEBase("application", "octet-stream")
+                    with open(path, "rb") as file:
+                        part.set_payload(file.read())
+                    encoders.encode_base64(part)
+                part.add_header("Content-Disposition", "attachment; filename={}".format(filename))
+                message.attach(part)  # type: ignore
+
+        return message, msgid
+
+    def _msgid_domain(self) -> Optional[str]:
+        """Domain for generated ``Message-ID`` headers.
+
+        The last one set of ``From`` (resp. ``returnpath``), ``Reply-To`` and
+        ``Return-Path`` wins.
+        """
+        fromme: EmailAddress = self.returnpath if not self.senderfrom else self.senderfrom
+        fromdomain: str | None = None
+        for addr in (fromme, self.replyto, self.returnpath):
+            if addr and "@" in addr.email:
+                fromdomain = addr.email.rpartition("@")[2]
+        return fromdomain
+
+    def _envelope_sender(self) -> str:
+        # sendme ist der technische sender im "MAIL FROM: {}"-header
+        return (self.senderfrom if not self.returnpath else self.returnpath).envelope()  # type: ignore
+
+    def _transact(
+        self,
+        logger: "loguru.Logger",
+        session: PooledSMTPSession,
+        rendered: _RenderedMessage,
+        rcpts: List[str],
+        sr: SendResult,
+        wantsdebuglogging: bool,
+        sent: Optional[List[_RenderedMessage]] = None,
+    ) -> None:
+        """Run one MAIL/RCPT/DATA transaction on ``session`` and fill ``sr``.
+
+        Server refusals are recorded in ``sr`` rather than raised; the session
+        is then flagged so the pool resets it before reuse. The form of the
+        message the server accepted is appended to ``sent``.
+        """
+        sendme: str = self._envelope_sender()
+
+        server: smtplib.SMTP = session.smtp
+
+        # # server.sendmail(sendme, rcpts, message.as_string())
+        # print(f"SENDING MAIL FROM ||{sendme}||:")
+        # print(message.as_string())
+        #
+        # ########################## Content  Type #################
+        # print("\nContent Type           : {}".format(message.get_content_type()))
+        # print("Is Multipart?          : {}".format(message.is_multipart()))
+        # print("Content Disposition    : {}".format(message.get_content_disposition()))
+        #
+        # ################# Message Parts #####################
+        # print("\n================ Message Parts ===================")
+        # for part in message.walk():  # message.iter_parts() || message.iter_attachments():
+        #     print("\nAttachment Type        : {}".format(type(part)))
+        #     print("Content Type           : {}".format(part.get_content_type()))
+        #     print("Is Multipart?          : {}".format(part.is_multipart()))
+        #     # print("Is Attachment?         : {}".format(part.is_attachment()))
+        #     print("Content Disposition    : {}".format(part.get_content_disposition()))
+
+        if wantsdebuglogging:
+            logger.debug("sendme={!r}", sendme)
+            logger.opt(lazy=True).debug("{}", lambda: str(rendered.raw(), "utf-8", "replace"))
+
+        if session.timings:
+            # the handshake is accounted to the first transaction on a fresh session
+            sr.timings.update(session.timings)
+            session.timings = {}
+
+        if server.sock is None:  # closed by the server (421) during an earlier transaction
+            session.dirty = True
+            self._record_failure(logger, sr, _connection_lost(smtplib.SMTPServerDisconnected("connection closed")))
+            return
+
+        try:
+            # it returns a dictionary, with one entry for each recipient that was refused. Each entry contains a tuple of the SMTP error code and the accompanying error message sent by the server.
+            # if only one recipient is supplied and that one recipient fails, SMTPRecipientsRefused is thrown (even if it rather should have been "SMTPSenderRefused")
+            failed_recipients: Dict[str, tuple[int, bytes]] = _smtp_sendmail(
+                server, sendme, rcpts, rendered, sr.timings, sr, sent
+            )
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as ex:
+            session.dirty = True
+            self._record_failure(logger, sr, ex)
+            return
+
+        session.num_messages += 1
+        self._record_result(logger, sr, failed_recipients, wantsdebuglogging)
+
+    @staticmethod
+    def _record_result(
+        logger: "loguru.Logger",
+        sr: SendResult,
+        failed_recipients: Dict[str, tuple[int, bytes]],
+        wantsdebuglogging: bool,
+    ) -> None:
+        """Fill ``sr`` from the refused-recipients dict of a completed transaction."""
+        sr.num_failed = len(failed_recipients)
+
+        if sr.num_failed > 0:
+            sr.fail_exceptions = [smtplib.SMTPRecipientsRefused(failed_recipients)]
+
+            if wantsdebuglogging:
+                logger.debug("EXCEPTIONS FOUND")
+                for failed_recipient, (smtp_error_code, smtp_error_msg_bytes) in failed_recipients.items():
+                    logger.debug(
+                        "Failed to send to: {} SMTP-ERROR-CODE: {} SMTP-ERROR-MESSAGE: {}",
+                        failed_recipient,
+                        smtp_error_code,
+                        smtp_error_msg_bytes.decode("utf-8", "replace"),  # probably rather ascii
+                    )
+        elif wantsdebuglogging:
+            logger.debug("Sending (in terms of delivery into smtp-server) to all recipients was successfull.")
+
+    def _emit_metrics(self, logger: "loguru.Logger", sr: SendResult) -> None:
+        """Hand ``sr`` to the server's ``metrics_hook``; a failing hook never fails the send."""
+        hook: Optional[Callable[[SMTPServerInfo, SendResult], None]] = self.serverinfo.metrics_hook
+        if hook is None:
+            return
+        try:
+            hook(self.serverinfo, sr)
+        except Exception as ex:
+            logger.opt(exception=ex).warning(f"metrics hook failed: {ex}")
+
+    @staticmethod
+    def _record_failure(
+        logger: "loguru.Logger",
+        sr: SendResult,
+        ex: smtplib.SMTPRecipientsRefused | smtplib.SMTPResponseException,
+    ) -> None:
+        """Mark every recipient of ``sr`` as failed because of ``ex``."""
+        logger.opt(exception=ex).error(ex)
+        # all failed
+        sr.num_failed = sr.num_recipients
+        sr.fail_exceptions = [ex]
+
+
+@dataclass
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Tokens accrue at ``rate`` per second up to ``capacity``; :meth:`acquire`
+    takes one token, sleeping until it is available. With ``capacity=1`` this
+    spaces events evenly at ``rate`` per second; a larger capacity allows
+    bursts of that size after idle periods.
+
+    Attributes:
+        rate: Tokens added per second.
+        capacity: Maximum number of tokens held (burst size).
+
+    Example:
+        >>> bucket = TokenBucket(rate=10.0)
+        >>> for job in jobs:
+        ...     bucket.acquire()  # at most 10 per second
+        ...     run(job)
+    """
+
+    rate: float
+    capacity: float = 1.0
+
+    _tokens: float = field(default=0.0, init=False, repr=False)
+    _stamp: float = field(default=0.0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.rate <= 0 or self.capacity < 1:
+            raise ValueError(f"invalid token bucket: {self.rate=} {self.capacity=}")
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` if available.
+
+        Returns:
+            ``0.0`` if the tokens were taken, otherwise the number of seconds
+            until they will be available.
+        """
+        with self._lock:
+            now: float = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Take ``tokens``, blocking until they are available."""
+        while (wait := self.try_acquire(tokens)) > 0:
+            time.sleep(wait)
+
+
+@dataclass
+class DeliveryEngine:
+    """Deliver queued messages over several SMTP connections in parallel.
+
+    ``connections_per_server`` worker threads each keep one authenticated
+    session to ``mailer.serverinfo`` open and take :class:`MailSpec` jobs from
+    a bounded queue. The session is reused for consecutive messages (and
+    replaced when it breaks or reaches the pool's
+    ``max_messages_per_connection``), so the handshake is paid once per worker
+    instead of once per message. A shared :class:`TokenBucket` caps the
+    overall message rate.
+
+    Messages are composed exactly like :meth:`MRSendmail.send_many` composes
+    them; server refusals end up in the message's :class:`SendResult`, while
+    connection and login errors are set on the message's future.
+
+    Attributes:
+        mailer: Provides server, sender, defaults for unset spec fields and,
+            if set, the connection pool.
+        connections_per_server: Number of worker threads, i.e. of concurrent
+            connections to the server.
+        messages_per_second: Upper bound of messages handed to the server per
+            second across all workers; ``None`` for no limit.
+        burst: Number of messages that may be sent back-to-back after an idle
+            period without waiting for the rate limit.
+        max_queued: Capacity of the job queue; :meth:`submit` blocks while it
+            is full.
+        wantsdebuglogging: Emit additional application-level debug logs.
+
+    Example:
+        >>> with DeliveryEngine(mailer, connections_per_server=8, messages_per_second=50) as engine:
+        ...     results = engine.send_all(MailSpec(txt=body, tos=[to]) for to, body in jobs)
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    mailer: MRSendmail
+    connections_per_server: int = 4
+    messages_per_second: Optional[float] = None
+    burst: int = 1
+    max_queued: int = 1000
+    wantsdebuglogging: bool = False
+
+    _queue: queue.Queue[Optional[Tuple[MailSpec, Future[Tuple[str, SendResult]]]]] = field(init=False, repr=False)
+    _bucket: Optional[TokenBucket] = field(default=None, init=False, repr=False)
+    _pool: SMTPConnectionPool = field(init=False, repr=False)
+    _threads: List[threading.Thread] = field(default_factory=list, init=False, repr=False)
+    _running: int = field(default=0, init=False, repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.connections_per_server < 1:
+            raise ValueError(f"{self.connections_per_server=} must be at least 1")
+        self._queue = queue.Queue(maxsize=self.max_queued)
+        if self.messages_per_second is not None:
+            self._bucket = TokenBucket(rate=self.messages_per_second, capacity=self.burst)
+        self._pool = (
+            self.mailer.pool
+            if self.mailer.pool is not None
+            else SMTPConnectionPool(max_idle_per_server=self.connections_per_server)
+        )
+
+    def submit(self, spec: MailSpec) -> Future[Tuple[str, SendResult]]:
+        """Queue one message for delivery.
+
+        Starts the workers on first use and blocks while the queue is full.
+
+        Returns:
+            A future resolving to ``(msgid, result)``.
+
+        Raises:
+            RuntimeError: If the engine has been closed.
+        """
+        future: Future[Tuple[str, SendResult]] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DeliveryEngine is closed")
+            if not self._threads:
+                for i in range(self.connections_per_server):
+                    thread = threading.Thread(target=self._work, name=f"reputils-delivery-{i}", daemon=True)
+                    self._running += 1
+                    thread.start()
+                    self._threads.append(thread)
+        self._queue.put((spec, future))
+        return future
+
+    def send_all(self, specs: Iterable[MailSpec]) -> Dict[str, SendResult]:
+        """Deliver all ``specs`` and wait for them.
+
+        Args:
+            specs: The messages to send; may be a lazy iterable.
+
+        Returns:
+            dict[str, SendResult]: One result per message, keyed by its
+            ``Message-ID`` (in submission order).
+
+        Raises:
+            OSError: If a connection could not be established or broke.
+            smtplib.SMTPException: If the server could not be reached or the
+                login was refused.
+        """
+        futures: List[Future[Tuple[str, SendResult]]] = [self.submit(spec) for spec in specs]
+        return dict(f.result() for f in futures)
+
+    def close(self, wait: bool = True) -> None:
+        """Stop accepting jobs and shut the workers down once the queue is drained.
+
+        A private pool (the mailer has none) is closed by the last worker to
+        exit, so its sessions are not left open with ``wait=False`` either.
+
+        Args:
+            wait: Block until all queued messages are delivered.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads: List[threading.Thread] = list(self._threads)
+
+        for _ in threads:
+            self._queue.put(None)
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def __enter__(self) -> DeliveryEngine:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _work(self) -> None:
+        logger = self.logger.bind(skiplog=not self.wantsdebuglogging)
+        session: Optional[PooledSMTPSession] = None
+
+        try:
+            while (item := self._queue.get()) is not None:
+                spec, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                if self._bucket is not None:
+                    self._bucket.acquire()
+
+                try:
+                    if session is not None and session.dirty:
+                        try:
+                            session.smtp.rset()
+                            session.dirty = False
+                        except (smtplib.SMTPException, OSError):  # e.g. closed after a 421
+                            self._pool.release(session, reusable=False)
+                            session = None
+                    if session is None:
+                        session = self._pool.acquire(self.mailer.serverinfo)
+                    result: Tuple[str, SendResult] = self.mailer._send_spec(
+                        logger, session, spec, self.wantsdebuglogging
+                    )
+                except Exception as ex:
+                    logger.opt(exception=ex).debug(f"delivery failed: {ex!r}")
+                    if session is not None:
+                        self._pool.release(session, reusable=False)
+                        session = None
+                    future.set_exception(ex)
+                    continue
+
+                future.set_result(result)
+
+                if session.num_messages >= self._pool.max_messages_per_connection:
+                    self._pool.release(session)
+                    session = None
+        finally:
+            if session is not None:
+                self._pool.release(session)
+            with self._lock:
+                self._running -= 1
+                last: bool = self._running == 0
+            if last and self.mailer.pool is None:
+                self._pool.close()
+
+
+@dataclass
+class _Histogram:
+    count: int = 0
+    sum: float = 0.0
+    buckets: List[int] = field(default_factory=list)
+
+
+@dataclass
+class _ServerMetrics:
+    counters: Dict[str, int] = field(default_factory=dict)
+    codes: Dict[int, int] = field(default_factory=dict)
+    phases: Dict[str, _Histogram] = field(default_factory=dict)
+
+
+@dataclass
+class MetricsRegistry:
+    """In-process counters and phase-duration histograms for sent messages.
+
+    An instance is callable with the signature of
+    ``SMTPServerInfo.metrics_hook``, so it can be plugged in directly; several
+    servers may share one registry, their figures are kept apart under a
+    ``"host:port"`` label. Histograms are cumulative (Prometheus style): each
+    bucket counts the observations less than or equal to its upper bound.
+
+    Attributes:
+        buckets: Upper bounds (seconds, ascending) of the phase histograms.
+
+    Example:
+        >>> metrics = MetricsRegistry()
+        >>> serverinfo = SMTPServerInfo("smtp.example.com", 587, metrics_hook=metrics)
+        >>> ...
+        >>> metrics.snapshot()["smtp.example.com:587"]["counters"]["messages"]
+        42
+    """
+
+    buckets: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    _servers: Dict[str, _ServerMetrics] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __call__(self, serverinfo: SMTPServerInfo, sr: SendResult) -> None:
+        self.observe(f"{serverinfo.smtp_server}:{serverinfo.smtp_port}", sr)
+
+    def observe(self, label: str, sr: SendResult) -> None:
+        """Account one sent message under ``label``."""
+        codes: Dict[int, int] = sr.codes_histogram()
+        with self._lock:
+            server: _ServerMetrics = self._servers.setdefault(label, _ServerMetrics())
+            for name, value in (
+                ("messages", 1),
+                ("messages_failed", 1 if sr.num_failed else 0),
+                ("recipients", sr.num_recipients),
+                ("recipients_failed", sr.num_failed),
+                ("bytes_sent", sr.bytes_sent),
+            ):
+                server.counters[name] = server.counters.get(name, 0) + value
+
+            for code, n in codes.items():
+                server.codes[code] = server.codes.get(code, 0) + n
+
+            for phase, seconds in sr.timings.items():
+                hist: _Histogram = server.phases.setdefault(phase, _Histogram(buckets=[0] * len(self.buckets)))
+                hist.count += 1
+                hist.sum += seconds
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        hist.buckets[i] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[Any, Any]]]:
+        """Return a copy of all figures, keyed by server label.
+
+        Per server: ``counters`` (``messages``, ``messages_failed``,
+        ``recipients``, ``recipients_failed``, ``bytes_sent``), ``codes``
+        (refused recipients per SMTP reply code) and ``phases`` (per phase
+        ``count``, ``sum`` and ``buckets`` as ``{upper_bound: count}``).
+        """
+        with self._lock:
+            return {
+                label: {
+                    "counters": dict(server.counters),
+                    "codes": dict(server.codes),
+                    "phases": {
+                        phase: {"count": hist.count, "sum": hist.sum, "buckets": dict(zip(self.buckets, hist.buckets))}
+                        for phase, hist in server.phases.items()
+                    },
+                }
+                for label, server in self._servers.items()
+            }
+
+    def reset(self) -> None:
+        """Forget everything observed so far."""
+        with self._lock:
+            self._servers.clear()
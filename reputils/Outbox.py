@@ -0,0 +1,479 @@
+import json
+import smtplib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ClassVar, Dict, Iterable, List, Literal, Optional, Tuple
+
+import loguru
+from loguru import logger as glogger
+
+from .MailReport import SendResult, SMTPConnectionPool, SMTPServerInfo, _RenderedMessage, _smtp_sendmail
+
+OutboxState = Literal["queued", "sending", "done"]
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    msgid TEXT NOT NULL,
+    mail_from TEXT NOT NULL,
+    pending TEXT NOT NULL,
+    failed TEXT NOT NULL DEFAULT '{}',
+    num_recipients INTEGER NOT NULL,
+    message BLOB NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt);
+CREATE INDEX IF NOT EXISTS outbox_msgid ON outbox (msgid);
+"""
+
+
+def _error_reply(error: BaseException) -> Tuple[int, str]:
+    """The SMTP reply carried by ``error``; code ``0`` for errors without one (e.g. connection errors)."""
+    code: int = getattr(error, "smtp_code", 0)
+    reply: bytes | str = getattr(error, "smtp_error", str(error))
+    return code, reply if isinstance(reply, str) else reply.decode("utf-8", "replace")
+
+
+@dataclass
+class OutboxEntry:
+    """A message in the :class:`Outbox` and its delivery progress.
+
+    Attributes:
+        id: Row id in the outbox.
+        msgid: ``Message-ID`` of the message.
+        mail_from: Envelope sender.
+        pending: Recipients still to be delivered (not yet tried or deferred
+            with a 4xx reply).
+        failed: Permanently failed recipients with their ``(code, message)``.
+        num_recipients: Number of recipients the message was enqueued for.
+        state: ``queued``, ``sending`` (claimed by a worker) or ``done``.
+        attempts: Delivery attempts made so far.
+        next_attempt: Epoch time before which the entry is not retried.
+        last_error: Description of the last transient failure, if any.
+    """
+
+    id: int
+    msgid: str
+    mail_from: str
+    pending: List[str]
+    failed: Dict[str, Tuple[int, str]]
+    num_recipients: int
+    state: OutboxState
+    attempts: int
+    next_attempt: float
+    last_error: Optional[str] = None
+
+    def send_result(self) -> SendResult:
+        """The outcome so far as a :class:`SendResult`.
+
+        Only permanent failures count as failed; recipients that are still
+        pending count as neither failed nor delivered yet.
+        """
+        sr: SendResult = SendResult(num_recipients=self.num_recipients, num_failed=len(self.failed))
+        if self.failed:
+            sr.fail_exceptions = [
+                smtplib.SMTPRecipientsRefused({k: (c, m.encode("utf-8")) for k, (c, m) in self.failed.items()})
+            ]
+        return sr
+
+
+@dataclass
+class Outbox:
+    """Durable on-disk queue of rendered messages, backed by SQLite.
+
+    :meth:`MRSendmail.enqueue` stores a fully rendered message here and
+    returns at once; an :class:`OutboxWorker` delivers it later. Every state
+    change is committed before it is acted upon, so a crashed process resumes
+    where it stopped: entries claimed by a worker that never reported back
+    are put back into the queue when the outbox is opened again. Delivery is
+    therefore at-least-once; a crash between ``DATA`` and the commit can
+    deliver a message twice. An outbox file must only be open in one process
+    at a time.
+
+    Transient failures (4xx replies, connection errors) are retried with
+    exponential backoff: ``base_delay * 2 ** (attempts - 1)``, capped at
+    ``max_delay``. 5xx replies and exceeding ``max_attempts`` are permanent.
+
+    Attributes:
+        path: SQLite database file; created if missing.
+        base_delay: Seconds to wait before the first retry.
+        max_delay: Upper bound of the retry delay in seconds.
+        max_attempts: Attempts after which transient failures become
+            permanent.
+
+    Example:
+        >>> outbox = Outbox(Path("/var/spool/reports/outbox.sqlite"))
+        >>> msgid = mailer.enqueue(outbox, txt=report)
+        >>> outbox.status(msgid).state
+        'queued'
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    path: Path | str
+    base_delay: float = 30.0
+    max_delay: float = 3600.0
+    max_attempts: int = 10
+
+    _db: sqlite3.Connection = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(_SCHEMA)
+
+        # resume after a crash: whatever was being sent is sent again
+        resumed: int = self._db.execute("UPDATE outbox SET state = 'queued' WHERE state = 'sending'").rowcount
+        if resumed:
+            self.logger.info(f"requeued {resumed} entries that were in flight when the outbox was last closed")
+
+    def enqueue(self, mail_from: str, rcpts: Iterable[str], message: bytes | memoryview, msgid: str) -> int:
+        """Store a rendered message for delivery.
+
+        Args:
+            mail_from: Envelope sender.
+            rcpts: Envelope recipients.
+            message: The flattened message with CRLF line endings.
+            msgid: ``Message-ID`` of the message, used for :meth:`status`.
+
+        Returns:
+            The id of the new entry.
+        """
+        pending: List[str] = list(rcpts)
+        now: float = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO outbox (msgid, mail_from, pending, num_recipients, message, next_attempt, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (msgid, mail_from, json.dumps(pending), len(pending), bytes(message), now, now),
+            )
+        assert cur.lastrowid is not None
+        return cur.lastrowid
+
+    def claim(self, now: Optional[float] = None) -> Optional[Tuple[OutboxEntry, bytes]]:
+        """Take the oldest due entry and mark it as being sent.
+
+        Returns:
+            The entry and its message, or ``None`` if nothing is due.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM outbox WHERE state = 'queued' AND next_attempt <= ? ORDER BY next_attempt, id "
+                    "LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE outbox SET state = 'sending' WHERE id = ?", (row[0],))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        entry: OutboxEntry = self._entry(row)
+        entry.state = "sending"
+        return entry, row[6]
+
+    def complete(
+        self,
+        entry: OutboxEntry,
+        refused: Dict[str, Tuple[int, bytes]],
+        tried: Iterable[str],
+        unreached: Iterable[str] = (),
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Record the outcome of a delivery attempt.
+
+        Args:
+            entry: The claimed entry.
+            refused: Recipients the server refused, with their replies.
+            tried: Recipients that were part of the attempt; those missing
+                from ``refused`` were accepted.
+            unreached: Recipients of the transaction that ``error`` aborted
+                after earlier transactions went through; classified like
+                :meth:`defer` does.
+            error: What aborted the attempt.
+        """
+        tried_set = set(tried)
+        failed: Dict[str, Tuple[int, str]] = dict(entry.failed)
+        pending: List[str] = [r for r in entry.pending if r not in tried_set]
+        attempts: int = entry.attempts + 1
+
+        for rcpt, (code, msg) in refused.items():
+            if 400 <= code < 500 and attempts < self.max_attempts:
+                pending.append(rcpt)
+            else:
+                failed[rcpt] = (code, msg.decode("utf-8", "replace"))
+
+        errors: List[str] = [f"{r}: {c} {m.decode('utf-8', 'replace')}" for r, (c, m) in refused.items()]
+        if error is not None:
+            error_code, error_msg = _error_reply(error)
+            unreached = [r for r in unreached if r in pending]
+            if error_code >= 500 or attempts >= self.max_attempts:
+                failed.update({r: (error_code, error_msg) for r in unreached})
+                pending = [r for r in pending if r not in failed]
+            errors.append(f"{type(error).__name__}: {error_code or ''} {error_msg}".strip())
+
+        self._store(entry, pending, failed, attempts, "; ".join(errors) if pending else None)
+
+    def defer(self, entry: OutboxEntry, error: BaseException, permanent: bool = False) -> None:
+        """Record a failed attempt that affected all pending recipients.
+
+        Args:
+            entry: The claimed entry.
+            error: What went wrong; SMTP replies are classified by their code.
+            permanent: Treat the failure as permanent regardless of its code.
+        """
+        attempts: int = entry.attempts + 1
+        code, msg = _error_reply(error)
+
+        failed: Dict[str, Tuple[int, str]] = dict(entry.failed)
+        pending: List[str] = list(entry.pending)
+        if permanent or code >= 500 or attempts >= self.max_attempts:
+            failed.update({r: (code, msg) for r in pending})
+            pending = []
+
+        self._store(entry, pending, failed, attempts, f"{type(error).__name__}: {code or ''} {msg}".strip())
+
+    def status(self, msgid_or_id: str | int) -> Optional[OutboxEntry]:
+        """Look up an entry by id or (latest by) ``Message-ID``."""
+        with self._lock:
+            if isinstance(msgid_or_id, int):
+                row = self._db.execute("SELECT * FROM outbox WHERE id = ?", (msgid_or_id,)).fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT * FROM outbox WHERE msgid = ? ORDER BY id DESC LIMIT 1", (msgid_or_id,)
+                ).fetchone()
+        return None if row is None else self._entry(row)
+
+    def pending(self) -> int:
+        """Number of entries not yet done."""
+        with self._lock:
+            return int(self._db.execute("SELECT count(*) FROM outbox WHERE state != 'done'").fetchone()[0])
+
+    def next_due(self) -> Optional[float]:
+        """Epoch time at which the next queued entry becomes due, if any."""
+        with self._lock:
+            row = self._db.execute("SELECT min(next_attempt) FROM outbox WHERE state = 'queued'").fetchone()
+        return None if row[0] is None else float(row[0])
+
+    def flush(self) -> int:
+        """Make all deferred entries due now (like ``postqueue -f``).
+
+        Returns:
+            The number of entries affected.
+        """
+        with self._lock:
+            return self._db.execute(
+                "UPDATE outbox SET next_attempt = ? WHERE state = 'queued' AND next_attempt > ?",
+                (time.time(), time.time()),
+            ).rowcount
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished entries created more than ``older_than`` seconds ago.
+
+        Returns:
+            The number of entries deleted.
+        """
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM outbox WHERE state = 'done' AND created < ?", (time.time() - older_than,)
+            ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> Outbox:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _store(
+        self,
+        entry: OutboxEntry,
+        pending: List[str],
+        failed: Dict[str, Tuple[int, str]],
+        attempts: int,
+        last_error: Optional[str],
+    ) -> None:
+        state: OutboxState = "queued" if pending else "done"
+        delay: float = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET pending = ?, failed = ?, state = ?, attempts = ?, next_attempt = ?, "
+                "last_error = ?, message = CASE WHEN ? THEN message ELSE x'' END WHERE id = ?",
+                (
+                    json.dumps(pending),
+                    json.dumps(failed),
+                    state,
+                    attempts,
+                    time.time() + delay,
+                    last_error,
+                    bool(pending),  # drop the body of finished entries
+                    entry.id,
+                ),
+            )
+        if pending:
+            self.logger.debug(f"{entry.msgid}: {len(pending)} recipients deferred for {delay:.0f}s")
+
+    @staticmethod
+    def _entry(row: Tuple[Any, ...]) -> OutboxEntry:
+        return OutboxEntry(
+            id=row[0],
+            msgid=row[1],
+            mail_from=row[2],
+            pending=json.loads(row[3]),
+            failed={k: (c, m) for k, (c, m) in json.loads(row[4]).items()},
+            num_recipients=row[5],
+            state=row[7],
+            attempts=row[8],
+            next_attempt=row[9],
+            last_error=row[11],
+        )
+
+
+@dataclass
+class OutboxWorker:
+    """Background thread that drains an :class:`Outbox` into an SMTP server.
+
+    Attributes:
+        outbox: The outbox to deliver from.
+        serverinfo: Server to deliver to; ``max_recipients_per_transaction``
+            is honoured.
+        pool: Optional :class:`SMTPConnectionPool` to borrow sessions from;
+            by default the worker keeps its own.
+        poll_interval: Longest time in seconds the worker sleeps before
+            looking for due entries again.
+
+    Example:
+        >>> with OutboxWorker(outbox, server):
+        ...     generate_reports()  # enqueue() returns immediately
+    """
+
+    logger: ClassVar["loguru.Logger"] = glogger.bind(classname=__qualname__)
+
+    outbox: Outbox
+    serverinfo: SMTPServerInfo
+    pool: Optional[SMTPConnectionPool] = field(default=None, repr=False)
+    poll_interval: float = 1.0
+
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _wakeup: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+    _own_pool: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.pool is None:
+            self.pool = SMTPConnectionPool()
+            self._own_pool = True
+
+    def start(self) -> None:
+        """Start the background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reputils-outbox", daemon=True)
+        self._thread.start()
+
+    def wakeup(self) -> None:
+        """Look for due entries now instead of after ``poll_interval``."""
+        self._wakeup.set()
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop the background thread after the current delivery."""
+        self._stop.set()
+        self._wakeup.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            if self._own_pool:
+                assert self.pool is not None
+                self.pool.close()
+
+    def __enter__(self) -> OutboxWorker:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def run_once(self) -> int:
+        """Deliver all entries that are due now.
+
+        Returns:
+            The number of delivery attempts made.
+        """
+        attempts: int = 0
+        while not self._stop.is_set() and (claimed := self.outbox.claim()) is not None:
+            entry, message = claimed
+            try:
+                self._deliver(entry, message)
+            except Exception as ex:
+                self.logger.opt(exception=ex).error(f"{entry.msgid}: unexpected delivery failure: {ex!r}")
+                self.outbox.defer(entry, ex)
+            attempts += 1
+        return attempts
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except sqlite3.Error as ex:
+                self.logger.opt(exception=ex).error(f"outbox worker failed: {ex!r}")
+
+            due: Optional[float] = self.outbox.next_due()
+            timeout: float = self.poll_interval if due is None else max(0.0, min(self.poll_interval, due - time.time()))
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _deliver(self, entry: OutboxEntry, message: bytes) -> None:
+        assert self.pool is not None
+        limit: int = self.serverinfo.max_recipients_per_transaction or len(entry.pending) or 1
+        refused: Dict[str, Tuple[int, bytes]] = {}
+        tried: List[str] = []
+        chunk: List[str] = []
+
+        try:
+            with self.pool.session(self.serverinfo) as session:
+                for start in range(0, len(entry.pending), limit):
+                    chunk = entry.pending[start : start + limit]
+                    try:
+                        refused.update(
+                            _smtp_sendmail(session.smtp, entry.mail_from, chunk, _RenderedMessage([message]))
+                        )
+                        session.num_messages += 1
+                    except smtplib.SMTPRecipientsRefused as ex:
+                        # no DATA went out, so nobody in the chunk got the message; recipients missing from the
+                        # refusal were accepted before the server gave up with a 421
+                        session.dirty = True
+                        closing: Tuple[int, bytes] = next(
+                            (reply for reply in ex.recipients.values() if reply[0] == 421),
+                            (421, b"4.4.2 transaction aborted"),
+                        )
+                        refused.update({rcpt: ex.recipients.get(rcpt, closing) for rcpt in chunk})
+                    tried.extend(chunk)
+                    chunk = []
+        except (smtplib.SMTPException, OSError) as ex:
+            self.logger.debug(f"{entry.msgid}: delivery attempt {entry.attempts + 1} failed: {ex!r}")
+            if tried:  # some chunks went through before the failure; keep their outcome
+                self.outbox.complete(entry, refused, tried, unreached=chunk, error=ex)
+            else:
+                self.outbox.defer(entry, ex)
+            return
+
+        self.outbox.complete(entry, refused, tried)
@@ -1,8 +1,9 @@
 __version__ = "0.0.16"
 
+import importlib
 import os
 import sys
-from typing import Callable, Dict, Any
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Literal, TextIO
 
 from loguru import logger as glogger
 
@@ -37,11 +38,18 @@ def _loguru_skiplog_filter(record: dict) -> bool:
     #     "thread": RecordThread,    # Thread-Info (id, name)
     #     "time": datetime           # Zeitstempel des Log-Eintrags
     # }
-    return not record.get("extra", {}).get("skiplog", False)
+    # runs for every record reaching the handler: one lookup, no default dict; loguru always sets "extra"
+    return not record["extra"].get("skiplog")
 
 
 def configure_loguru_default_with_skiplog_filter(
     loguru_filter: Callable[[Dict[str, Any]], bool] = _loguru_skiplog_filter,
+    *,
+    background: bool = False,
+    queue_size: int = 10_000,
+    drop_policy: Literal["block", "drop_new", "drop_oldest"] = "drop_new",
+    json_lines: bool = False,
+    stream: TextIO | None = None,
 ) -> None:
     """Configure a default ``loguru`` sink with a convenient format and filter.
 
@@ -53,18 +61,109 @@ def configure_loguru_default_with_skiplog_filter(
         loguru_filter: A callable taking a record dict and returning ``True``
             if the record should be emitted. Defaults to
             :func:`_loguru_skiplog_filter`.
+        background: Write through a :class:`~reputils.LogSink.BackgroundSink`,
+            so logging threads only enqueue and never wait on the stream.
+        queue_size: Capacity of the background queue, in messages.
+        drop_policy: What the background sink does when its queue is full:
+            ``"block"``, ``"drop_new"`` or ``"drop_oldest"``.
+        json_lines: Emit one JSON object per line (see
+            :func:`~reputils.LogSink.json_line_format`) instead of the
+            colored text format, for ingestion by log shippers.
+        stream: Where to write; defaults to ``sys.stderr``.
     """
     glogger.info("configure_loguru_default_with_skiplog_filter")
 
+    if stream is None:
+        stream = sys.stderr
+
     os.environ["LOGURU_LEVEL"] = os.getenv("LOGURU_LEVEL", "DEBUG")  # standard is DEBUG
     glogger.remove()  # remove default-handler
-    logger_fmt: str = (
+    logger_fmt: str | Callable[[Dict[str, Any]], str] = (
         "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{module}</cyan>::<cyan>{extra[classname]}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
     )
     # logger_fmt: str = "<g>{time:HH:mm:ssZZ}</> | <lvl>{level}</> | <c>{module}::{extra[classname]}:{function}:{line}</> - {message}"
 
-    glogger.add(sys.stderr, level=os.getenv("LOGURU_LEVEL"), format=logger_fmt, filter=loguru_filter)  # type: ignore # TRACE | DEBUG | INFO | WARN | ERROR |  FATAL
+    if background or json_lines:
+        from .LogSink import BackgroundSink, json_line_format
+
+        if json_lines:
+            logger_fmt = json_line_format
+        sink: TextIO | BackgroundSink = (
+            BackgroundSink(stream, maxsize=queue_size, drop_policy=drop_policy) if background else stream
+        )
+        glogger.add(
+            sink,
+            level=os.environ["LOGURU_LEVEL"],
+            format=logger_fmt,  # type: ignore[arg-type]
+            filter=loguru_filter,  # type: ignore[arg-type]
+            colorize=not json_lines and stream.isatty(),
+        )
+    else:
+        glogger.add(stream, level=os.getenv("LOGURU_LEVEL"), format=logger_fmt, filter=loguru_filter)  # type: ignore # TRACE | DEBUG | INFO | WARN | ERROR |  FATAL
     glogger.configure(extra={"classname": "None", "skiplog": False})
 
 
-from .MailReport import EmailAddress, MRSendmail, SendResult, SMTPServerInfo
+# Public names and the submodule providing each. They are imported on first attribute access (PEP 562), so
+# ``import reputils`` stays cheap for callers that only want the loguru helpers above; the mail machinery
+# (smtplib, the email.mime stack, pytz, sqlite3) is loaded when e.g. ``reputils.MRSendmail`` is first used.
+_LAZY_ATTRS: Dict[str, str] = {
+    "AttachmentCache": "MailReport",
+    "AttachmentCompression": "MailReport",
+    "DeliveryEngine": "MailReport",
+    "EmailAddress": "MailReport",
+    "InvalidAddress": "MailReport",
+    "MailSpec": "MailReport",
+    "MessageSkeleton": "MailReport",
+    "MetricsRegistry": "MailReport",
+    "MRSendmail": "MailReport",
+    "RecipientError": "MailReport",
+    "SendResult": "MailReport",
+    "SMTPConnectionPool": "MailReport",
+    "SMTPServerInfo": "MailReport",
+    "TokenBucket": "MailReport",
+    "MXRecord": "DirectMX",
+    "MXResolver": "DirectMX",
+    "BackgroundSink": "LogSink",
+    "MailDigestSink": "LogSink",
+    "Outbox": "Outbox",
+    "OutboxEntry": "Outbox",
+    "OutboxWorker": "Outbox",
+}
+
+__all__ = ["configure_loguru_default_with_skiplog_filter", *_LAZY_ATTRS]
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule providing ``name`` on first access and cache the attribute."""
+    modname: str | None = _LAZY_ATTRS.get(name)
+    if modname is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value: Any = getattr(importlib.import_module(f".{modname}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *_LAZY_ATTRS})
+
+
+if TYPE_CHECKING:
+    from .DirectMX import MXRecord, MXResolver
+    from .LogSink import BackgroundSink, MailDigestSink
+    from .MailReport import (
+        AttachmentCache,
+        AttachmentCompression,
+        DeliveryEngine,
+        EmailAddress,
+        InvalidAddress,
+        MailSpec,
+        MessageSkeleton,
+        MetricsRegistry,
+        MRSendmail,
+        RecipientError,
+        SendResult,
+        SMTPConnectionPool,
+        SMTPServerInfo,
+        TokenBucket,
+    )
+    from .Outbox import Outbox, OutboxEntry, OutboxWorker
@@ -0,0 +1,5 @@
+import sys
+
+from .BulkMail import main
+
+sys.exit(main())
@@ -1,5 +1,16 @@
+import socket
+from dataclasses import fields
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Union
+
 import pytest
 
+from reputils import EmailAddress, MRSendmail, SMTPServerInfo
+from tests.smtpsink import SMTPSink
+
+MailerFactory = Callable[..., MRSendmail]
+
+_SERVERINFO_FIELDS = frozenset(f.name for f in fields(SMTPServerInfo))
+
 # @pytest.fixture()
 # def gapp():  # type: ignore
 #     def efun() -> Response:
@@ -21,3 +32,49 @@ import pytest
 # @pytest.fixture()
 # def flask_client(gapp: Flask) -> FlaskClient:
 #     return gapp.test_client()
+
+
+@pytest.fixture()
+def smtp_sink() -> Iterator[SMTPSink]:
+    with SMTPSink(auth=("user", "secret")) as sink:
+        yield sink
+
+
+@pytest.fixture()
+def make_mailer() -> MailerFactory:
+    """Return a factory for :class:`MRSendmail` instances pointed at a sink.
+
+    Keyword overrides naming a :class:`SMTPServerInfo` field configure the
+    server, all others are passed to :class:`MRSendmail`. Without a sink
+    ``smtp_server`` (and ``smtp_port``) must be given.
+    """
+
+    def make(
+        sink: Optional[SMTPSink] = None,
+        *,
+        tos: Sequence[Union[str, EmailAddress]] = ("alice@example.com",),
+        bccs: Sequence[Union[str, EmailAddress]] = (),
+        **overrides: Any,
+    ) -> MRSendmail:
+        server: Dict[str, Any] = {name: overrides.pop(name) for name in list(overrides) if name in _SERVERINFO_FIELDS}
+        if sink is not None:
+            server = {"smtp_server": sink.host, "smtp_port": sink.port, **server}
+        mailer = MRSendmail(
+            serverinfo=SMTPServerInfo(**server),
+            **{"returnpath": EmailAddress("bounce@example.com"), "subject": "test", **overrides},
+        )
+        for to in tos:
+            mailer.add_to(to if isinstance(to, EmailAddress) else EmailAddress(to))
+        for bcc in bccs:
+            mailer.add_bcc(bcc if isinstance(bcc, EmailAddress) else EmailAddress(bcc))
+        return mailer
+
+    return make
+
+
+@pytest.fixture()
+def closed_port() -> int:
+    """A local port nothing listens on, so connecting to it is refused."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
@@ -0,0 +1,278 @@
+"""In-process SMTP stand-in used by the tests."""
+
+import base64
+import socketserver
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+CERTFILE: Path = Path(__file__).parent / "data" / "sink-cert.pem"
+KEYFILE: Path = Path(__file__).parent / "data" / "sink-key.pem"
+
+
+@dataclass
+class ReceivedMessage:
+    mail_from: str
+    rcpt_tos: List[str]
+    data: bytes
+    size: int = 0
+
+
+@dataclass
+class SinkStats:
+    connections: int = 0
+    commands: List[str] = field(default_factory=list)
+    # per command: number of socket reads the connection had made when its line was complete, so commands
+    # sharing a value arrived in one segment (i.e. were pipelined)
+    reads: List[int] = field(default_factory=list)
+    # per TLS handshake: whether the client resumed an earlier session
+    tls_resumed: List[bool] = field(default_factory=list)
+
+    def count(self, verb: str) -> int:
+        return sum(1 for c in self.commands if c.split(" ", 1)[0].upper() == verb.upper())
+
+    def reads_for(self, *verbs: str) -> int:
+        """Number of distinct socket reads that delivered commands with the given verbs (single connection)."""
+        wanted = {v.upper() for v in verbs}
+        return len({r for c, r in zip(self.commands, self.reads) if c.split(" ", 1)[0].upper() in wanted})
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: "_SinkServer"
+
+    _buf: bytes = b""
+    _reads: int = 0
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+        self.wfile.flush()
+
+    def readline(self) -> bytes:
+        while b"\n" not in self._buf:
+            data: bytes = self.request.recv(65536)
+            if not data:
+                line, self._buf = self._buf, b""
+                return line
+            self._reads += 1
+            self._buf += data
+        line, _, self._buf = self._buf.partition(b"\n")
+        return line + b"\n"
+
+    def read_exactly(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            data: bytes = self.request.recv(65536)
+            if not data:
+                break
+            self._reads += 1
+            self._buf += data
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+
+    def start_tls(self) -> None:
+        sink: SMTPSink = self.server.sink
+        assert sink.tls_context is not None
+        self.request = sink.tls_context.wrap_socket(self.request, server_side=True)
+        self.wfile = self.request.makefile("wb")
+        with sink.lock:
+            sink.stats.tls_resumed.append(self.request.session_reused)
+
+    def handle(self) -> None:
+        sink: SMTPSink = self.server.sink
+        with sink.lock:
+            sink.stats.connections += 1
+
+        secure: bool = False
+        if sink.implicit_tls:
+            self.start_tls()
+            secure = True
+
+        self.reply("220 sink ESMTP")
+        mail_from: Optional[str] = None
+        rcpts: List[str] = []
+        bdat: List[bytes] = []
+
+        while True:
+            round_trip: bool = b"\n" not in self._buf  # the client waited for our previous replies
+            raw: bytes = self.readline()
+            if not raw:
+                return
+            if round_trip and sink.latency:
+                time.sleep(sink.latency)
+            line: str = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb: str = line.split(" ", 1)[0].upper()
+            arg: str = line[len(verb) :].strip()
+            with sink.lock:
+                sink.stats.commands.append(line)
+                sink.stats.reads.append(self._reads)
+
+            if verb in ("EHLO", "HELO"):
+                exts: List[str] = ["sink"] + list(sink.extensions)
+                if sink.tls_context is not None and not secure:
+                    exts.append("STARTTLS")
+                if sink.auth is not None:
+                    exts.append("AUTH PLAIN LOGIN")
+                for e in exts[:-1]:
+                    self.reply(f"250-{e}")
+                self.reply(f"250 {exts[-1]}")
+            elif verb == "STARTTLS" and sink.tls_context is not None and not secure:
+                self.reply("220 2.0.0 Ready to start TLS")
+                self.start_tls()
+                secure = True
+            elif verb == "AUTH":
+                mech, _, initial = arg.partition(" ")
+                if mech.upper() == "PLAIN":
+                    _, user, password = base64.b64decode(initial).decode("utf-8").split("\0")
+                else:
+                    self.reply("334 VXNlcm5hbWU6")
+                    user = base64.b64decode(self.readline().strip()).decode("utf-8")
+                    self.reply("334 UGFzc3dvcmQ6")
+                    password = base64.b64decode(self.readline().strip()).decode("utf-8")
+                if (user, password) == sink.auth:
+                    self.reply("235 2.7.0 Authentication successful")
+                else:
+                    self.reply("535 5.7.8 Authentication credentials invalid")
+            elif verb == "MAIL":
+                sender: str = arg.split(":", 1)[1].strip().split(" ")[0].strip("<>")
+                code, msg = sink.mail_handler(sender)
+                if code == 0:
+                    return
+                mail_from = sender if code < 300 else None
+                rcpts = []
+                self.reply(f"{code} {msg}")
+                if code == 421:
+                    return
+            elif verb == "RCPT" and mail_from is None:
+                self.reply("503 5.5.1 Need MAIL command")
+            elif verb == "RCPT" and sink.max_rcpts is not None and len(rcpts) >= sink.max_rcpts:
+                self.reply("452 4.5.3 Too many recipients")
+            elif verb == "RCPT":
+                rcpt: str = arg.split(":", 1)[1].strip().split(" ")[0].strip("<>")
+                code, msg = sink.rcpt_handler(rcpt)
+                if code == 0:
+                    return
+                if code < 300:
+                    rcpts.append(rcpt)
+                self.reply(f"{code} {msg}")
+                if code == 421:
+                    return
+            elif verb == "BDAT":
+                size_arg, _, last = arg.partition(" ")
+                bdat.append(self.read_exactly(int(size_arg)))
+                if not rcpts:
+                    self.reply("554 5.5.1 No valid recipients")
+                    bdat = []
+                    continue
+                if last.strip().upper() == "LAST":
+                    body: bytes = b"".join(bdat)
+                    with sink.lock:
+                        sink.messages.append(
+                            ReceivedMessage(mail_from or "", rcpts, body if sink.store_data else b"", len(body))
+                        )
+                    mail_from, rcpts, bdat = None, [], []
+                    self.reply("250 2.0.0 Ok: queued")
+                else:
+                    self.reply(f"250 2.0.0 {size_arg} octets received")
+            elif verb == "DATA":
+                if not rcpts:
+                    self.reply("554 5.5.1 No valid recipients")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                chunks: List[bytes] = []
+                size: int = 0
+                while True:
+                    dl: bytes = self.readline()
+                    if dl in (b".\r\n", b""):
+                        break
+                    size += len(dl)
+                    if sink.store_data:
+                        chunks.append(dl[1:] if dl.startswith(b"..") else dl)
+                with sink.lock:
+                    sink.messages.append(ReceivedMessage(mail_from or "", rcpts, b"".join(chunks), size))
+                if sink.data_delay:
+                    time.sleep(sink.data_delay)
+                self.reply("250 2.0.0 Ok: queued")
+                mail_from, rcpts = None, []
+            elif verb == "RSET":
+                mail_from, rcpts, bdat = None, [], []
+                self.reply("250 2.0.0 Ok")
+            elif verb == "NOOP":
+                self.reply("250 2.0.0 Ok")
+            elif verb == "QUIT":
+                self.reply("221 2.0.0 Bye")
+                return
+            else:
+                self.reply("502 5.5.2 Command not recognized")
+
+
+class _SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    sink: "SMTPSink"
+
+
+def _accept_all(addr: str) -> Tuple[int, str]:
+    return 250, "2.1.5 Ok"
+
+
+class SMTPSink:
+    """Minimal threaded SMTP server that records what it receives.
+
+    ``rcpt_handler``/``mail_handler`` decide the reply to each ``RCPT``/``MAIL``
+    (use them to inject 4xx/5xx; after a 421 the sink closes the connection, code 0 closes it without a reply),
+    ``max_rcpts`` answers 452 beyond that many
+    recipients, ``data_delay`` delays the reply to the message data and
+    ``latency`` is added to every round trip of the command dialogue.
+    ``implicit_tls`` speaks TLS from the first byte (SMTPS) instead of
+    offering STARTTLS. ``BDAT`` (RFC 3030) is always understood; whether
+    clients use it depends on the ``extensions`` advertised.
+    """
+
+    def __init__(
+        self,
+        auth: Optional[Tuple[str, str]] = None,
+        extensions: Tuple[str, ...] = (),
+        rcpt_handler: Callable[[str], Tuple[int, str]] = _accept_all,
+        mail_handler: Callable[[str], Tuple[int, str]] = _accept_all,
+        starttls: bool = False,
+        store_data: bool = True,
+        max_rcpts: Optional[int] = None,
+        data_delay: float = 0.0,
+        latency: float = 0.0,
+        implicit_tls: bool = False,
+    ) -> None:
+        self.store_data = store_data
+        self.data_delay = data_delay
+        self.latency = latency
+        self.max_rcpts = max_rcpts
+        self.implicit_tls = implicit_tls
+        self.tls_context: Optional[ssl.SSLContext] = None
+        if starttls or implicit_tls:
+            self.tls_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.tls_context.load_cert_chain(CERTFILE, KEYFILE)
+        self.auth = auth
+        self.extensions = extensions
+        self.rcpt_handler = rcpt_handler
+        self.mail_handler = mail_handler
+        self.messages: List[ReceivedMessage] = []
+        self.stats = SinkStats()
+        self.lock = threading.Lock()
+        self._server = _SinkServer(("127.0.0.1", 0), _SMTPHandler)
+        self._server.sink = self
+        self.host: str = "127.0.0.1"
+        self.port: int = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self) -> "SMTPSink":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop accepting connections (idempotent)."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,41 @@
+import asyncio
+import smtplib
+
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_asend_delivers_with_same_contract_as_send(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    mailer = make_mailer(smtp_sink, bccs=["bob@example.com"], smtp_user="user", smtp_pass="secret", subject="async")
+
+    async def main() -> list[tuple[str, object]]:
+        sem = asyncio.Semaphore(2)
+        return await asyncio.gather(*(mailer.asend(txt=f".leading dot {i}", semaphore=sem) for i in range(5)))
+
+    results = asyncio.run(main())
+
+    assert all(sr.all_succeeded() for _, sr in results)  # type: ignore[attr-defined]
+    assert len(smtp_sink.messages) == 5
+    assert smtp_sink.messages[0].mail_from == "bounce@example.com"
+    assert smtp_sink.messages[0].rcpt_tos == ["alice@example.com", "bob@example.com"]
+    assert all(b"\r\n.leading dot" in m.data for m in smtp_sink.messages)
+    assert "Subject: async" in results[0][0]
+
+
+def test_asend_records_auth_failure(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    raw, sr = asyncio.run(make_mailer(smtp_sink, smtp_user="user", smtp_pass="wrong").asend(txt="x"))
+
+    assert sr.all_failed()
+    assert isinstance(sr.fail_exceptions[0], smtplib.SMTPAuthenticationError)  # type: ignore[index]
+    assert smtp_sink.messages == []
+
+
+def test_asend_starttls(make_mailer: MailerFactory) -> None:
+    with SMTPSink(auth=("user", "secret"), starttls=True) as sink:
+        mailer = make_mailer(sink, smtp_user="user", smtp_pass="secret", use_start_tls=True)
+        raw, sr = asyncio.run(mailer.asend(txt="secret report"))
+
+    assert sr.all_succeeded()
+    assert sink.stats.count("STARTTLS") == 1
+    assert sink.stats.count("EHLO") == 2
+    assert b"secret report" in sink.messages[0].data
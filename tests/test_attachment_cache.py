@@ -0,0 +1,60 @@
+import os
+from email import message_from_bytes
+from pathlib import Path
+
+from reputils import AttachmentCache
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_cached_parts_are_reused_and_invalidated(
+    smtp_sink: SMTPSink, make_mailer: MailerFactory, tmp_path: Path
+) -> None:
+    report = tmp_path / "report.csv"
+    report.write_bytes(b"a;b\n1;2\n")
+
+    cache = AttachmentCache()
+    mailer = make_mailer(smtp_sink, attachment_cache=cache)
+    mailer.send(txt="1", files=[report])
+    mailer.send(txt="2", files=[report])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    report.write_bytes(b"a;b\n3;4\n")
+    os.utime(report, ns=(0, 0))
+    mailer.send(txt="3", files=[report])
+    assert cache.misses == 2
+
+    payloads = [
+        [p.get_payload(decode=True) for p in message_from_bytes(m.data).walk() if p.get_filename()]
+        for m in smtp_sink.messages
+    ]
+    assert payloads == [[b"a;b\n1;2\n"], [b"a;b\n1;2\n"], [b"a;b\n3;4\n"]]
+
+
+def test_cache_evicts_to_spill_dir(tmp_path: Path) -> None:
+    files = []
+    for i in range(3):
+        files.append(tmp_path / f"f{i}.bin")
+        files[-1].write_bytes(os.urandom(3000))
+
+    cache = AttachmentCache(max_bytes=9000, spill_dir=tmp_path / "spill")
+    encoded = [cache.encoded(f) for f in files]
+
+    assert cache.evictions == 1 and cache.size <= 9000
+    assert len(list((tmp_path / "spill").iterdir())) == 1
+
+    assert cache.encoded(files[0]) == encoded[0]
+    assert (cache.spill_hits, cache.misses) == (1, 3)
+
+    cache.clear()
+    assert list((tmp_path / "spill").iterdir()) == []
+
+
+def test_content_keyed_cache_shares_identical_files(tmp_path: Path) -> None:
+    a, b = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    a.write_bytes(b"%PDF-1.4 same")
+    b.write_bytes(b"%PDF-1.4 same")
+
+    cache = AttachmentCache(key_by_content=True)
+    assert cache.encoded(a) == cache.encoded(b)
+    assert (cache.hits, cache.misses) == (1, 1)
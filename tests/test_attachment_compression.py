@@ -0,0 +1,97 @@
+import gzip
+import io
+import random
+import zipfile
+from email import message_from_bytes
+from email.message import Message
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from reputils import AttachmentCompression
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def _report(path: Path, rows: int, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    words = [f"w{i:03d}" for i in range(400)]
+    data = "".join(f"{i},{rnd.choice(words)},{rnd.choice(words)},{rnd.randint(0, 999)}\n" for i in range(rows)).encode()
+    path.write_bytes(data)
+    return data
+
+
+def _encoded_size(n: int) -> int:
+    chars = (n + 2) // 3 * 4
+    return chars + (chars + 75) // 76 * 2
+
+
+def _attachments(sink: SMTPSink) -> Dict[str, Message]:
+    msg = message_from_bytes(sink.messages[0].data)
+    return {str(part.get_filename()): part for part in msg.walk() if part.get_filename()}
+
+
+def _send(
+    make_mailer: MailerFactory, sink: SMTPSink, files: List[Path], policy: AttachmentCompression, stream: bool = False
+) -> None:
+    mailer = make_mailer(sink, stream_attachments=stream, attachment_compression=policy)
+    _, sr = mailer.send(txt="attached", files=files)
+    assert sr.all_succeeded()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_large_text_files_are_gzipped_others_untouched(
+    tmp_path: Path, stream: bool, make_mailer: MailerFactory
+) -> None:
+    report = _report(tmp_path / "export.csv", 20_000)
+    small = _report(tmp_path / "small.csv", 10)
+    image = tmp_path / "logo.png"
+    image.write_bytes(bytes(range(256)) * 400)
+
+    with SMTPSink() as sink:
+        _send(
+            make_mailer, sink, [tmp_path / "export.csv", tmp_path / "small.csv", image], AttachmentCompression(), stream
+        )
+
+    parts = _attachments(sink)
+    assert set(parts) == {"export.csv.gz", "small.csv", "logo.png"}
+    assert parts["export.csv.gz"].get_content_type() == "application/gzip"
+    gz: bytes = parts["export.csv.gz"].get_payload(decode=True)  # type: ignore[assignment]
+    assert gzip.decompress(gz) == report
+    assert len(gz) * 2 < len(report)
+    assert parts["small.csv"].get_payload(decode=True) == small
+    assert parts["logo.png"].get_payload(decode=True) == image.read_bytes()
+    assert sink.messages[0].size < _encoded_size(len(report))
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_zip_format(tmp_path: Path, stream: bool, make_mailer: MailerFactory) -> None:
+    report = _report(tmp_path / "export.jsonl", 5_000)
+
+    with SMTPSink() as sink:
+        _send(make_mailer, sink, [tmp_path / "export.jsonl"], AttachmentCompression(format="zip", min_size=0), stream)
+
+    part = _attachments(sink)["export.jsonl.zip"]
+    assert part.get_content_type() == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(part.get_payload(decode=True))) as archive:  # type: ignore[arg-type]
+        assert archive.namelist() == ["export.jsonl"]
+        assert archive.read("export.jsonl") == report
+
+
+def test_size_cap_picks_a_stronger_level(tmp_path: Path, make_mailer: MailerFactory) -> None:
+    report = _report(tmp_path / "export.csv", 50_000)
+    fast = len(gzip.compress(report, 1))
+    best = len(gzip.compress(report, 9))
+    cap = _encoded_size(best)  # room for the level 9 result, not for level 1
+    assert _encoded_size(fast) > cap
+
+    with SMTPSink() as sink:
+        _send(make_mailer, sink, [tmp_path / "export.csv"], AttachmentCompression(level=1, max_total_size=cap))
+    gz: bytes = _attachments(sink)["export.csv.gz"].get_payload(decode=True)  # type: ignore[assignment]
+    assert gzip.decompress(gz) == report
+    assert len(gz) < fast
+
+    with SMTPSink() as sink, pytest.raises(ValueError, match="max_total_size"):
+        _send(make_mailer, sink, [tmp_path / "export.csv"], AttachmentCompression(max_total_size=best // 2))
+    assert sink.stats.connections == 0
@@ -0,0 +1,23 @@
+import json
+from pathlib import Path
+
+from benchmarks import bench_send
+
+
+def test_benchmark_writes_json_report_and_detects_regressions(tmp_path: Path) -> None:
+    out = tmp_path / "bench.json"
+    assert (
+        bench_send.main(["--scenario", "baseline", "--scenario", "faults-5xx", "--messages", "3", "-o", str(out)]) == 0
+    )
+
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert [r["scenario"]["name"] for r in report["results"]] == ["baseline", "faults-5xx"]
+    baseline, faults = report["results"]
+    assert baseline["msgs_per_sec"] > 0
+    assert baseline["latency_p50_ms"] <= baseline["latency_p99_ms"]
+    assert baseline["peak_memory_bytes"] > 0
+    assert faults["failed_recipients"] == 3 * 5
+
+    faster = {"results": [dict(baseline, msgs_per_sec=baseline["msgs_per_sec"] * 1000)]}
+    assert bench_send.compare(faster["results"], report, 0.25) == []
+    assert len(bench_send.compare([baseline], faster, 0.25)) == 1
@@ -0,0 +1,180 @@
+import json
+import signal
+import time
+from concurrent.futures import Future
+from email import message_from_bytes
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Tuple
+
+import pytest
+
+from reputils import BulkMail, DeliveryEngine, MailSpec, SendResult
+from reputils.BulkMail import Checkpoint, count_rows, format_progress, iter_recipient_rows, main
+from tests.smtpsink import SMTPSink
+
+
+def _args(recipients: Path, port: int, *extra: str) -> List[str]:
+    body: Path = recipients.with_name("body.txt")
+    body.write_text("Hi $name, your code is $code.\n", encoding="utf-8")
+    return [
+        "send",
+        str(recipients),
+        "--subject",
+        "News for $name",
+        "--text",
+        str(body),
+        "--from",
+        "News <news@example.com>",
+        "--server",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--concurrency",
+        "3",
+        "--no-progress",
+        *extra,
+    ]
+
+
+def test_csv_rows_are_personalized_and_failures_recorded(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    recipients = tmp_path / "list.csv"
+    rows = [f"user{i}@example.com,User {i},C{i}" for i in range(20)] + [
+        "not-an-address,Broken,X",
+        "bounce@example.com,,B",
+    ]
+    recipients.write_text("email,name,code\n" + "\n".join(rows) + "\n", encoding="utf-8")
+
+    def rcpt(addr: str) -> Tuple[int, str]:
+        return (550, "5.1.1 No such user") if addr.startswith("bounce") else (250, "2.1.5 Ok")
+
+    monkeypatch.setenv("BULK_PW", "secret")
+    with SMTPSink(auth=("news", "secret"), rcpt_handler=rcpt) as sink:
+        failures = tmp_path / "failures.jsonl"
+        rc = main(
+            _args(recipients, sink.port, "--user", "news", "--password-env", "BULK_PW", "--failures", str(failures))
+        )
+
+    assert rc == 0
+    assert sorted(m.rcpt_tos[0] for m in sink.messages) == sorted(f"user{i}@example.com" for i in range(20))
+    msg = next(message_from_bytes(m.data) for m in sink.messages if m.rcpt_tos == ["user7@example.com"])
+    assert msg["Subject"] == "News for User 7"
+    assert "Hi User 7, your code is C7." in msg.get_payload(decode=True).decode()
+
+    recorded = sorted((f["row"], f["email"], f["code"]) for f in map(json.loads, failures.read_text().splitlines()))
+    assert recorded == [(20, "not-an-address", None), (21, "bounce@example.com", 550)]
+    checkpoint = json.loads((tmp_path / "list.csv.checkpoint.json").read_text())
+    assert (checkpoint["watermark"], checkpoint["sent"], checkpoint["failed"], checkpoint["invalid"]) == (22, 20, 1, 1)
+
+
+def test_rerun_resumes_without_sending_twice(tmp_path: Path, closed_port: int) -> None:
+    recipients = tmp_path / "list.jsonl"
+    recipients.write_text("".join(json.dumps({"email": f"u{i}@example.com", "code": i}) + "\n" for i in range(10)))
+
+    # server down: nothing handled, the rows stay open for the next run
+    assert main(_args(recipients, closed_port, "--max-errors", "2")) == 1
+    assert json.loads((tmp_path / "list.jsonl.checkpoint.json").read_text())["watermark"] == 0
+
+    with SMTPSink() as sink:
+        assert main(_args(recipients, sink.port)) == 0
+        assert len(sink.messages) == 10
+
+        with recipients.open("a") as f:
+            f.write('\n"late@example.com"\n')
+        assert main(_args(recipients, sink.port)) == 0
+
+    assert sorted(m.rcpt_tos[0] for m in sink.messages) == sorted(
+        [f"u{i}@example.com" for i in range(10)] + ["late@example.com"]
+    )
+
+
+def test_checkpoint_of_another_file_is_rejected(tmp_path: Path, closed_port: int) -> None:
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    for path in (a, b):
+        path.write_text("email\n", encoding="utf-8")
+    assert main(_args(a, closed_port, "--checkpoint", str(tmp_path / "cp.json"))) == 0
+    with pytest.raises(SystemExit):
+        main(_args(b, closed_port, "--checkpoint", str(tmp_path / "cp.json")))
+
+
+def test_streaming_helpers(tmp_path: Path) -> None:
+    path = tmp_path / "r.jsonl"
+    path.write_text('{"email": "a@example.com"}\n\n"b@example.com"\n[1]', encoding="utf-8")
+    assert list(iter_recipient_rows(path, "jsonl")) == [
+        (0, {"email": "a@example.com"}),
+        (2, {"email": "b@example.com"}),
+        (3, {}),
+    ]
+    assert count_rows(path, "jsonl") == 4
+    assert format_progress(250, 1000, 3, 50.0) == " 25.0% 250/1000 handled, 3 failed |    50.0 msg/s | ETA 0:00:15"
+
+
+def test_second_interrupt_keeps_rows_in_delivery_from_being_sent_again(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    recipients = tmp_path / "list.jsonl"
+    recipients.write_text("".join(f'"u{i}@example.com"\n' for i in range(8)))
+    failures = tmp_path / "failures.jsonl"
+    waits: List[float] = []
+
+    def sleep(seconds: float) -> None:  # the first wait lets the workers start, the second one is "interrupted"
+        waits.append(seconds)
+        if len(waits) > 1:
+            raise KeyboardInterrupt
+        time.sleep(0.3)
+
+    with SMTPSink(data_delay=1.0) as first:
+        monkeypatch.setattr(BulkMail, "time", SimpleNamespace(monotonic=time.monotonic, sleep=sleep))
+        assert main(_args(recipients, first.port, "--concurrency", "2", "--failures", str(failures))) == 130
+        monkeypatch.undo()
+        in_delivery = sorted(m.rcpt_tos[0] for m in first.messages)
+
+    assert len(in_delivery) == 2
+    reported = [json.loads(line) for line in failures.read_text().splitlines()]
+    assert sorted(f["email"] for f in reported) == in_delivery
+    assert all(f["code"] is None and "possibly sent" in f["message"] for f in reported)
+
+    with SMTPSink() as second:
+        assert main(_args(recipients, second.port)) == 0
+    assert sorted(m.rcpt_tos[0] for m in second.messages + first.messages) == sorted(
+        f"u{i}@example.com" for i in range(8)
+    )
+    checkpoint = json.loads((tmp_path / "list.jsonl.checkpoint.json").read_text())
+    assert (checkpoint["watermark"], checkpoint["sent"], checkpoint["uncertain"]) == (8, 6, 2)
+
+
+def test_interrupt_right_after_submit_keeps_track_of_the_row(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    recipients = tmp_path / "list.jsonl"
+    recipients.write_text("".join(f'"u{i}@example.com"\n' for i in range(8)))
+    submitted: List[MailSpec] = []
+    submit = DeliveryEngine.submit
+
+    def submit_then_interrupt(engine: DeliveryEngine, spec: MailSpec) -> "Future[Tuple[str, SendResult]]":
+        future = submit(engine, spec)
+        submitted.append(spec)
+        if len(submitted) == 3:
+            signal.raise_signal(signal.SIGINT)
+        return future
+
+    with SMTPSink() as sink:
+        monkeypatch.setattr(DeliveryEngine, "submit", submit_then_interrupt)
+        assert main(_args(recipients, sink.port)) == 130
+        monkeypatch.undo()
+        assert len(sink.messages) == 3
+        assert main(_args(recipients, sink.port)) == 0
+
+    assert sorted(m.rcpt_tos[0] for m in sink.messages) == sorted(f"u{i}@example.com" for i in range(8))
+
+
+def test_checkpoint_stores_finished_rows_as_ranges(tmp_path: Path) -> None:
+    cp = Checkpoint(tmp_path / "cp.json", str((tmp_path / "list.csv").resolve()))
+    for index in [1, 2, 5, 3, 7, 6, *range(10, 1000)]:  # row 0 (and 4, 8, 9) still open
+        cp.mark(index, "sent")
+    assert (cp.watermark, cp.done) == (0, [[1, 4], [5, 8], [10, 1000]])
+    assert cp.is_done(6) and not cp.is_done(4) and not cp.is_done(0)
+
+    cp.save()
+    loaded = Checkpoint.load(cp.path, tmp_path / "list.csv")
+    for index in (0, 4, 8, 9):
+        loaded.mark(index, "failed")
+    assert (loaded.watermark, loaded.done, loaded.sent, loaded.failed) == (1000, [], 996, 4)
@@ -0,0 +1,48 @@
+import asyncio
+from typing import List, Tuple
+
+from reputils import EmailAddress, SMTPConnectionPool
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def _rcpt(rcpt: str) -> Tuple[int, str]:
+    return (550, "5.1.1 unknown") if rcpt.startswith("bad") else (250, "2.1.5 Ok")
+
+
+def _bccs(n: int) -> List[str]:
+    return [f"{'bad' if i % 50 == 7 else 'ok'}{i}@example.com" for i in range(n)]
+
+
+def test_recipients_are_split_into_transactions_and_merged(make_mailer: MailerFactory) -> None:
+    with SMTPSink(extensions=("PIPELINING",), rcpt_handler=_rcpt, max_rcpts=100) as sink:
+        mailer = make_mailer(sink, tos=["list@example.com"], bccs=_bccs(249), max_recipients_per_transaction=100)
+        _, sr = mailer.send(txt="hi")
+
+    assert sink.stats.connections == 1
+    assert [len(m.rcpt_tos) for m in sink.messages] == [98, 98, 49]
+    assert sr.num_recipients == 250
+    assert sr.num_failed == 5
+    assert sr.get_error_for_recipient(EmailAddress("bad207@example.com")) == (550, "5.1.1 unknown")
+    assert {e[0] for e in sr.get_all_errors()} == {f"bad{i}@example.com" for i in (7, 57, 107, 157, 207)}
+
+
+def test_chunks_are_delivered_over_parallel_pooled_connections(make_mailer: MailerFactory) -> None:
+    with SMTPSink(rcpt_handler=_rcpt, max_rcpts=100) as sink, SMTPConnectionPool() as pool:
+        mailer = make_mailer(sink, tos=["list@example.com"], bccs=_bccs(399), max_recipients_per_transaction=100)
+        mailer.pool = pool
+        mailer.recipient_chunk_workers = 3
+        _, sr = mailer.send(txt="hi")
+
+    assert sink.stats.connections == 3
+    assert sorted(len(m.rcpt_tos) for m in sink.messages) == [98, 98, 98, 98]
+    assert (sr.num_recipients, sr.num_failed) == (400, 8)
+
+
+def test_asend_splits_recipients(make_mailer: MailerFactory) -> None:
+    with SMTPSink(max_rcpts=10) as sink:
+        mailer = make_mailer(sink, tos=["list@example.com"], bccs=_bccs(24), max_recipients_per_transaction=10)
+        _, sr = asyncio.run(mailer.asend(txt="hi"))
+
+    assert [len(m.rcpt_tos) for m in sink.messages] == [10, 10, 5]
+    assert (sr.num_recipients, sr.num_failed) == (25, 0)
@@ -0,0 +1,68 @@
+import smtplib
+import time
+
+import pytest
+
+from reputils import DeliveryEngine, EmailAddress, MailSpec, TokenBucket
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_engine_spreads_messages_over_persistent_connections(make_mailer: MailerFactory) -> None:
+    with SMTPSink(auth=("user", "secret"), data_delay=0.02) as sink:
+        with DeliveryEngine(
+            make_mailer(sink, smtp_user="user", smtp_pass="secret"), connections_per_server=4
+        ) as engine:
+            results = engine.send_all(MailSpec(txt=f"message {i}", msgid=f"<{i}@x>") for i in range(24))
+
+    assert list(results) == [f"<{i}@x>" for i in range(24)]
+    assert all(sr.all_succeeded() for sr in results.values())
+    assert len(sink.messages) == 24
+    assert sink.stats.connections == 4
+    assert sink.stats.count("AUTH") == 4
+
+
+def test_close_without_wait_still_closes_the_private_pool(make_mailer: MailerFactory) -> None:
+    with SMTPSink(auth=("user", "secret"), data_delay=0.02) as sink:
+        engine = DeliveryEngine(make_mailer(sink, smtp_user="user", smtp_pass="secret"), connections_per_server=3)
+        futures = [engine.submit(MailSpec(txt=f"message {i}")) for i in range(9)]
+        engine.close(wait=False)
+        assert all(f.result(timeout=5)[1].all_succeeded() for f in futures)
+
+        deadline = time.monotonic() + 5
+        while sink.stats.count("QUIT") < sink.stats.connections and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert sink.stats.count("QUIT") == sink.stats.connections == 3
+
+
+def test_engine_respects_message_rate(make_mailer: MailerFactory) -> None:
+    with SMTPSink() as sink:
+        mailer = make_mailer(sink, tos=())
+        started = time.monotonic()
+        with DeliveryEngine(mailer, connections_per_server=3, messages_per_second=20.0) as engine:
+            engine.send_all(MailSpec(txt="x", tos=[EmailAddress("a@x.org")]) for _ in range(6))
+        elapsed = time.monotonic() - started
+
+    assert len(sink.messages) == 6
+    assert elapsed >= 0.2  # 5 intervals of 50ms after the first token
+
+
+def test_engine_surfaces_login_errors_on_the_future(make_mailer: MailerFactory) -> None:
+    with SMTPSink(auth=("user", "secret")) as sink:
+        with DeliveryEngine(make_mailer(sink, smtp_user="user", smtp_pass="wrong"), connections_per_server=2) as engine:
+            future = engine.submit(MailSpec(txt="x"))
+            with pytest.raises(smtplib.SMTPAuthenticationError):
+                future.result(timeout=10)
+
+        with pytest.raises(RuntimeError):
+            engine.submit(MailSpec(txt="y"))
+
+
+def test_token_bucket() -> None:
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert 0.0 < bucket.try_acquire() <= 0.1
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
@@ -0,0 +1,137 @@
+import time
+from typing import Dict, List, Tuple
+
+import pytest
+
+from reputils import EmailAddress, MXRecord, MXResolver
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+# relay settings that must not be used for direct delivery
+RELAY: Dict[str, str] = {"smtp_server": "relay.invalid", "smtp_user": "unused", "smtp_pass": "unused"}
+
+
+def test_recipients_are_grouped_by_domain_and_delivered_in_parallel(make_mailer: MailerFactory) -> None:
+    with SMTPSink(data_delay=0.3) as a, SMTPSink(data_delay=0.3) as b:
+        zones: Dict[str, List[MXRecord]] = {
+            "a.example": [MXRecord(10, a.host, a.port)],
+            "b.example": [MXRecord(10, b.host, b.port)],
+        }
+        mailer = make_mailer(
+            tos=["x@a.example", "y@B.example", "z@a.example"],
+            mx_resolver=MXResolver(lambda domain: (zones[domain], 60.0)),
+            **RELAY,
+        )
+
+        started = time.perf_counter()
+        _, sr = mailer.send(txt="alert")
+        elapsed = time.perf_counter() - started
+
+    assert sr.all_succeeded() and sr.num_recipients == 3
+    assert [m.rcpt_tos for m in a.messages] == [["x@a.example", "z@a.example"]]
+    assert [m.rcpt_tos for m in b.messages] == [["y@B.example"]]
+    assert a.stats.count("AUTH") == 0  # relay credentials are not used for MX hosts
+    assert elapsed < 0.55
+
+
+def test_falls_back_to_next_mx_preference(make_mailer: MailerFactory, closed_port: int) -> None:
+    with SMTPSink() as backup:
+        records = [MXRecord(20, backup.host, backup.port), MXRecord(10, "127.0.0.1", closed_port)]
+        mailer = make_mailer(tos=["x@a.example"], mx_resolver=MXResolver(lambda domain: (records, 60.0)), **RELAY)
+        _, sr = mailer.send(txt="alert")
+
+    assert sr.all_succeeded()
+    assert len(backup.messages) == 1
+
+
+def test_unresolvable_and_unreachable_domains_fail_their_recipients_only(
+    make_mailer: MailerFactory, closed_port: int
+) -> None:
+    def lookup(domain: str) -> Tuple[List[MXRecord], float]:
+        if domain == "gone.example":
+            raise LookupError(f"{domain}: no such domain")
+        if domain == "flaky.example":
+            raise OSError("SERVFAIL")
+        if domain == "nomail.example":
+            return [MXRecord(0, "")], 60.0
+        if domain == "down.example":
+            return [MXRecord(10, "127.0.0.1", closed_port)], 60.0
+        return [MXRecord(10, sink.host, sink.port)], 60.0
+
+    with SMTPSink() as sink:
+        _, sr = make_mailer(
+            tos=["ok@a.example", "x@gone.example", "x@flaky.example", "x@nomail.example", "x@down.example"],
+            mx_resolver=MXResolver(lookup),
+            **RELAY,
+        ).send(txt="alert")
+
+    assert (sr.num_recipients, sr.num_failed) == (5, 4)
+    assert {e.email: e.code for e in sr.get_all_errors()} == {
+        "x@gone.example": 550,
+        "x@flaky.example": 451,
+        "x@nomail.example": 556,
+        "x@down.example": 451,
+    }
+    assert [m.rcpt_tos for m in sink.messages] == [["ok@a.example"]]
+
+
+def test_connection_lost_mid_transaction_retries_only_the_unfinished_chunks(make_mailer: MailerFactory) -> None:
+    mails: List[str] = []
+
+    def drop_second(sender: str) -> Tuple[int, str]:
+        mails.append(sender)
+        return (0, "") if len(mails) == 2 else (250, "2.1.0 Ok")
+
+    with SMTPSink(mail_handler=drop_second) as primary, SMTPSink() as backup:
+        records = [MXRecord(10, primary.host, primary.port), MXRecord(20, backup.host, backup.port)]
+        _, sr = make_mailer(
+            tos=[f"u{i}@a.example" for i in range(5)],
+            mx_resolver=MXResolver(lambda domain: (records, 60.0)),
+            **{**RELAY, "max_recipients_per_transaction": 2},
+        ).send(txt="alert")
+
+    assert sr.all_succeeded() and sr.num_recipients == 5
+    assert [m.rcpt_tos for m in primary.messages] == [["u0@a.example", "u1@a.example"]]
+    assert [m.rcpt_tos for m in backup.messages] == [["u2@a.example", "u3@a.example"], ["u4@a.example"]]
+
+
+def test_missing_smtputf8_is_a_permanent_failure_of_the_domain(make_mailer: MailerFactory) -> None:
+    with SMTPSink() as sink:
+        records = [MXRecord(10, sink.host, sink.port)]
+        _, sr = make_mailer(
+            tos=["jörg@a.example"], mx_resolver=MXResolver(lambda domain: (records, 60.0)), **RELAY
+        ).send(txt="alert")
+
+    assert sr.all_failed()
+    assert sr.get_error_for_recipient(EmailAddress("jörg@a.example"))[0] == 554  # type: ignore[index]
+    assert sink.stats.count("MAIL") == 0
+
+
+def test_resolver_caches_answers_for_their_clamped_ttl() -> None:
+    now = [0.0]
+    calls: List[str] = []
+
+    def lookup(domain: str) -> Tuple[List[MXRecord], float]:
+        calls.append(domain)
+        if domain == "gone.example":
+            raise LookupError(domain)
+        return [MXRecord(20, "mx2"), MXRecord(10, "mx1")], 1.0
+
+    resolver = MXResolver(lookup, min_ttl=30.0, negative_ttl=10.0, clock=lambda: now[0])
+
+    assert [r.host for r in resolver.resolve("A.example")] == ["mx1", "mx2"]
+    now[0] = 29.0
+    resolver.resolve("a.example")
+    errors: List[LookupError] = []
+    for _ in range(2):
+        with pytest.raises(LookupError) as exc_info:
+            resolver.resolve("gone.example")
+        errors.append(exc_info.value)
+    assert calls == ["a.example", "gone.example"]
+    assert errors[0] is not errors[1] and str(errors[0]) == str(errors[1]) == "gone.example"
+
+    now[0] = 40.0
+    resolver.resolve("a.example")
+    with pytest.raises(LookupError):
+        resolver.resolve("gone.example")
+    assert calls == ["a.example", "gone.example", "a.example", "gone.example"]
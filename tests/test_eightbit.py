@@ -0,0 +1,98 @@
+import asyncio
+import smtplib
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from typing import List, Tuple
+
+import pytest
+
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+SUBJECT: str = "Größenbericht für März"
+BODY: str = "Grüße aus Köln – alle Läufe erfolgreich."
+INTL: str = "jörg@bücher.example"
+
+
+def _mail_command(sink: SMTPSink) -> str:
+    return next(c for c in sink.stats.commands if c.upper().startswith("MAIL"))
+
+
+def _send(
+    make_mailer: MailerFactory, extensions: Tuple[str, ...], txt: str = BODY, html: bool = False
+) -> Tuple[SMTPSink, bytes]:
+    with SMTPSink(extensions=extensions) as sink:
+        _, sr = make_mailer(sink, subject=SUBJECT, negotiate_8bit=True).send(
+            txt=txt, html=f"<p>{txt}</p>" if html else None
+        )
+    assert sr.all_succeeded()
+    return sink, sink.messages[0].data
+
+
+@pytest.mark.parametrize("html", [False, True])
+def test_smtputf8_sends_raw_utf8(html: bool, make_mailer: MailerFactory) -> None:
+    sink, data = _send(make_mailer, ("8BITMIME", "SMTPUTF8"), html=html)
+    assert f"Subject: {SUBJECT}".encode() in data
+    assert BODY.encode() in data
+    assert b"=?utf-8?" not in data and b"quoted-printable" not in data.lower()
+    assert _mail_command(sink).endswith("BODY=8BITMIME SMTPUTF8")
+
+
+@pytest.mark.parametrize("html", [False, True])
+def test_8bitmime_only_encodes_headers(html: bool, make_mailer: MailerFactory) -> None:
+    sink, data = _send(make_mailer, ("8BITMIME",), html=html)
+    msg = message_from_bytes(data)
+    assert "=?utf-8?" in msg["Subject"]
+    assert str(make_header(decode_header(msg["Subject"]))) == SUBJECT
+    assert BODY.encode() in data
+    assert _mail_command(sink).endswith("BODY=8BITMIME")
+
+
+@pytest.mark.parametrize("html", [False, True])
+def test_without_8bitmime_falls_back_to_quoted_printable(html: bool, make_mailer: MailerFactory) -> None:
+    sink, data = _send(make_mailer, (), html=html)
+    assert data.isascii()
+    msg = message_from_bytes(data)
+    texts: List[str] = [
+        part.get_payload(decode=True).decode() for part in msg.walk() if part.get_content_maintype() == "text"
+    ]
+    assert texts[0].rstrip() == BODY
+    assert all(
+        part["Content-Transfer-Encoding"] == "quoted-printable" for part in msg.walk() if not part.is_multipart()
+    )
+    assert "BODY=" not in _mail_command(sink)
+
+
+def test_long_lines_are_never_sent_as_8bit(make_mailer: MailerFactory) -> None:
+    long_line: str = "ä" * 600 + "\n"
+    _, data = _send(make_mailer, ("8BITMIME", "SMTPUTF8"), txt=long_line)
+    assert max(map(len, data.splitlines())) <= 998
+    assert message_from_bytes(data).get_payload(decode=True).decode() == long_line
+
+
+def test_ascii_headers_stay_unencoded(make_mailer: MailerFactory) -> None:
+    with SMTPSink() as sink:
+        make_mailer(sink, subject="Nightly report").send(txt="ok", additional_headers={"X-Job": "export"})
+    data: bytes = sink.messages[0].data
+    assert b"Subject: Nightly report\r\n" in data and b"X-Job: export\r\n" in data
+
+
+def test_international_recipient_needs_smtputf8(make_mailer: MailerFactory) -> None:
+    with SMTPSink(extensions=("8BITMIME", "SMTPUTF8")) as sink:
+        _, sr = make_mailer(sink, tos=[INTL], subject=SUBJECT, negotiate_8bit=True).send(txt=BODY)
+        assert sr.all_succeeded()
+        assert sink.messages[0].rcpt_tos == ["jörg@bücher.example"]
+        assert "SMTPUTF8" in _mail_command(sink)
+
+    with SMTPSink(extensions=("8BITMIME",)) as sink, pytest.raises(smtplib.SMTPNotSupportedError):
+        make_mailer(sink, tos=[INTL], subject=SUBJECT, negotiate_8bit=True).send(txt=BODY)
+    assert sink.stats.count("MAIL") == 0
+
+
+def test_asend_negotiates_too(make_mailer: MailerFactory) -> None:
+    with SMTPSink(extensions=("8BITMIME", "SMTPUTF8", "PIPELINING")) as sink:
+        mailer = make_mailer(sink, tos=[INTL], subject=SUBJECT, negotiate_8bit=True)
+        _, sr = asyncio.run(mailer.asend(txt=BODY))
+    assert sr.all_succeeded()
+    assert f"Subject: {SUBJECT}".encode() in sink.messages[0].data
+    assert _mail_command(sink).endswith("BODY=8BITMIME SMTPUTF8")
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from reputils import EmailAddress, InvalidAddress
+from tests.conftest import MailerFactory
+
+
+def test_formatted_form_is_memoized_until_changed(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[EmailAddress] = []
+    original = EmailAddress.formataddr
+    monkeypatch.setattr(EmailAddress, "formataddr", staticmethod(lambda ema: calls.append(ema) or original(ema)))
+
+    addr = EmailAddress("jane@example.com", "Jäne Doe")
+    first = addr.formataddr_self()
+    assert addr.formataddr_self() is first
+    assert len(calls) == 1
+
+    addr.name = "Jane"
+    assert addr.formataddr_self() == "Jane <jane@example.com>"
+    assert len(calls) == 2
+    assert addr.envelope() == "jane@example.com"
+    assert addr == EmailAddress("jane@example.com", "Jane")
+
+
+def test_parse_many_streams_and_reports_invalid_entries(tmp_path: Path) -> None:
+    path = tmp_path / "rcpts.txt"
+    with path.open("w", encoding="utf-8") as f:
+        f.write("# subscribers\n")
+        for i in range(100_000):
+            f.write(f"user{i}@example.com\n")
+        f.write('"Doe, Jörg" <joerg@example.com>\n\nnot an address\nbroken@@example.com\n')
+
+    invalid: list[InvalidAddress] = []
+    parsed = list(EmailAddress.parse_many(path, invalid=invalid))
+
+    assert len(parsed) == 100_001
+    assert parsed[0] == EmailAddress("user0@example.com")
+    assert parsed[-1] == EmailAddress("joerg@example.com", "Doe, Jörg")
+    assert [(e.line, e.raw) for e in invalid] == [(100_004, "not an address"), (100_005, "broken@@example.com")]
+
+
+def test_msgid_domain_ignores_display_name(make_mailer: MailerFactory) -> None:
+    mailer = make_mailer(
+        smtp_server="unused.invalid", returnpath=EmailAddress("bounce@reports.example.org", "Reports Bounce")
+    )
+    assert mailer.compile(txt="x").msgid_domain == "reports.example.org"
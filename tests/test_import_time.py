@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+# opt-in: wall-clock budgets flake on loaded runners; the module checks below are what the default run guards
+IMPORT_BUDGET: Optional[str] = os.getenv("REPUTILS_IMPORT_BUDGET")
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import reputils
+elapsed = time.perf_counter() - t
+heavy = [m for m in ("reputils.MailReport", "reputils.Outbox", "smtplib", "email.mime", "pytz", "sqlite3") if m in sys.modules]
+reputils.MRSendmail
+print(json.dumps({"elapsed": elapsed, "heavy": heavy, "loaded": "reputils.MailReport" in sys.modules}))
+"""
+
+
+def test_import_is_lazy() -> None:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=Path(__file__).parents[1],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    probe = json.loads(out)
+
+    assert probe["heavy"] == []
+    assert probe["loaded"] is True
+    if IMPORT_BUDGET is not None:
+        assert probe["elapsed"] < float(IMPORT_BUDGET)
+
+
+def test_lazy_attributes_resolve() -> None:
+    import reputils
+
+    assert reputils.EmailAddress.__module__ == "reputils.MailReport"
+    assert "OutboxWorker" in dir(reputils)
+    assert set(reputils.__all__) <= set(dir(reputils))
+    with pytest.raises(AttributeError):
+        reputils.NoSuchThing  # type: ignore[attr-defined]
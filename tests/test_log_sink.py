@@ -0,0 +1,87 @@
+import io
+import json
+import sys
+import threading
+from typing import Iterator, List
+
+import pytest
+from loguru import logger as glogger
+
+from reputils import BackgroundSink, configure_loguru_default_with_skiplog_filter
+
+
+class _GatedStream(io.StringIO):
+    """StringIO whose writes wait for ``gate``, to keep the writer thread busy."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.gate = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.gate.wait()
+        return super().write(s)
+
+
+@pytest.fixture()
+def restore_loguru() -> Iterator[None]:
+    yield
+    glogger.remove()
+    glogger.add(sys.stderr)
+
+
+def test_background_sink_writes_everything_in_order_on_stop() -> None:
+    stream = io.StringIO()
+    sink = BackgroundSink(stream, batch_size=7)
+
+    def log(t: int) -> None:
+        for i in range(200):
+            sink.write(f"{t}:{i}\n")
+
+    threads = [threading.Thread(target=log, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sink.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 800 and sink.dropped == 0
+    for t in range(4):
+        assert [line for line in lines if line.startswith(f"{t}:")] == [f"{t}:{i}" for i in range(200)]
+
+
+@pytest.mark.parametrize("policy, kept", [("drop_new", ["0", "1", "2", "3"]), ("drop_oldest", ["0", "7", "8", "9"])])
+def test_full_queue_follows_drop_policy(policy: str, kept: List[str]) -> None:
+    stream = _GatedStream()
+    sink = BackgroundSink(stream, maxsize=3, drop_policy=policy)  # type: ignore[arg-type]
+    sink.write("0\n")
+    while sink._queue.qsize():  # "0" is now stuck in the writer thread
+        pass
+    for i in range(1, 10):
+        sink.write(f"{i}\n")
+    stream.gate.set()
+    sink.stop()
+
+    assert sink.dropped == 6
+    lines = stream.getvalue().splitlines()
+    assert lines[:-1] == kept
+    assert lines[-1] == "[reputils] 6 log messages dropped, the log queue was full"
+
+
+def test_json_lines_with_background_sink(restore_loguru: None) -> None:
+    stream = io.StringIO()
+    configure_loguru_default_with_skiplog_filter(background=True, json_lines=True, stream=stream)
+
+    glogger.bind(classname="Job", job_id=42).info("braces {are} fine")
+    glogger.bind(skiplog=True).info("hidden")
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        glogger.exception("failed")
+    glogger.remove()  # stops the sink, which writes out the queue
+
+    docs = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [d["message"] for d in docs] == ["braces {are} fine", "failed"]
+    assert docs[0]["classname"] == "Job" and docs[0]["job_id"] == 42 and docs[0]["level"] == "INFO"
+    assert "skiplog" not in docs[0]
+    assert "RuntimeError: boom" in docs[1]["exception"]
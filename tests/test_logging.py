@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+from loguru import logger as glogger
+
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+@pytest.fixture()
+def records() -> Iterator[List[str]]:
+    messages: List[str] = []
+    handler_id = glogger.add(lambda m: messages.append(m.record["message"]), level="DEBUG")  # no skiplog filter
+    glogger.enable("reputils")
+    try:
+        yield messages
+    finally:
+        glogger.disable("reputils")
+        glogger.remove(handler_id)
+
+
+def test_debug_details_are_only_logged_when_asked_for(
+    smtp_sink: SMTPSink, make_mailer: MailerFactory, records: List[str]
+) -> None:
+    mailer = make_mailer(smtp_sink)
+
+    mailer.send(txt="quiet")
+    assert records == []
+
+    mailer.send(txt="loud", wantsdebuglogging=True)
+    assert any(r.startswith("fromme=EmailAddress(") for r in records)
+    assert any(r.startswith("sendme='bounce@example.com'") for r in records)
+    assert any("loud" in r and "Message-ID:" in r for r in records)  # the raw message, formatted lazily
+
+
+def test_logging_microbenchmark_reports_overhead() -> None:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_logging", "--iterations", "5", "--repeats", "1"],
+        cwd=Path(__file__).parents[1],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    report = json.loads(out)
+
+    assert set(report["us_per_message"]) == {"floor", "disabled", "filtered", "verbose"}
+    assert set(report["overhead"]) == {"disabled", "filtered", "verbose"}
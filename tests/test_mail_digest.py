@@ -0,0 +1,71 @@
+import time
+from typing import Iterator
+
+import pytest
+from loguru import logger as glogger
+
+from reputils import MailDigestSink
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+@pytest.fixture()
+def sink() -> Iterator[SMTPSink]:
+    with SMTPSink() as s:
+        yield s
+
+
+def _handler(digest: MailDigestSink) -> int:
+    return glogger.add(digest, level="ERROR", format="{message}")
+
+
+def test_storm_is_coalesced_into_one_digest(sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    digest = MailDigestSink(make_mailer(sink), flush_interval=30.0)
+    handler = _handler(digest)
+    for i in range(500):
+        glogger.error("relay {} unreachable", "a" if i % 2 else "b")
+    glogger.warning("below the handler level")
+    try:
+        raise ValueError("bad row")
+    except ValueError:
+        glogger.exception("import failed")
+    glogger.remove(handler)  # stop() mails what is buffered
+
+    assert len(sink.messages) == 1 and digest.sent_digests == 1
+    body = sink.messages[0].data.decode("utf-8")
+    assert "Subject: [reputils] 501 log records (3 distinct)" in body
+    assert body.count("[ERROR] x250") == 2 and "[ERROR] x1" in body
+    assert "ValueError: bad row" in body
+    assert "below the handler level" not in body
+
+
+def test_flushes_on_size_and_time_without_blocking_the_caller(sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    sink.data_delay = 0.5
+    digest = MailDigestSink(make_mailer(sink), flush_size=3, flush_interval=0.2)
+    handler = _handler(digest)
+
+    started = time.perf_counter()
+    for i in range(3):
+        glogger.error(f"distinct {i}")  # third one triggers a digest right away
+    glogger.error("late")
+    assert time.perf_counter() - started < 0.2
+
+    deadline = time.monotonic() + 5
+    while len(sink.messages) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    glogger.remove(handler)
+
+    assert [m.data.count(b"[ERROR] x1") for m in sink.messages] == [3, 1]
+
+
+def test_ring_evicts_oldest_and_delivery_failures_are_counted(make_mailer: MailerFactory, closed_port: int) -> None:
+    mailer = make_mailer(smtp_server="127.0.0.1", smtp_port=closed_port)
+    digest = MailDigestSink(mailer, max_records=2, flush_interval=30.0)
+    handler = _handler(digest)
+    for i in range(5):
+        glogger.error(f"distinct {i}")
+    assert [e.message for e in digest._entries.values()] == ["distinct 3", "distinct 4"]
+    assert digest.evicted == 3
+    glogger.remove(handler)
+
+    assert digest.failed_digests == 1 and digest.sent_digests == 0
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Tuple
+
+from reputils import MetricsRegistry, SendResult, SMTPConnectionPool, SMTPServerInfo
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+RCPTS: Tuple[str, ...] = ("alice@example.com", "bob@example.com")
+
+
+def test_send_records_phase_timings_and_bytes(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    with SMTPConnectionPool() as pool:
+        mailer = make_mailer(smtp_sink, tos=RCPTS, smtp_user="user", smtp_pass="secret", pool=pool)
+        raw, first = mailer.send(txt="hello", raw="bytes")
+        _, second = mailer.send(txt="hello again")
+
+    assert set(first.timings) == {"compose", "connect", "auth", "envelope", "data"}
+    assert all(seconds >= 0 for seconds in first.timings.values())
+    assert first.bytes_sent == len(raw)  # type: ignore[arg-type]
+    # the pooled connection was already established
+    assert set(second.timings) == {"compose", "envelope", "data"}
+
+
+def test_merged_sums_timings_and_bytes() -> None:
+    parts = [
+        SendResult(1, 0, timings={"envelope": 0.5, "connect": 1.0}, bytes_sent=10),
+        SendResult(1, 0, timings={"envelope": 0.25}, bytes_sent=10),
+    ]
+    merged = SendResult.merged(parts)
+    assert merged.timings == {"envelope": 0.75, "connect": 1.0}
+    assert merged.bytes_sent == 20
+
+
+def test_registry_counts_per_server(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    smtp_sink.rcpt_handler = lambda rcpt: (550, "5.1.1 unknown") if rcpt.startswith("bob") else (250, "Ok")
+    metrics = MetricsRegistry()
+    mailer = make_mailer(smtp_sink, tos=RCPTS, smtp_user="user", smtp_pass="secret", metrics_hook=metrics)
+
+    mailer.send(txt="one")
+    asyncio.run(mailer.asend(txt="two"))
+
+    server = metrics.snapshot()[f"{smtp_sink.host}:{smtp_sink.port}"]
+    assert server["counters"] == {
+        "messages": 2,
+        "messages_failed": 2,
+        "recipients": 4,
+        "recipients_failed": 2,
+        "bytes_sent": server["counters"]["bytes_sent"],
+    }
+    assert server["counters"]["bytes_sent"] > 0
+    assert server["codes"] == {550: 2}
+    assert server["phases"]["connect"]["count"] == 2
+    assert server["phases"]["data"]["buckets"][10.0] == 2
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_failing_hook_does_not_fail_the_send(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    def hook(serverinfo: SMTPServerInfo, sr: SendResult) -> None:
+        raise RuntimeError("metrics backend down")
+
+    assert make_mailer(smtp_sink, tos=RCPTS, metrics_hook=hook).send(txt="still delivered")[1].all_succeeded()
+    assert len(smtp_sink.messages) == 1
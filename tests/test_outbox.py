@@ -0,0 +1,122 @@
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+from reputils import EmailAddress, MRSendmail, Outbox, OutboxWorker, SMTPConnectionPool, SMTPServerInfo
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+@pytest.fixture()
+def mailer(make_mailer: MailerFactory) -> MRSendmail:
+    return make_mailer(
+        tos=[EmailAddress("alice@example.com", "Alice")],
+        bccs=["temp@example.com", "perm@example.com"],
+        smtp_server="unused.invalid",
+        subject="spooled",
+    )
+
+
+def test_enqueue_then_worker_retries_4xx_and_fails_5xx(tmp_path: Path, mailer: MRSendmail) -> None:
+    calls: Dict[str, int] = {}
+
+    def rcpt(addr: str) -> Tuple[int, str]:
+        calls[addr] = calls.get(addr, 0) + 1
+        if addr == "perm@example.com":
+            return 550, "5.1.1 unknown"
+        if addr == "temp@example.com" and calls[addr] == 1:
+            return 451, "4.3.0 try again later"
+        return 250, "2.1.5 Ok"
+
+    outbox = Outbox(tmp_path / "outbox.sqlite", base_delay=60.0)
+    msgid = mailer.enqueue(outbox, txt="report body", msgid="<r1@example.com>")
+    assert msgid == "<r1@example.com>"
+    assert outbox.status(msgid).state == "queued"  # type: ignore[union-attr]
+
+    with SMTPSink(rcpt_handler=rcpt) as sink:
+        worker = OutboxWorker(outbox, SMTPServerInfo(sink.host, sink.port))
+        assert worker.run_once() == 1
+
+        entry = outbox.status(msgid)
+        assert entry is not None
+        assert (entry.state, entry.pending, entry.attempts) == ("queued", ["temp@example.com"], 1)
+        assert entry.failed == {"perm@example.com": (550, "5.1.1 unknown")}
+        assert entry.next_attempt > time.time() + 50
+        assert worker.run_once() == 0  # backing off
+
+        assert outbox.flush() == 1
+        assert worker.run_once() == 1
+        worker.stop()
+
+    entry = outbox.status(msgid)
+    assert entry is not None and entry.state == "done"
+    sr = entry.send_result()
+    assert (sr.num_recipients, sr.num_failed) == (3, 1)
+    assert sr.get_error_for_recipient(EmailAddress("perm@example.com")) == (550, "5.1.1 unknown")
+    assert [m.rcpt_tos for m in sink.messages] == [["alice@example.com"], ["temp@example.com"]]
+    assert b"report body" in sink.messages[1].data
+    assert outbox.pending() == 0
+
+
+def test_connection_errors_are_deferred_and_claimed_entries_resume(
+    tmp_path: Path, mailer: MRSendmail, closed_port: int
+) -> None:
+    outbox = Outbox(tmp_path / "outbox.sqlite", base_delay=60.0)
+    msgid = mailer.enqueue(outbox, txt="x")
+    OutboxWorker(outbox, SMTPServerInfo("127.0.0.1", closed_port)).run_once()
+
+    entry = outbox.status(msgid)
+    assert entry is not None
+    assert (entry.state, entry.attempts, len(entry.pending)) == ("queued", 1, 3)
+    assert entry.last_error is not None and "ConnectionRefusedError" in entry.last_error
+
+    # simulate a crash while the entry was being sent
+    outbox.flush()
+    assert outbox.claim() is not None
+    assert outbox.status(msgid).state == "sending"  # type: ignore[union-attr]
+    outbox.close()
+
+    outbox = Outbox(tmp_path / "outbox.sqlite")
+    assert outbox.status(msgid).state == "queued"  # type: ignore[union-attr]
+    with SMTPSink() as sink, OutboxWorker(outbox, SMTPServerInfo(sink.host, sink.port), poll_interval=0.05):
+        deadline = time.monotonic() + 10
+        while outbox.pending() and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    assert outbox.status(msgid).state == "done"  # type: ignore[union-attr]
+    assert len(sink.messages) == 1
+
+
+@pytest.mark.parametrize("code, state", [(550, "done"), (451, "queued")])
+def test_failure_of_a_later_chunk_is_classified(tmp_path: Path, mailer: MRSendmail, code: int, state: str) -> None:
+    mails: List[str] = []
+
+    def mail(sender: str) -> Tuple[int, str]:
+        mails.append(sender)
+        return (code, f"{code // 100}.7.1 sender blocked") if len(mails) == 2 else (250, "2.1.0 Ok")
+
+    outbox = Outbox(tmp_path / "outbox.sqlite")
+    msgid = mailer.enqueue(outbox, txt="x")
+    with SMTPSink(mail_handler=mail) as sink:
+        OutboxWorker(outbox, SMTPServerInfo(sink.host, sink.port, max_recipients_per_transaction=2)).run_once()
+
+    entry = outbox.status(msgid)
+    assert entry is not None and entry.state == state
+    assert [m.rcpt_tos for m in sink.messages] == [["alice@example.com", "temp@example.com"]]
+    if code >= 500:
+        assert entry.failed == {"perm@example.com": (550, "5.7.1 sender blocked")}
+    else:
+        assert (entry.pending, entry.failed) == (["perm@example.com"], {})
+
+
+def test_worker_honours_max_messages_per_connection(tmp_path: Path, mailer: MRSendmail) -> None:
+    outbox = Outbox(tmp_path / "outbox.sqlite")
+    for i in range(3):
+        mailer.enqueue(outbox, txt=f"message {i}")
+    with SMTPSink() as sink, SMTPConnectionPool(max_messages_per_connection=1) as pool:
+        assert OutboxWorker(outbox, SMTPServerInfo(sink.host, sink.port), pool=pool).run_once() == 3
+
+    assert len(sink.messages) == 3
+    assert sink.stats.connections == 3
@@ -0,0 +1,49 @@
+import asyncio
+from typing import List, Tuple
+
+import pytest
+
+from reputils import EmailAddress
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def _rcpt(rcpt: str) -> Tuple[int, str]:
+    return (550, f"5.1.1 <{rcpt}> unknown") if rcpt.startswith("bad") else (250, "2.1.5 Ok")
+
+
+def _bccs(n: int) -> List[str]:
+    return [f"{'bad' if i % 10 == 3 else 'ok'}{i}@example.com" for i in range(n)]
+
+
+@pytest.mark.parametrize("extensions, max_reads", [(("PIPELINING",), 3), ((), 41)])
+def test_envelope_is_pipelined_only_when_advertised(
+    extensions: Tuple[str, ...], max_reads: int, make_mailer: MailerFactory
+) -> None:
+    with SMTPSink(extensions=extensions, rcpt_handler=_rcpt) as sink:
+        _, sr = make_mailer(sink, tos=(), bccs=_bccs(40)).send(txt="hi")
+
+    reads: int = sink.stats.reads_for("MAIL", "RCPT")
+    assert reads <= max_reads if extensions else reads == max_reads
+    assert sr.num_failed == 4
+    assert sink.messages[0].rcpt_tos == [f"ok{i}@example.com" for i in range(40) if i % 10 != 3]
+    assert sr.get_error_for_recipient(EmailAddress("bad13@example.com")) == (550, "5.1.1 <bad13@example.com> unknown")
+    assert sr.get_error_for_recipient(EmailAddress("ok14@example.com")) is None
+
+
+def test_asend_pipelines_envelope(make_mailer: MailerFactory) -> None:
+    with SMTPSink(extensions=("PIPELINING",), rcpt_handler=_rcpt) as sink:
+        _, sr = asyncio.run(make_mailer(sink, tos=(), bccs=_bccs(40)).asend(txt="hi"))
+
+    assert sink.stats.reads_for("MAIL", "RCPT") <= 3
+    assert sr.num_failed == 4
+    assert sr.get_error_for_recipient(EmailAddress("bad33@example.com")) == (550, "5.1.1 <bad33@example.com> unknown")
+
+
+def test_pipelined_sender_refusal_fails_all_recipients(make_mailer: MailerFactory) -> None:
+    with SMTPSink(extensions=("PIPELINING",), rcpt_handler=_rcpt) as sink:
+        sink.mail_handler = lambda sender: (553, "5.7.1 sender rejected")
+        _, sr = make_mailer(sink, tos=(), bccs=_bccs(5)).send(txt="hi")
+
+    assert sr.all_failed()
+    assert sink.messages == []
@@ -0,0 +1,60 @@
+from reputils import SMTPConnectionPool
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_send_without_pool_connects_per_message(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    mailer = make_mailer(smtp_sink, smtp_user="user", smtp_pass="secret")
+    for _ in range(3):
+        assert mailer.send(txt="hi")[1].all_succeeded()
+
+    assert smtp_sink.stats.connections == 3
+    assert smtp_sink.stats.count("AUTH") == 3
+    assert smtp_sink.stats.count("QUIT") == 3
+
+
+def test_failed_send_without_pool_closes_its_connection(make_mailer: MailerFactory) -> None:
+    with SMTPSink(rcpt_handler=lambda rcpt: (550, "5.1.1 no such user")) as sink:
+        mailer = make_mailer(sink)
+        for _ in range(2):
+            assert mailer.send(txt="hi")[1].all_failed()
+
+    assert sink.stats.connections == 2
+    assert sink.stats.count("QUIT") == 2
+
+
+def test_pool_reuses_authenticated_session(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    with SMTPConnectionPool() as pool:
+        mailer = make_mailer(smtp_sink, smtp_user="user", smtp_pass="secret", pool=pool)
+        for _ in range(3):
+            assert mailer.send(txt="hi")[1].all_succeeded()
+
+    assert len(smtp_sink.messages) == 3
+    assert smtp_sink.stats.connections == 1
+    assert smtp_sink.stats.count("AUTH") == 1
+    assert smtp_sink.stats.count("NOOP") == 2
+
+
+def test_pool_enforces_message_and_idle_limits(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    with SMTPConnectionPool(max_messages_per_connection=2) as pool:
+        mailer = make_mailer(smtp_sink, smtp_user="user", smtp_pass="secret", pool=pool)
+        for _ in range(4):
+            mailer.send(txt="hi")
+    assert smtp_sink.stats.connections == 2
+
+    with SMTPConnectionPool(max_idle_seconds=0.0) as pool:
+        mailer = make_mailer(smtp_sink, smtp_user="user", smtp_pass="secret", pool=pool)
+        for _ in range(2):
+            mailer.send(txt="hi")
+    assert smtp_sink.stats.connections == 4
+
+
+def test_pool_rsets_session_after_failed_transaction(make_mailer: MailerFactory) -> None:
+    with SMTPSink(rcpt_handler=lambda rcpt: (550, "5.1.1 no such user")) as sink:
+        with SMTPConnectionPool() as pool:
+            mailer = make_mailer(sink, pool=pool)
+            assert mailer.send(txt="hi")[1].all_failed()
+            assert mailer.send(txt="hi")[1].all_failed()
+
+        assert sink.stats.connections == 1
+        assert sink.stats.count("RSET") >= 1
@@ -0,0 +1,34 @@
+from reputils import EmailAddress
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_raw_bytes_is_the_buffer_that_was_sent(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    mailer = make_mailer(smtp_sink, tos=[EmailAddress("alice@example.com", "Jörg")], subject="Grüße")
+    raw, sr = mailer.send(txt="Größe", html="<p>Größe</p>", raw="bytes")
+
+    assert sr.all_succeeded()
+    assert isinstance(raw, memoryview)
+    assert bytes(raw) == smtp_sink.messages[0].data
+
+
+def test_raw_is_the_negotiated_form(make_mailer: MailerFactory) -> None:
+    with SMTPSink() as sink:  # no 8BITMIME: the 8bit body goes out as quoted-printable
+        mailer = make_mailer(sink, subject="Grüße", negotiate_8bit=True)
+        raw, sr = mailer.send(txt="Größe", raw="bytes")
+        text, _ = mailer.send(txt="Größe")
+
+    assert sr.all_succeeded()
+    assert bytes(raw) == sink.messages[0].data
+    assert text.encode() == sink.messages[1].data
+    assert b"quoted-printable" in sink.messages[1].data
+
+
+def test_raw_variants(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    mailer = make_mailer(smtp_sink)
+
+    text, _ = mailer.send(txt="hello")
+    nothing, sr = mailer.send(txt="hello", raw=None)
+
+    assert isinstance(text, str) and "Message-ID: <" in text
+    assert nothing is None and sr.all_succeeded()
@@ -0,0 +1,86 @@
+from email import message_from_bytes
+from typing import Iterator
+
+from reputils import EmailAddress, MailSpec
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_send_many_uses_one_session_and_keys_results_by_msgid(smtp_sink: SMTPSink, make_mailer: MailerFactory) -> None:
+    mailer = make_mailer(
+        smtp_sink, tos=["default@example.com"], smtp_user="user", smtp_pass="secret", subject="default subject"
+    )
+
+    specs = [
+        MailSpec(txt="one", msgid="<one@example.com>"),
+        MailSpec(txt="two", subject="second", tos=[EmailAddress("bob@example.com")], msgid="<two@example.com>"),
+        MailSpec(html="<p>three</p>", bccs=[EmailAddress("carol@example.com")], msgid="<three@example.com>"),
+    ]
+    results = mailer.send_many(iter(specs))
+
+    assert list(results) == ["<one@example.com>", "<two@example.com>", "<three@example.com>"]
+    assert all(r.all_succeeded() for r in results.values())
+    assert smtp_sink.stats.connections == 1
+    assert smtp_sink.stats.count("AUTH") == 1
+    assert smtp_sink.stats.count("RSET") == 2
+
+    assert [m.rcpt_tos for m in smtp_sink.messages] == [
+        ["default@example.com"],
+        ["bob@example.com"],
+        ["default@example.com", "carol@example.com"],
+    ]
+    assert message_from_bytes(smtp_sink.messages[1].data)["Subject"] == "second"
+    assert mailer.tos == [EmailAddress("default@example.com")]
+
+
+def test_send_many_continues_after_refused_message(make_mailer: MailerFactory) -> None:
+    with SMTPSink(rcpt_handler=lambda r: (550, "5.1.1 unknown") if r.startswith("bad") else (250, "Ok")) as sink:
+        mailer = make_mailer(sink, tos=())
+        results = mailer.send_many(
+            [
+                MailSpec(txt="x", tos=[EmailAddress("bad@example.com")], msgid="<a@x>"),
+                MailSpec(txt="y", tos=[EmailAddress("good@example.com")], msgid="<b@x>"),
+            ]
+        )
+
+    assert results["<a@x>"].all_failed()
+    assert results["<b@x>"].all_succeeded()
+    assert len(sink.messages) == 1
+
+
+def test_send_many_reconnects_after_421(make_mailer: MailerFactory) -> None:
+    def rcpt(addr: str) -> tuple[int, str]:
+        return (421, "4.7.0 too busy, closing") if addr.startswith("busy") else (250, "Ok")
+
+    with SMTPSink(rcpt_handler=rcpt) as sink:
+        mailer = make_mailer(sink, tos=())
+        results = mailer.send_many(
+            MailSpec(
+                txt=str(i), tos=[EmailAddress("busy@example.com" if i == 1 else f"u{i}@example.com")], msgid=f"<{i}@x>"
+            )
+            for i in range(4)
+        )
+
+    assert [r.all_succeeded() for r in results.values()] == [True, False, True, True]
+    assert results["<1@x>"].get_error_for_recipient(EmailAddress("busy@example.com"))[0] == 421  # type: ignore[index]
+    assert sorted(m.rcpt_tos[0] for m in sink.messages) == ["u0@example.com", "u2@example.com", "u3@example.com"]
+    assert sink.stats.connections == 2
+
+
+def test_send_many_returns_partial_results_when_the_server_goes_away(make_mailer: MailerFactory) -> None:
+    sink = SMTPSink(rcpt_handler=lambda r: (421, "4.3.2 shutting down") if r.startswith("last") else (250, "Ok"))
+    with sink:
+        mailer = make_mailer(sink, tos=())
+
+        def specs() -> Iterator[MailSpec]:
+            yield MailSpec(txt="a", tos=[EmailAddress("first@example.com")], msgid="<a@x>")
+            yield MailSpec(txt="b", tos=[EmailAddress("last@example.com")], msgid="<b@x>")
+            sink.close()
+            yield MailSpec(txt="c", tos=[EmailAddress("never@example.com")], msgid="<c@x>")
+
+        results = mailer.send_many(specs())
+
+    assert list(results) == ["<a@x>", "<b@x>", "<c@x>"]
+    assert results["<a@x>"].all_succeeded()
+    assert results["<b@x>"].all_failed() and results["<c@x>"].all_failed()
+    assert results["<c@x>"].fail_exceptions[0].smtp_code == 421  # type: ignore[index, attr-defined]
@@ -0,0 +1,49 @@
+import email.utils
+import smtplib
+from typing import List
+
+import pytest
+
+from reputils import EmailAddress, MailReport, RecipientError, SendResult
+
+
+def _refused(n: int, offset: int = 0) -> smtplib.SMTPRecipientsRefused:
+    return smtplib.SMTPRecipientsRefused(
+        {
+            f"User {i} <u{i}@example.com>": (451 if i % 3 == 0 else 550, f"error {i}".encode("utf-8"))
+            for i in range(offset, offset + n)
+        }
+    )
+
+
+def test_index_lookups_and_bulk_accessors(monkeypatch: pytest.MonkeyPatch) -> None:
+    sr = SendResult(num_recipients=30_000, num_failed=20_000, fail_exceptions=[_refused(20_000)])
+
+    parsed: List[str] = []
+    monkeypatch.setattr(MailReport, "parseaddr", lambda addr: parsed.append(addr) or email.utils.parseaddr(addr))
+    for i in range(20_000):
+        assert sr.get_error_for_recipient(EmailAddress(f"u{i}@example.com")) is not None
+    assert len(parsed) == 20_000  # the index is built once, not per lookup
+
+    assert sr.get_error_for_recipient(EmailAddress("u4@example.com", "User 4")) == (550, "error 4")
+    assert sr.get_error_for_recipient(EmailAddress("nobody@example.com")) is None
+    assert sr.get_all_errors()[0] == RecipientError("u0@example.com", 451, "error 0")
+    assert len(sr.failed_recipients()) == 20_000
+    assert sr.codes_histogram() == {451: 6667, 550: 13333}
+    assert all(err.code == 451 for err in sr.iter_errors(4))
+    assert sum(1 for _ in sr.iter_errors(5)) == 13333
+
+
+def test_index_follows_changes_to_fail_exceptions() -> None:
+    sr = SendResult(num_recipients=4, num_failed=0)
+    assert sr.failed_recipients() == frozenset()
+
+    sr.fail_exceptions = [_refused(1)]
+    assert sr.failed_recipients() == {"u0@example.com"}
+
+    sr.fail_exceptions.append(_refused(1, offset=1))
+    assert sr.failed_recipients() == {"u0@example.com", "u1@example.com"}
+
+    merged = SendResult.merged([sr, SendResult(2, 1, [_refused(1, offset=2)])])
+    assert merged.codes_histogram() == {451: 1, 550: 2}
+    assert merged == SendResult(6, 1, merged.fail_exceptions)
@@ -0,0 +1,84 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Tuple
+
+from reputils import SendResult
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def _send(make_mailer: MailerFactory, sink: SMTPSink, attachment: Path, stream: bool = True) -> Tuple[str, SendResult]:
+    return make_mailer(sink, stream_attachments=stream).send(txt="see attachment", files=[attachment])
+
+
+def _mail_command(sink: SMTPSink) -> str:
+    return next(c for c in sink.stats.commands if c.upper().startswith("MAIL"))
+
+
+def test_size_is_declared_and_oversized_messages_fail_before_mail_from(
+    tmp_path: Path, make_mailer: MailerFactory
+) -> None:
+    attachment = tmp_path / "report.bin"
+    attachment.write_bytes(os.urandom(20_000))
+
+    with SMTPSink(extensions=("SIZE 1000000",)) as sink:
+        _, sr = _send(make_mailer, sink, attachment)
+    assert sr.all_succeeded()
+    declared = int(_mail_command(sink).split("SIZE=")[1])
+    assert abs(declared - sink.messages[0].size) <= 2  # the final CRLF may be added by DATA
+
+    with SMTPSink(extensions=("SIZE 10000",)) as sink:
+        _, sr = _send(make_mailer, sink, attachment, stream=False)
+    assert sr.num_failed == 1 and sr.fail_exceptions is not None
+    assert getattr(sr.fail_exceptions[0], "smtp_code") == 552
+    assert sink.stats.count("MAIL") == 0 and sink.messages == []
+
+
+def test_asend_declares_size_and_fails_oversized_messages_before_mail_from(
+    tmp_path: Path, make_mailer: MailerFactory
+) -> None:
+    attachment = tmp_path / "report.bin"
+    attachment.write_bytes(os.urandom(20_000))
+
+    with SMTPSink(extensions=("SIZE 1000000", "PIPELINING")) as sink:
+        _, sr = asyncio.run(make_mailer(sink, stream_attachments=True).asend(txt="see attachment", files=[attachment]))
+    assert sr.all_succeeded()
+    declared = int(_mail_command(sink).split("SIZE=")[1])
+    assert abs(declared - sink.messages[0].size) <= 2
+
+    with SMTPSink(extensions=("SIZE 10000",)) as sink:
+        _, sr = asyncio.run(make_mailer(sink).asend(txt="see attachment", files=[attachment]))
+    assert sr.num_failed == 1 and sr.fail_exceptions is not None
+    assert getattr(sr.fail_exceptions[0], "smtp_code") == 552
+    assert sink.stats.count("MAIL") == 0 and sink.messages == []
+
+
+def test_binarymime_sends_streamed_attachments_unencoded_with_bdat(tmp_path: Path, make_mailer: MailerFactory) -> None:
+    payload = os.urandom(700_000)
+    attachment = tmp_path / "report.bin"
+    attachment.write_bytes(payload)
+
+    with SMTPSink(extensions=("CHUNKING", "BINARYMIME", "SIZE 100000000")) as sink:
+        _, sr = _send(make_mailer, sink, attachment)
+
+    assert sr.all_succeeded()
+    assert "BODY=BINARYMIME" in _mail_command(sink)
+    assert sink.stats.count("DATA") == 0 and sink.stats.count("BDAT") >= 3
+    data = sink.messages[0].data
+    assert b"Content-Transfer-Encoding: binary" in data and payload in data
+    assert len(data) < len(payload) * 1.01
+    assert int(_mail_command(sink).split("SIZE=")[1].split()[0]) == len(data) == sr.bytes_sent
+
+
+def test_base64_and_data_without_binarymime_or_streaming(tmp_path: Path, make_mailer: MailerFactory) -> None:
+    attachment = tmp_path / "report.bin"
+    attachment.write_bytes(os.urandom(10_000))
+
+    with SMTPSink(extensions=("CHUNKING",)) as chunking_only, SMTPSink(extensions=("CHUNKING", "BINARYMIME")) as eager:
+        _send(make_mailer, chunking_only, attachment)
+        _send(make_mailer, eager, attachment, stream=False)
+
+    for sink in (chunking_only, eager):
+        assert sink.stats.count("BDAT") == 0 and "BODY=" not in _mail_command(sink)
+        assert b"Content-Transfer-Encoding: base64" in sink.messages[0].data
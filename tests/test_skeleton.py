@@ -0,0 +1,44 @@
+from email import message_from_bytes
+from pathlib import Path
+
+from reputils import EmailAddress, MessageSkeleton, SMTPConnectionPool
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_compiled_skeleton_is_sent_per_recipient(
+    smtp_sink: SMTPSink, make_mailer: MailerFactory, tmp_path: Path
+) -> None:
+    attachment = tmp_path / "terms.txt"
+    attachment.write_text("terms and conditions\n")
+
+    with SMTPConnectionPool() as pool:
+        mailer = make_mailer(
+            smtp_sink,
+            tos=(),
+            senderfrom=EmailAddress("news@example.com", "Nachrichten für alle"),
+            subject="Monatsübersicht",
+            ccs=[EmailAddress("archive@example.com")],
+            pool=pool,
+        )
+        skeleton: MessageSkeleton = mailer.compile(txt="Grüße", html="<p>Grüße</p>", files=[attachment])
+
+        results = [
+            mailer.send_compiled(skeleton, tos=[EmailAddress(f"user{i}@example.com", f"Usér {i}")]) for i in range(3)
+        ]
+
+    assert all(sr.all_succeeded() for _, sr in results)
+    assert [m.rcpt_tos for m in smtp_sink.messages] == [
+        [f"user{i}@example.com", "archive@example.com"] for i in range(3)
+    ]
+
+    parsed = [message_from_bytes(m.data) for m in smtp_sink.messages]
+    assert len({p["Message-ID"] for p in parsed}) == 3
+    for i, p in enumerate(parsed):
+        assert f"user{i}@example.com" in p["To"]
+        assert p["Date"] and p["Cc"] == "archive@example.com"
+        assert p.get_all("To") == [p["To"]] and len(p.get_all("Message-ID")) == 1
+        assert [part.get_payload(decode=True) for part in p.walk() if part.get_filename()] == [
+            b"terms and conditions\n"
+        ]
+    assert parsed[0].get_payload()[0].as_string() == parsed[2].get_payload()[0].as_string()
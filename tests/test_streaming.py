@@ -0,0 +1,41 @@
+import os
+import tracemalloc
+from email import message_from_bytes
+from pathlib import Path
+
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_streamed_attachments_arrive_intact(tmp_path: Path, make_mailer: MailerFactory) -> None:
+    big = tmp_path / "big.bin"
+    big.write_bytes(os.urandom(300_001))
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+
+    with SMTPSink() as sink:
+        raw, sr = make_mailer(sink, stream_attachments=True).send(txt="see attachments", files=[big, empty])
+
+    assert sr.all_succeeded()
+    parts = [p for p in message_from_bytes(sink.messages[0].data).walk() if p.get_filename()]
+    assert [p.get_filename() for p in parts] == ["big.bin", "empty.txt"]
+    assert parts[0].get_payload(decode=True) == big.read_bytes()
+    assert parts[1].get_payload(decode=True) == b""
+    assert "filename=big.bin" in raw and len(raw) < 10_000
+
+
+def test_streamed_attachments_bound_memory(tmp_path: Path, make_mailer: MailerFactory) -> None:
+    big = tmp_path / "big.bin"
+    big.write_bytes(os.urandom(8 * 1024 * 1024))
+
+    with SMTPSink(store_data=False) as sink:
+        mailer = make_mailer(sink, stream_attachments=True)
+        tracemalloc.start()
+        try:
+            mailer.send(txt="big", files=[big])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert sink.messages[0].size > 8 * 1024 * 1024
+    assert peak < 2 * 1024 * 1024
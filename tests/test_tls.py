@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from reputils import SMTPConnectionPool, SMTPServerInfo
+from reputils.MailReport import _ssl_context
+from tests.conftest import MailerFactory
+from tests.smtpsink import SMTPSink
+
+
+def test_ssl_context_is_shared_per_tls_configuration() -> None:
+    a = SMTPServerInfo("a.example.com", use_start_tls=True)
+    b = SMTPServerInfo("b.example.com", 465, use_implicit_tls=True)
+    assert _ssl_context(a) is _ssl_context(b)
+    assert _ssl_context(SMTPServerInfo("a.example.com", ignoresslerrors=False)) is not _ssl_context(a)
+
+
+@pytest.mark.parametrize("tls", [{"use_start_tls": True}, {"use_implicit_tls": True}])
+def test_repeated_sends_resume_the_tls_session(tls: dict[str, bool], make_mailer: MailerFactory) -> None:
+    with SMTPSink(
+        auth=("user", "secret"), starttls="use_start_tls" in tls, implicit_tls="use_implicit_tls" in tls
+    ) as sink:
+        mailer = make_mailer(sink, smtp_user="user", smtp_pass="secret", subject="tls", **tls)
+        for _ in range(3):
+            assert mailer.send(txt="hi")[1].all_succeeded()
+
+    assert sink.stats.connections == 3
+    assert sink.stats.tls_resumed == [False, True, True]
+    assert sink.stats.count("STARTTLS") == (3 if "use_start_tls" in tls else 0)
+
+
+def test_implicit_tls_with_pool_and_asend(make_mailer: MailerFactory) -> None:
+    with SMTPSink(auth=("user", "secret"), implicit_tls=True) as sink:
+        mailer = make_mailer(sink, smtp_user="user", smtp_pass="secret", subject="tls", use_implicit_tls=True)
+        with SMTPConnectionPool() as pool:
+            mailer.pool = pool
+            _, sr = mailer.send(txt="pooled")
+            assert "tls" not in sr.timings  # part of "connect" with implicit TLS
+            assert mailer.send(txt="pooled")[1].all_succeeded()
+        mailer.pool = None
+        assert asyncio.run(mailer.asend(txt="async"))[1].all_succeeded()
+
+    assert [m.data.count(b"Subject: tls") for m in sink.messages] == [1, 1, 1]
+    assert sink.stats.connections == 2
+    assert sink.stats.count("AUTH") == 2
+
+
+def test_start_tls_and_implicit_tls_are_exclusive() -> None:
+    with pytest.raises(ValueError):
+        SMTPServerInfo("smtp.example.com", use_start_tls=True, use_implicit_tls=True)